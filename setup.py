@@ -16,4 +16,7 @@ _ = setup(
         'caldav~=1.4.0',
         'PyYAML~=6.0',
     ],
+    extras_require={
+        'async': ['httpx~=0.28'],
+    },
 )
@@ -0,0 +1,112 @@
+'''
+The fixtures of the benchmark suite.
+
+The benchmarks compare wall-clock times, which depend on the machine, so
+they are marked with "benchmark" and left out of the default run. Run
+them with `python -m pytest -m benchmark tests/benchmarks`.
+
+The sample sizes can be set with the environment variable
+TODODAV_BENCH_SIZES (e.g. "1000,10000,100000"; default: "1000"). Each
+benchmark takes the best time of a few runs and fails, if it is slower
+than its stored baseline in baselines.json times TODODAV_BENCH_TOLERANCE
+(default: 3). TODODAV_BENCH_UPDATE=1 stores the measured times as the new
+baselines instead.
+'''
+
+from tododav.utils import sample_utils
+
+from functools import lru_cache
+from typing import Callable
+
+import json
+import os
+import pytest
+import time
+
+
+BASELINES_FILE = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+SIZES = [
+    int(size) for size in os.getenv('TODODAV_BENCH_SIZES', '1000').split(',')
+    if size.strip()
+]
+
+TOLERANCE = float(os.getenv('TODODAV_BENCH_TOLERANCE', '3'))
+
+SLACK = 0.005
+'''
+Seconds, which every benchmark may be slower on top of the tolerance,
+so that tiny timings do not fail because of noise.
+'''
+
+UPDATE = os.getenv('TODODAV_BENCH_UPDATE', '') not in ('', '0')
+
+
+def pytest_collection_modifyitems(items):
+    for item in items:
+        if 'benchmark' in getattr(item, 'fixturenames', ()):
+            item.add_marker(pytest.mark.benchmark)
+
+
+def pytest_generate_tests(metafunc):
+    if 'size' in metafunc.fixturenames:
+        metafunc.parametrize('size', SIZES)
+
+
+@lru_cache(maxsize=None)
+def sample_vtodos(size: int) -> tuple[str, ...]:
+    return tuple(sample_utils.generate_vtodos(size))
+
+
+@pytest.fixture
+def vtodos(size) -> tuple[str, ...]:
+    return sample_vtodos(size)
+
+
+@pytest.fixture(scope='session')
+def baselines():
+    try:
+        with open(BASELINES_FILE) as baselines_file:
+            data = json.load(baselines_file)
+    except FileNotFoundError:
+        data = {}
+    yield data
+    if UPDATE:
+        with open(BASELINES_FILE, 'w') as baselines_file:
+            json.dump(data, baselines_file, indent=2, sort_keys=True)
+            baselines_file.write('\n')
+
+
+@pytest.fixture
+def benchmark(baselines, request) -> Callable:
+    '''
+    Returns a callable, which measures the given function (after the
+    optional setup function, whose result it gets) and compares the best
+    time of some runs with the baseline of the benchmark and sample size.
+    '''
+    def _benchmark(
+        size: int,
+        func: Callable,
+        setup: Callable | None = None,
+        repeat: int = 3
+    ) -> float:
+        name = request.node.originalname
+        best = float('inf')
+        for _ in range(repeat):
+            arg = setup() if setup is not None else None
+            start = time.perf_counter()
+            func(arg) if setup is not None else func()
+            best = min(best, time.perf_counter() - start)
+
+        sized = baselines.setdefault(str(size), {})
+        if UPDATE:
+            sized[name] = round(best, 6)
+        elif name in sized:
+            limit = sized[name] * TOLERANCE + SLACK
+            assert best <= limit, (
+                f'{name} with {size} tasks took {best:.4f}s, '
+                f'the baseline is {sized[name]:.4f}s (limit {limit:.4f}s).'
+            )
+        return best
+
+    return _benchmark
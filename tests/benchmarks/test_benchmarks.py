@@ -0,0 +1,106 @@
+from tododav.model.todo.todo_repository import TodoRepository
+from tododav.utils import sample_utils
+from caldav.objects import Todo
+
+from datetime import date
+
+
+def populated(vtodos, lazy: bool = True) -> TodoRepository:
+    todo_rep = TodoRepository(lazy=lazy)
+    todo_rep.populate_from_todo_list([Todo(data=vtodo) for vtodo in vtodos])
+    return todo_rep
+
+
+def test_generator_is_deterministic():
+    assert sample_utils.generate_vtodos(20) == sample_utils.generate_vtodos(20)
+    assert sample_utils.generate_vtodos(20) != sample_utils.generate_vtodos(20, seed=1)
+
+
+def test_parse_populate_lazy(benchmark, size, vtodos):
+    todo_rep = TodoRepository(lazy=True)
+    benchmark(
+        size,
+        lambda todos: todo_rep.populate_from_todo_list(todos),
+        setup=lambda: [Todo(data=vtodo) for vtodo in vtodos]
+    )
+    assert len(todo_rep.get_todos()) == size
+
+
+def test_parse_populate_eager(benchmark, size, vtodos):
+    todo_rep = TodoRepository(lazy=False)
+    benchmark(
+        size,
+        lambda todos: todo_rep.populate_from_todo_list(todos),
+        setup=lambda: [Todo(data=vtodo) for vtodo in vtodos]
+    )
+    assert len(todo_rep.get_todos()) == size
+
+
+def test_parse_full(benchmark, size, vtodos):
+    benchmark(
+        size,
+        lambda todos: [todo.ical for todo in todos],
+        setup=lambda: populated(vtodos).get_todos()
+    )
+
+
+def test_filter_tags(benchmark, size, vtodos):
+    todo_rep = populated(vtodos)
+    benchmark(size, lambda: [
+        todo_rep.get_todos_by_tags(tag) for tag in sample_utils.TAGS
+    ])
+
+
+def test_filter_daterange(benchmark, size, vtodos):
+    todo_rep = populated(vtodos)
+    benchmark(size, lambda: [
+        todo_rep.get_todos_by_daterange(date(2025, month, 1), date(2025, month, 28))
+        for month in range(1, 13)
+    ])
+
+
+def test_filter_status(benchmark, size, vtodos):
+    todo_rep = populated(vtodos)
+    benchmark(size, lambda: todo_rep.get_todos_by_status('COMPLETED', exclude=True))
+
+
+def test_filter_query(benchmark, size, vtodos):
+    todo_rep = populated(vtodos)
+    benchmark(size, lambda: todo_rep.query()
+              .due_between('2025-01-01', '2025-12-31')
+              .tags('work')
+              .status('COMPLETED', exclude=True)
+              .order_by('due')
+              .all())
+
+
+def test_filter_custom(benchmark, size, vtodos):
+    todo_rep = populated(vtodos)
+    benchmark(size, lambda: todo_rep.get_todos_filtered(
+        lambda todo: 'call' in todo.get_summary()
+    ))
+
+
+def test_mutate_setters(benchmark, size, vtodos):
+    def mutate(todos):
+        for i, todo in enumerate(todos):
+            todo.set_priority(i % 10)
+            todo.add_tag('benchmark')
+            todo.set_due(date(2025, 6, 1 + i % 28))
+
+    benchmark(size, mutate, setup=lambda: populated(vtodos).get_todos())
+
+
+def test_serialise_str(benchmark, size, vtodos):
+    todos = populated(vtodos).get_todos()
+    benchmark(size, lambda: [str(todo) for todo in todos])
+
+
+def test_serialise_ical(benchmark, size, vtodos):
+    def setup():
+        todos = populated(vtodos).get_todos()
+        for todo in todos:
+            todo.add_tag('benchmark')
+        return todos
+
+    benchmark(size, lambda todos: [todo.caldav_todo.data for todo in todos], setup=setup)
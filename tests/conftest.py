@@ -1,5 +1,21 @@
-from caldav.objects import Todo
+from tododav.model.todo.todo_repository import TodoRepository
+from tododav.utils.dav_server import DavServer
+from caldav.elements import cdav, dav
+from caldav.lib import error
+from caldav.objects import (
+    Calendar,
+    CalendarObjectResource,
+    Event,
+    SynchronizableCalendarObjectCollection,
+    Todo
+)
+from datetime import datetime
+from requests import Response
+from requests.adapters import BaseAdapter
+from xml.sax.saxutils import escape
 
+import io
+import lxml.etree as etree
 import pytest
 import os
 
@@ -137,3 +153,201 @@ def todos_as_todo_in_list(todos_as_strings_in_list) -> list[Todo]:
     for todo_str in todos_as_strings_in_list:
         out.append(Todo(data=todo_str))
     return out
+
+
+class FakeSyncCalendar(Calendar):
+    '''
+    A minimal Calendar, which answers sync-collection and calendar-multiget
+    requests from an internal dict instead of a server.
+    '''
+
+    def __init__(
+        self,
+        todos_as_strings: list[str],
+        url: str = 'https://dav.example.org/calendars/user/tasks/'
+    ):
+        super().__init__(url=url)
+        self.resources = {}
+        self.history = []
+        self.multiget_count = 0
+        self.queries = []
+        self.supports_query = True
+        for i, todo_str in enumerate(todos_as_strings):
+            self.put(f'task{i}.ics', todo_str)
+
+    def put(self, name: str, data: str):
+        self.history.append(name)
+        self.resources[name] = (f'"{len(self.history)}"', data)
+
+    def remove(self, name: str):
+        self.history.append(name)
+        self.resources.pop(name)
+
+    def resource_url(self, name: str):
+        assert self.url is not None
+        return self.url.join(name)
+
+    def get_property(self, prop, use_cached=False, **passthrough):
+        return str(len(self.history))
+
+    def objects_by_sync_token(self, sync_token=None, load_objects=False):
+        if sync_token == 'invalid':
+            raise error.ReportError('valid-sync-token')
+        names = (
+            set(self.resources) if sync_token is None
+            else set(self.history[int(sync_token):])
+        )
+        objects = []
+        for name in sorted(names):
+            props = {}
+            if name in self.resources:
+                props[dav.GetEtag.tag] = self.resources[name][0]
+            objects.append(CalendarObjectResource(
+                url=self.resource_url(name), parent=self, props=props
+            ))
+        return SynchronizableCalendarObjectCollection(
+            self, objects, str(len(self.history))
+        )
+
+    def todos(self, include_completed=False):
+        return [
+            Todo(url=self.resource_url(name), data=data, parent=self)
+            for name, (_, data) in sorted(self.resources.items())
+        ]
+
+    def search(self, xml=None, comp_class=None, **kwargs):
+        # answer a calendar-query like a server, which only knows the
+        # text-match filters and ignores everything else
+        self.queries.append(xml if xml is not None else kwargs)
+        if xml is None:
+            return self._search_window(kwargs['start'], kwargs['end'])
+        if not self.supports_query:
+            raise error.ReportError('unsupported query')
+        texts = [
+            element.text.lower()
+            for element in etree.fromstring(xml).iter(cdav.TextMatch.tag)
+        ]
+        return [
+            todo for todo in self.todos()
+            if all(text in todo.data.lower() for text in texts)
+        ]
+
+    def _search_window(self, start, end):
+        # the not completed tasks with a due inside the window
+        out = []
+        for todo in self.todos():
+            component = todo.icalendar_component
+            if 'DUE' not in component or 'COMPLETED' in component.get('STATUS', ''):
+                continue
+            due = component['DUE'].dt
+            if not isinstance(due, datetime):
+                due = datetime.combine(due, datetime.min.time())
+            if start <= due.replace(tzinfo=None) < end:
+                out.append(todo)
+        return out
+
+    def calendar_multiget(self, event_urls):
+        self.multiget_count += 1
+        out = []
+        for url in event_urls:
+            name = str(url).rsplit('/', 1)[-1]
+            if name in self.resources:
+                out.append(Event(
+                    url=url, data=self.resources[name][1], parent=self
+                ))
+        return out
+
+
+class FakeReportAdapter(BaseAdapter):
+    '''
+    A requests transport adapter, which answers every request with a
+    multistatus response of the given VTODOs and counts the read bytes.
+    '''
+
+    def __init__(self, todos_as_strings: list[str], path: str):
+        super().__init__()
+        responses = ''.join(
+            '<d:response>'
+            f'<d:href>{path}task{i}.ics</d:href>'
+            '<d:propstat><d:prop>'
+            f'<d:getetag>"{i}"</d:getetag>'
+            f'<c:calendar-data>{escape(todo_str)}</c:calendar-data>'
+            '</d:prop><d:status>HTTP/1.1 200 OK</d:status></d:propstat>'
+            '</d:response>'
+            for i, todo_str in enumerate(todos_as_strings)
+        )
+        self.body = (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            '<d:multistatus xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">'
+            f'{responses}</d:multistatus>'
+        ).encode('utf-8')
+        self.stream = None
+        self.requests = []
+
+    def send(self, request, stream=False, **kwargs):
+        self.requests.append(request)
+        self.stream = io.BytesIO(self.body)
+        response = Response()
+        response.status_code = 207
+        response.raw = self.stream
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_calendar(todos_as_strings_in_list):
+    '''
+    This fixture returns a callable, which creates a FakeSyncCalendar
+    with the first n tasks of the test data and the given name.
+    '''
+    def _fake_calendar(n: int = 4, name: str = 'tasks') -> FakeSyncCalendar:
+        return FakeSyncCalendar(
+            todos_as_strings_in_list[:n],
+            f'https://dav.example.org/calendars/user/{name}/'
+        )
+
+    return _fake_calendar
+
+
+@pytest.fixture
+def fake_report_adapter():
+    '''
+    This fixture returns a callable, which mounts a FakeReportAdapter
+    with the given tasks on the session of the given DAVClient.
+    '''
+    def _fake_report_adapter(client, todos_as_strings: list[str], path: str):
+        adapter = FakeReportAdapter(todos_as_strings, path)
+        client.session.mount('https://', adapter)
+        return adapter
+
+    return _fake_report_adapter
+
+
+@pytest.fixture
+def dav_server(todos_as_strings_in_list, tmp_path):
+    '''
+    This fixture returns a callable, which starts a DavServer with the
+    test tasks in the calendar "tasks" and a TodoRepository for it. All
+    started servers will be stopped after the test.
+    '''
+    servers = []
+
+    def _dav_server(**kwargs) -> tuple[DavServer, TodoRepository]:
+        server = DavServer({'tasks': todos_as_strings_in_list}, **kwargs).start()
+        servers.append(server)
+        todo_rep = TodoRepository({
+            'NC_URI': server.url,
+            'NC_USER': 'user',
+            'NC_PASSWORD': 'password',
+            'NC_CALENDAR': 'tasks',
+            'CALENDAR_CACHE': str(tmp_path / 'calendar_cache.json')
+        })
+        return (server, todo_rep)
+
+    yield _dav_server
+    for server in servers:
+        server.stop()
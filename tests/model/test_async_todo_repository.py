@@ -0,0 +1,201 @@
+from tododav.model.todo.async_todo_repository import AsyncTodoRepository
+from tododav.model.todo.todo_stats import TodoStats
+
+from datetime import date
+
+import asyncio
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+
+BASE_URL = 'https://dav.example.org/remote.php/dav/'
+CALENDAR_PATH = '/remote.php/dav/calendars/user/tasks/'
+
+
+def multistatus(*responses: str) -> bytes:
+    return (
+        '<?xml version="1.0"?><d:multistatus xmlns:d="DAV:" '
+        'xmlns:cal="urn:ietf:params:xml:ns:caldav">'
+        + ''.join(responses)
+        + '</d:multistatus>'
+    ).encode()
+
+
+def response(href: str, props: str) -> str:
+    return (
+        f'<d:response><d:href>{href}</d:href><d:propstat><d:prop>{props}'
+        '</d:prop><d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>'
+    )
+
+
+def mock_server(todos_as_strings: list[str], requests: list):
+    '''
+    Create a httpx.MockTransport, which answers like a tiny CalDAV server.
+    '''
+    resources = {
+        f'{CALENDAR_PATH}task{i}.ics': data
+        for i, data in enumerate(todos_as_strings)
+    }
+
+    def handler(request):
+        requests.append((request.method, request.url.path))
+        path = request.url.path
+        body = request.content.decode()
+        if request.method == 'PROPFIND' and 'current-user-principal' in body:
+            return httpx.Response(207, content=multistatus(response(
+                path,
+                '<d:current-user-principal><d:href>/remote.php/dav/principals/user/'
+                '</d:href></d:current-user-principal>'
+            )))
+        if request.method == 'PROPFIND' and 'calendar-home-set' in body:
+            return httpx.Response(207, content=multistatus(response(
+                path,
+                '<cal:calendar-home-set><d:href>/remote.php/dav/calendars/user/'
+                '</d:href></cal:calendar-home-set>'
+            )))
+        if request.method == 'PROPFIND':
+            return httpx.Response(207, content=multistatus(
+                response(path, '<d:resourcetype><d:collection/></d:resourcetype>'),
+                response(
+                    CALENDAR_PATH,
+                    '<d:displayname>tasks</d:displayname><d:resourcetype>'
+                    '<d:collection/><cal:calendar/></d:resourcetype>'
+                )
+            ))
+        if request.method == 'REPORT':
+            return httpx.Response(207, content=multistatus(*(
+                response(
+                    href,
+                    f'<d:getetag>"{len(data)}"</d:getetag>'
+                    f'<cal:calendar-data>{data}</cal:calendar-data>'
+                )
+                for href, data in resources.items()
+            )))
+        if request.method == 'PUT':
+            resources[path] = request.content.decode()
+            return httpx.Response(201, headers={'ETag': '"new"'})
+        if request.method == 'DELETE':
+            if request.headers.get('If-Match') == '"changed"':
+                return httpx.Response(412)
+            resources.pop(path, None)
+            return httpx.Response(204)
+        return httpx.Response(405)
+
+    return httpx.MockTransport(handler), resources
+
+
+def test_async_todo_repository(todos_as_strings_in_list):
+    '''
+    Test connecting, fetching, saving and deleting with the
+    AsyncTodoRepository against a mocked server.
+    '''
+    requests = []
+    transport, resources = mock_server(todos_as_strings_in_list, requests)
+
+    async def run():
+        async with AsyncTodoRepository(
+            {'NC_URI': BASE_URL, 'NC_CALENDAR': 'tasks'},
+            transport=transport
+        ) as todo_rep:
+            await todo_rep.connect_calendar()
+            assert todo_rep.calendar_url.endswith(CALENDAR_PATH)
+
+            assert await todo_rep.populate_from_todo_list() is True
+            assert len(todo_rep.get_todos()) == 4
+
+            # the filtering API is the one of the TodoRepository
+            filtered = todo_rep.get_todos_by_tags('tag2')
+            assert [todo.get_summary() for todo in filtered] == [
+                'a test task', 'the third test task'
+            ]
+
+            # saving only pushes the modified tasks
+            todo_rep.get_todos()[1].set_priority(2)
+            todo_rep.get_todos()[2].set_priority(3)
+            requests.clear()
+            results = await todo_rep.save_all()
+            assert list(results.values()) == [(True, None), (True, None)]
+            assert [method for method, _ in requests] == ['PUT', 'PUT']
+
+            # adding a task saves it immediately
+            new_todo = await todo_rep.add_todo('new', date(2025, 5, 1))
+            assert f'{CALENDAR_PATH}{new_todo.get_uid()}.ics' in resources
+
+            # deleting a task which was changed meanwhile fails
+            first_todo = todo_rep.get_todos()[0]
+            first_uid = first_todo.get_uid()
+            todo_rep.etags[todo_rep._get_href(first_todo.caldav_todo)] = '"changed"'
+            assert await todo_rep.delete_todo_by_uid(first_uid) is False
+            assert await todo_rep.delete_todo_by_uid(new_todo.get_uid()) is True
+            assert len(todo_rep.get_todos()) == 4
+
+    asyncio.run(run())
+
+
+def test_async_todo_repository_window(todos_as_strings_in_list):
+    '''
+    Test that a window is sent as a time-range filter, that completed tasks
+    are left out and that the blocking methods of the TodoRepository are
+    not available.
+    '''
+    requests = []
+    transport, _ = mock_server(todos_as_strings_in_list, requests)
+    handler = transport.handler
+    bodies = []
+
+    def record_body(request):
+        bodies.append(request.content.decode())
+        return handler(request)
+
+    transport.handler = record_body
+    closed = []
+
+    async def run():
+        async with AsyncTodoRepository(
+            {'NC_URI': BASE_URL, 'NC_CALENDAR': 'tasks'},
+            transport=transport
+        ) as todo_rep:
+            todo_rep.client.close = lambda: closed.append(True)
+            for name in ('sync', 'populate_from_query', 'populate_from_store', 'iter_todos'):
+                assert not hasattr(todo_rep, name)
+            assert await todo_rep.populate_from_todo_list() is False
+
+            await todo_rep.connect_calendar()
+            assert await todo_rep.populate_from_todo_list(future_weeks=4) is True
+            assert 'COMPLETED' not in [todo.get_status() for todo in todo_rep.get_todos()]
+            assert len(todo_rep.get_todos()) == 3
+
+        # both the connection pool and the caldav client are closed
+        assert todo_rep.http.is_closed
+        assert closed == [True]
+
+    asyncio.run(run())
+    reports = [body for body in bodies if 'calendar-query' in body]
+    assert len(reports) == 1
+    assert 'time-range' in reports[0]
+
+
+def test_async_todo_repository_lazy_and_stats(todos_as_strings_in_list):
+    '''
+    Test that the async repository can create lazy TodoFacades and share
+    its stats like the TodoRepository.
+    '''
+    stats = TodoStats()
+    transport, _ = mock_server(todos_as_strings_in_list, [])
+
+    async def run():
+        async with AsyncTodoRepository(
+            {'NC_URI': BASE_URL, 'NC_CALENDAR': 'tasks'},
+            transport=transport,
+            lazy=True,
+            stats=stats
+        ) as todo_rep:
+            assert todo_rep.stats is stats
+            await todo_rep.connect_calendar()
+            assert await todo_rep.populate_from_todo_list() is True
+            assert all(todo.scanned is not None for todo in todo_rep.get_todos())
+            assert stats.scan_count == 4
+            assert stats.parse_count == 0
+
+    asyncio.run(run())
@@ -0,0 +1,49 @@
+from tododav.model import config_base
+from tododav.model.config import Config
+
+import os
+import yaml
+
+
+def test_config_read_only_loading(tmp_path, monkeypatch):
+    '''
+    Test that the config is only written on creation or when keys are
+    missing and that an unchanged file is not read again.
+    '''
+    config = Config(str(tmp_path))
+    assert os.path.exists(config.config_file)
+    assert config.get('NC_USER') == 'user_name'
+    mtime = os.stat(config.config_file).st_mtime_ns
+
+    saves = []
+    monkeypatch.setattr(Config, 'save', lambda self: saves.append(self) or True)
+    reads = []
+    original_safe_load = yaml.safe_load
+
+    def safe_load(stream):
+        reads.append(stream)
+        return original_safe_load(stream)
+
+    monkeypatch.setattr(config_base.yaml, 'safe_load', safe_load)
+
+    for _ in range(3):
+        assert Config(str(tmp_path)).get('NC_USER') == 'user_name'
+    assert saves == []
+    assert reads == []
+    assert os.stat(config.config_file).st_mtime_ns == mtime
+
+    # a changed file will be read again
+    with open(config.config_file, 'a') as file:
+        file.write('NC_USER: changed\n')
+    assert Config(str(tmp_path)).get('NC_USER') == 'changed'
+    assert len(reads) == 1
+    assert saves == []
+
+    # missing keys will be written
+    monkeypatch.undo()
+    with open(config.config_file, 'w') as file:
+        file.write('NC_USER: only_user\n')
+    config = Config(str(tmp_path))
+    assert config.get('NC_USER') == 'only_user'
+    with open(config.config_file) as file:
+        assert 'NC_CALENDAR' in file.read()
@@ -194,3 +194,104 @@ def test_todo_facade_rrule(todos_as_strings_in_list):
     todo = Todo(data=todos_as_strings_in_list[3])
     todo_facade = TodoFacade(todo)
     assert todo_facade.has_rrule() is True
+
+
+def test_todo_facade_dirty(todos_as_strings_in_list):
+    '''
+    Test that the setters mark the TodoFacade as modified.
+    '''
+    todo_facade = TodoFacade(Todo(data=todos_as_strings_in_list[1]))
+    assert todo_facade.is_dirty() is False
+
+    todo_facade.get_summary()
+    todo_facade.get_tags()
+    assert todo_facade.is_dirty() is False
+
+    todo_facade.set_due(date(2025, 5, 1))
+    assert todo_facade.is_dirty() is True
+
+    todo_facade.mark_clean()
+    todo_facade.complete()
+    assert todo_facade.is_dirty() is True
+
+    # adding a tag, which is already there, changes nothing
+    todo_facade.mark_clean()
+    todo_facade.add_tag('tag1')
+    assert todo_facade.is_dirty() is False
+    todo_facade.add_tag('tag2')
+    assert todo_facade.is_dirty() is True
+
+    # a new TodoFacade was never saved, so it is modified
+    assert TodoFacade(None, 'new task').is_dirty() is True
+
+
+def test_todo_facade_lazy(todos_as_strings_in_list):
+    '''
+    Test that a lazy TodoFacade gives the same values as a parsed one,
+    without parsing until it is modified.
+    '''
+    getters = (
+        'get_completed', 'get_priority', 'get_status', 'get_summary',
+        'get_tags', 'get_uid', 'has_due', 'has_rrule', 'is_done'
+    )
+    tricky = (
+        'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nBEGIN:VTODO\r\n'
+        'UID:tricky\r\nSUMMARY:a long\\, folded\r\n  summary\\nline\r\n'
+        'CATEGORIES:a,b\r\nCOMPLETED:20250401T120000Z\r\n'
+        'BEGIN:VALARM\r\nSUMMARY:alarm\r\nEND:VALARM\r\n'
+        'DUE:20250402T080000\r\nEND:VTODO\r\nEND:VCALENDAR\r\n'
+    )
+    for todo_str in todos_as_strings_in_list + [tricky]:
+        parsed = TodoFacade(Todo(data=todo_str))
+        lazy = TodoFacade(Todo(data=todo_str), lazy=True)
+        for getter in getters:
+            assert getattr(lazy, getter)() == getattr(parsed, getter)()
+        if parsed.has_due():
+            assert lazy.get_due() == parsed.get_due()
+        assert lazy.scanned is not None
+        assert lazy.caldav_todo._icalendar_instance is None
+        assert lazy.caldav_todo._vobject_instance is None
+
+    lazy = TodoFacade(Todo(data=tricky), lazy=True)
+    assert lazy.get_summary() == 'a long, folded summary\nline'
+    assert lazy.get_tags() == ['a', 'b']
+
+    # modifying parses the data
+    lazy.set_priority(3)
+    assert lazy.scanned is None
+    assert lazy.get_priority() == 3
+
+    # a due date with a TZID is left to the full parse
+    with_tzid = todos_as_strings_in_list[1].replace(
+        'DUE;VALUE=DATE:20250408', 'DUE;TZID=Europe/Berlin:20250408T100000'
+    )
+    assert TodoFacade(Todo(data=with_tzid), lazy=True).scanned is None
+
+
+def test_todo_facade_no_reparse(todos_as_strings_in_list):
+    '''
+    Test that the getters and setters work on one parsed representation
+    and do not parse the data again and again.
+    '''
+    todo_facade = TodoFacade(Todo(data=todos_as_strings_in_list[3]))
+    for _ in range(3):
+        str(todo_facade)
+        todo_facade.get_uid()
+        todo_facade.get_completed()
+        todo_facade.has_rrule()
+    assert todo_facade.parse_count == 1
+
+    todo_facade.set_summary('changed')
+    todo_facade.add_tag('tag5')
+    todo_facade.complete(datetime(2025, 5, 4))
+    assert todo_facade.get_summary() == 'changed'
+    assert todo_facade.get_tags() == ['tag4', 'tag5']
+    assert todo_facade.is_done() is True
+    assert todo_facade.parse_count == 1
+
+    # the cached values are cleared by the setters
+    todo_facade.remove_tag('tag4')
+    todo_facade.remove_tag('tag5')
+    assert todo_facade.has_tags() is False
+    assert 'CATEGORIES' not in todo_facade.caldav_todo.data
+    assert 'SUMMARY:changed' in todo_facade.caldav_todo.data
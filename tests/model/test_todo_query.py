@@ -0,0 +1,99 @@
+from tododav.model.todo.todo_repository import TodoRepository
+
+from datetime import date
+
+import pytest
+
+
+def test_todo_query_chaining(todos_as_todo_in_list):
+    '''
+    Test that the chained conditions give the same tasks as the filter
+    methods of the repository and that nothing runs before iterating.
+    '''
+    todo_rep = TodoRepository()
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list)
+    todos = todo_rep.get_todos()
+
+    calls = []
+    query = todo_rep.query().where(lambda todo: calls.append(todo) or True)
+    assert calls == []
+    assert query.all() == todos
+
+    assert todo_rep.query().due_between('2025-04-01', '2025-04-30').all() \
+        == todo_rep.get_todos_by_daterange('2025-04-01', '2025-04-30')
+    assert todo_rep.query().tags('tag1').tags('tag2', exclude=True).all() == [todos[1]]
+    assert todo_rep.query().tags(['tag1', 'tag2'], match_all=True).all() == [todos[0]]
+    assert todo_rep.query().status('COMPLETED', exclude=True).tags('tag2').all() \
+        == [todos[2]]
+    assert todo_rep.query().due_between('2025-04-01').due_between('', '2025-04-30') \
+        .count() == 2
+
+    # every chained method returns a new query
+    base = todo_rep.query().tags(['tag1', 'tag4'])
+    assert base.status('COMPLETED').all() == [todos[0]]
+    assert base.all() == [todos[0], todos[1], todos[3]]
+
+    # tasks outside of the collection are checked with their own values
+    query = TodoRepository().query().due_between('2025-04-01', '2025-04-30').tags('tag1')
+    assert [query.matches(todo) for todo in todos] == [True, True, False, False]
+
+
+def test_todo_query_planning(todos_as_todo_in_list):
+    '''
+    Test that the planner starts from the most selective index.
+    '''
+    todo_rep = TodoRepository()
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list)
+    todos = todo_rep.get_todos()
+
+    assert todo_rep.query().status('COMPLETED').explain() == 'scan'
+    assert todo_rep.query().due_between('2025-04-01').explain() == 'due_index'
+    assert todo_rep.query().tags('tag4').explain() == 'tag_index'
+    # three tasks are due in the range, but only one has the tag
+    query = todo_rep.query().due_between('2025-04-01').tags('tag4')
+    assert query.explain() == 'tag_index'
+    assert query.all() == [todos[3]]
+    # excluded tags cannot drive the query
+    assert todo_rep.query().tags('tag4', exclude=True).explain() == 'scan'
+
+    # the index follows changes
+    todos[1].set_due(date(2025, 5, 1))
+    assert todo_rep.query().due_between('2025-05-01').tags('tag1').all() == [todos[1]]
+
+
+def test_todo_query_order_and_limit(todos_as_todo_in_list):
+    '''
+    Test the sorting and the limit.
+    '''
+    todo_rep = TodoRepository()
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list)
+    todos = todo_rep.get_todos()
+
+    assert todo_rep.query().order_by('due').all() == [todos[0], todos[1], todos[3], todos[2]]
+    assert todo_rep.query().order_by('due', reverse=True).all() \
+        == [todos[3], todos[1], todos[0], todos[2]]
+    assert todo_rep.query().due_between('2025-04-01').order_by('due').limit(2).all() \
+        == [todos[0], todos[1]]
+    assert todo_rep.query().order_by('priority', reverse=True).limit(2).all() \
+        == [todos[1], todos[3]]
+    assert todo_rep.query().order_by(lambda todo: todo.get_summary(), reverse=True).first() \
+        == todos[2]
+    assert todo_rep.query().limit(3).limit(1).all() == [todos[0]]
+    assert todo_rep.query().tags('tag9').first() is None
+
+    with pytest.raises(ValueError):
+        todo_rep.query().order_by('location')
+
+
+def test_todo_query_records(todos_as_todo_in_list):
+    '''
+    Test that the TodoRecords can be queried the same way.
+    '''
+    todo_rep = TodoRepository()
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list)
+    records = todo_rep.get_records()
+
+    found = records.query().due_between('2025-04-01').tags('tag1').order_by('due').all()
+    assert [record.get_summary() for record in found] == [
+        'a test task', 'another test task'
+    ]
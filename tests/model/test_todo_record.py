@@ -0,0 +1,83 @@
+from tododav.model.todo.todo_facade import TodoFacade
+from tododav.model.todo.todo_record import TodoRecord
+from tododav.model.todo.todo_repository import TodoRepository
+from caldav.objects import Todo
+
+from datetime import date
+
+import tracemalloc
+
+
+def test_todo_record_from_facade(todos_as_strings_in_list):
+    '''
+    Test that a TodoRecord has the same values as its TodoFacade.
+    '''
+    for todo_str in todos_as_strings_in_list:
+        todo_facade = TodoFacade(Todo(data=todo_str))
+        record = TodoRecord.from_facade(todo_facade)
+        assert str(record) == str(todo_facade)
+        assert record.get_uid() == todo_facade.get_uid()
+        assert record.get_tags() == todo_facade.get_tags()
+        assert record.get_status() == todo_facade.get_status()
+        assert record.has_due() == todo_facade.has_due()
+        assert not hasattr(record, '__dict__')
+
+    record = TodoRecord.from_facade(TodoFacade(Todo(data=todos_as_strings_in_list[0])))
+    assert record.get_due() == date(2025, 4, 7)
+    assert record.tags[0] is TodoRecord.from_facade(
+        TodoFacade(Todo(data=todos_as_strings_in_list[1]))
+    ).tags[0]
+
+
+def test_todo_record_collection(todos_as_todo_in_list):
+    '''
+    Test that the TodoRecords can be filtered like the repository.
+    '''
+    todo_rep = TodoRepository()
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list)
+    records = todo_rep.get_records()
+    assert len(records) == 4
+
+    def uids(todos):
+        return [todo.get_uid() for todo in todos]
+
+    assert uids(records.get_todos_by_tags('tag2')) == uids(todo_rep.get_todos_by_tags('tag2'))
+    assert uids(records.get_todos_by_tags('tag1', True)) == uids(
+        todo_rep.get_todos_by_tags('tag1', True)
+    )
+    assert uids(records.get_todos_by_daterange('', '2025-04-08')) == uids(
+        todo_rep.get_todos_by_daterange('', '2025-04-08')
+    )
+    assert uids(records.get_todos_by_date('2025-05-03 10:45')) == uids(
+        todo_rep.get_todos_by_date('2025-05-03 10:45')
+    )
+    assert uids(records.get_todos_by_status('COMPLETED')) == uids(
+        todo_rep.get_todos_by_status('COMPLETED')
+    )
+    uid = todo_rep.get_todos()[2].get_uid()
+    record = records.get_todo_by_uid(uid)
+    assert record is not None
+    assert record.get_summary() == 'the third test task'
+
+
+def test_todo_record_memory(todos_as_strings_in_list):
+    '''
+    Test that a TodoRecord needs much less memory than a parsed TodoFacade.
+    '''
+    def allocated(create) -> int:
+        tracemalloc.start()
+        objects = [create(todos_as_strings_in_list[i % 4]) for i in range(200)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        assert len(objects) == 200
+        return size
+
+    def create_facade(todo_str):
+        todo_facade = TodoFacade(Todo(data=todo_str))
+        todo_facade.get_summary()
+        return todo_facade
+
+    def create_record(todo_str):
+        return TodoRecord.from_facade(TodoFacade(Todo(data=todo_str), lazy=True))
+
+    assert allocated(create_record) * 10 < allocated(create_facade)
@@ -1,6 +1,13 @@
+from tododav.model.todo.todo_collection import TodoCollection
+from tododav.model.todo.todo_facade import TodoFacade
 from tododav.model.todo.todo_repository import TodoRepository
+from caldav.lib import error
+from caldav.objects import Calendar, Todo
 
-from datetime import date, datetime
+from types import SimpleNamespace
+from datetime import date, datetime, timedelta
+
+import pytest
 
 
 def test_todo_repository_init(todos_as_todo_in_list):
@@ -113,3 +120,558 @@ def test_todo_repository_add_todo():
     assert todos[0].has_tags() is False
     assert todos[1].has_tags() is True
     assert todos[1].get_tags() == ['tag1', 'tag2']
+
+
+def test_todo_repository_sync(fake_calendar, todos_as_strings_in_list):
+    '''
+    Test the incremental sync with a sync-token.
+    '''
+    calendar = fake_calendar(3)
+    todo_rep = TodoRepository({'NC_URI': calendar.url})
+    todo_rep.calendar = calendar
+
+    # the first sync is a full sync
+    assert todo_rep.sync() is True
+    assert len(todo_rep.get_todos()) == 3
+    assert todo_rep.sync_token == '3'
+    first_task = todo_rep.get_todo_by_uid('93cf66e2-9a70-4a7b-b350-0feddb9cf37a')
+    assert first_task is not None
+
+    # nothing changed, so nothing should be fetched
+    multiget_count = calendar.multiget_count
+    assert todo_rep.sync() is True
+    assert calendar.multiget_count == multiget_count
+
+    # change, add and delete a task on the "server"
+    calendar.put(
+        'task0.ics',
+        todos_as_strings_in_list[0].replace('a test task', 'a changed task')
+    )
+    calendar.put('task3.ics', todos_as_strings_in_list[3])
+    calendar.remove('task1.ics')
+    assert todo_rep.sync() is True
+    summaries = [todo.get_summary() for todo in todo_rep.get_todos()]
+    assert summaries == [
+        'a changed task', 'the third test task', 'the fourth test task'
+    ]
+    # the changed task was patched in place
+    assert first_task.get_summary() == 'a changed task'
+
+    # an invalidated token will fall back to a full sync
+    calendar.remove('task2.ics')
+    todo_rep.sync_token = 'invalid'
+    assert todo_rep.sync() is True
+    summaries = [todo.get_summary() for todo in todo_rep.get_todos()]
+    assert summaries == ['a changed task', 'the fourth test task']
+
+
+def test_todo_repository_save_all(todos_as_todo_in_list, monkeypatch):
+    '''
+    Test that save_all() only saves the modified todos.
+    '''
+    todo_rep = TodoRepository()
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list)
+    todos = todo_rep.get_todos()
+    assert not any(todo.is_dirty() for todo in todos)
+
+    saved = []
+    for todo in todos_as_todo_in_list:
+        monkeypatch.setattr(todo, 'save', lambda todo=todo: saved.append(todo))
+
+    # nothing modified, nothing saved
+    assert todo_rep.save_all() == {}
+
+    todos[0].set_priority(3)
+    todos[2].add_tag('tag5')
+    assert todos[0].is_dirty() is True
+    assert todos[1].is_dirty() is False
+
+    results = todo_rep.save_all(max_workers=2)
+    assert results == {
+        todos[0].get_uid(): (True, None),
+        todos[2].get_uid(): (True, None)
+    }
+    assert len(saved) == 2
+    assert not any(todo.is_dirty() for todo in todos)
+
+    # a failing save is reported and the task stays dirty
+    def failing_save():
+        raise ConnectionError('offline')
+
+    monkeypatch.setattr(todos_as_todo_in_list[1], 'save', failing_save)
+    todos[1].complete()
+    results = todo_rep.save_all()
+    assert results[todos[1].get_uid()][0] is False
+    assert isinstance(results[todos[1].get_uid()][1], ConnectionError)
+    assert todos[1].is_dirty() is True
+
+
+def test_todo_repository_multiple_calendars(fake_calendar, todos_as_strings_in_list):
+    '''
+    Test a repository with more than one calendar.
+    '''
+    tasks = fake_calendar(2, 'tasks')
+    work = fake_calendar(0, 'work')
+    work.put('work0.ics', todos_as_strings_in_list[3])
+
+    todo_rep = TodoRepository({
+        'NC_URI': tasks.url,
+        'NC_CALENDAR': ['tasks', 'work']
+    })
+    todo_rep.calendars = {'tasks': tasks, 'work': work}
+    todo_rep.calendar = tasks
+    assert todo_rep.get_calendar_names() == ['tasks', 'work']
+
+    # the merged result works with the normal filters
+    assert todo_rep.populate_from_todo_list() is True
+    assert len(todo_rep.get_todos()) == 3
+    filtered = todo_rep.get_todos_by_tags('tag4')
+    assert len(filtered) == 1
+    assert filtered[0].calendar_name == 'work'
+
+    # syncing works per calendar as well
+    assert todo_rep.sync() is True
+    assert todo_rep.sync_tokens == {'tasks': '2', 'work': '1'}
+    work.remove('work0.ics')
+    assert todo_rep.sync() is True
+    assert [todo.calendar_name for todo in todo_rep.get_todos()] == [
+        'tasks', 'tasks'
+    ]
+
+    with pytest.raises(ValueError):
+        todo_rep.add_todo('unknown calendar', calendar_name='private')
+
+
+def test_todo_repository_add_todos(fake_calendar, monkeypatch):
+    '''
+    Test the bulk creation with a failing upload in the middle.
+    '''
+    calendar = fake_calendar(0)
+    todo_rep = TodoRepository({'NC_URI': calendar.url})
+    todo_rep.calendar = calendar
+
+    uploaded = []
+
+    def save(self, *args, **kwargs):
+        if 'fails' in self.data:
+            raise ConnectionError('offline')
+        uploaded.append(self.icalendar_component['SUMMARY'])
+        return self
+
+    monkeypatch.setattr(Todo, 'save', save)
+    results = todo_rep.add_todos([
+        'first',
+        {'summary': 'fails', 'priority': 2},
+        {'summary': 'third', 'due': date(2025, 5, 1), 'tags': ['tag1']},
+        {'summary': 'unknown', 'calendar_name': 'private'}
+    ], max_workers=2)
+
+    assert [success for _, success, _ in results] == [True, False, True, False]
+    assert isinstance(results[1][2], ConnectionError)
+    assert results[3][0] is None and isinstance(results[3][2], ValueError)
+    assert sorted(uploaded) == ['first', 'third']
+
+    # only the uploaded tasks were added
+    assert [todo.get_summary() for todo in todo_rep.get_todos()] == ['first', 'third']
+    third = results[2][0]
+    assert third is not None
+    assert todo_rep.get_todos_by_tags('tag1') == [third]
+    assert third.get_due() == date(2025, 5, 1)
+    assert third.calendar_name == todo_rep.get_calendar_names()[0]
+
+    # without a calendar, the tasks are only added locally
+    todo_rep = TodoRepository()
+    results = todo_rep.add_todos(['a', 'b'])
+    assert all(success for _, success, _ in results)
+    assert len(todo_rep.get_todos()) == 2
+
+
+def test_todo_repository_delete_todos(fake_calendar, monkeypatch):
+    '''
+    Test the batched delete with If-Match ETags.
+    '''
+    calendar = fake_calendar()
+    todo_rep = TodoRepository({'NC_URI': calendar.url})
+    todo_rep.calendar = calendar
+    assert todo_rep.sync() is True
+
+    requests = []
+
+    def request(url, method='GET', body='', headers=None):
+        headers = headers or {}
+        requests.append((method, headers))
+        name = url.rsplit('/', 1)[-1]
+        if name not in calendar.resources:
+            status = 404
+        elif headers.get('If-Match') != calendar.resources[name][0]:
+            status = 412
+        else:
+            calendar.remove(name)
+            status = 204
+        return SimpleNamespace(status=status, reason='')
+
+    monkeypatch.setattr(todo_rep.client, 'request', request)
+
+    # the second task was changed on the server meanwhile
+    changed = sorted(calendar.resources)[1]
+    calendar.put(changed, calendar.resources[changed][1])
+    todos = todo_rep.get_todos()
+    uids = [todo.get_uid() for todo in todos]
+    results = todo_rep.delete_todos(uids[:2] + ['unknown'], max_workers=2)
+    assert results[todos[0]] == (True, None)
+    assert results[todos[1]][0] is False
+    assert isinstance(results[todos[1]][1], error.DeleteError)
+    assert results['unknown'] == (False, None)
+    assert all(method == 'DELETE' and headers['If-Match'] for method, headers in requests)
+    assert [todo.get_uid() for todo in todo_rep.get_todos()] == uids[1:]
+    assert todo_rep.get_todo_by_uid(uids[0]) is None
+
+    # by predicate and by query
+    results = todo_rep.delete_todos(lambda todo: not todo.has_due())
+    assert results == {todos[2]: (True, None)}
+    results = todo_rep.delete_todos(todo_rep.query().tags('tag4'))
+    assert results == {todos[3]: (True, None)}
+    assert todo_rep.get_todos_by_tags('tag4') == []
+    assert [todo.get_uid() for todo in todo_rep.get_todos()] == [uids[1]]
+
+    # tasks of another collection are skipped without any request
+    request_count = len(requests)
+    other = TodoCollection(todos)
+    results = todo_rep.delete_todos(other.query().tags('tag4'))
+    assert results == {todos[3]: (False, None)}
+    assert len(requests) == request_count
+    assert [todo.get_uid() for todo in todo_rep.get_todos()] == [uids[1]]
+
+
+def test_todo_repository_calendar_cache(fake_calendar, tmp_path, monkeypatch):
+    '''
+    Test that the discovered calendar URL is cached on disk and that a
+    stale URL is discovered again.
+    '''
+    calendar = fake_calendar()
+    config = {
+        'NC_URI': 'https://dav.example.org/',
+        'NC_USER': 'user',
+        'NC_CALENDAR': 'tasks',
+        'CALENDAR_CACHE': str(tmp_path / 'calendar_cache.json')
+    }
+    discoveries = []
+
+    def principal():
+        discoveries.append(1)
+        return SimpleNamespace(calendar=lambda name: calendar)
+
+    def connect(use_cache=True):
+        todo_rep = TodoRepository(config)
+        monkeypatch.setattr(todo_rep.client, 'principal', principal)
+        todo_rep.connect_calendar(use_cache)
+        return todo_rep
+
+    assert connect().calendar is calendar
+    assert len(discoveries) == 1
+
+    # the next repository goes straight to the cached calendar
+    with connect() as todo_rep:
+        assert len(discoveries) == 1
+        assert todo_rep.calendars_from_cache is True
+        assert str(todo_rep.calendar.url) == str(calendar.url)
+        assert todo_rep.calendar.client is todo_rep.client
+
+    # another user has its own cache entry
+    config['NC_USER'] = 'other'
+    connect()
+    assert len(discoveries) == 2
+
+    # a cached calendar, which is gone, is discovered again
+    def todos(self, include_completed=False):
+        raise error.NotFoundError('gone')
+
+    monkeypatch.setattr(Calendar, 'todos', todos)
+    todo_rep = connect()
+    assert todo_rep.calendars_from_cache is True
+    assert todo_rep.populate_from_todo_list() is True
+    assert len(discoveries) == 3
+    assert todo_rep.calendar is calendar
+    assert len(todo_rep.get_todos()) == 4
+
+
+def test_todo_repository_uid_index(todos_as_todo_in_list, monkeypatch):
+    '''
+    Test that the UID index stays consistent.
+    '''
+    todo_rep = TodoRepository()
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list)
+    uid = '93cf66e2-9a70-4a7b-b350-0feddb9cf37b'
+    assert todo_rep.get_todo_by_uid(uid) is todo_rep.todos[1]
+    assert len(todo_rep.todos_by_uid) == 4
+
+    # the same TodoFacade or another one with the same UID is not added twice
+    todo_rep.add_todo_facade(todo_rep.todos[1])
+    todo_rep.add_todo_facade(TodoFacade(Todo(data=todos_as_todo_in_list[1].data)))
+    assert len(todo_rep.get_todos()) == 4
+
+    # changing the UID updates the index
+    todo_rep.todos[1].set_uid('changed')
+    assert todo_rep.get_todo_by_uid(uid) is None
+    assert todo_rep.get_todo_by_uid('changed') is todo_rep.todos[1]
+
+    # deleting removes it from the list and the index
+    monkeypatch.setattr(todos_as_todo_in_list[1], 'delete', lambda: None)
+    assert todo_rep.delete_todo_by_uid('changed') is True
+    assert todo_rep.delete_todo_by_uid('changed') is False
+    assert todo_rep.get_todo_by_uid('changed') is None
+    assert len(todo_rep.get_todos()) == 3
+
+    # a removed TodoFacade does not update the index anymore
+    removed = TodoFacade(None, 'removed')
+    todo_rep.add_todo_facade(removed)
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list[:2])
+    removed.set_uid('removed')
+    assert todo_rep.get_todo_by_uid('removed') is None
+    assert len(todo_rep.todos_by_uid) == 2
+
+
+def test_todo_repository_duplicate_uids(todos_as_strings_in_list):
+    '''
+    Test that another TodoFacade with the same UID (e.g. the same task in
+    two calendars) takes over in the UID index, when the first one is
+    removed or gets another UID.
+    '''
+    todo_rep = TodoRepository()
+    todo_rep.populate_from_todo_list([
+        Todo(data=todos_as_strings_in_list[i]) for i in (0, 1, 0, 0)
+    ])
+    first, _, second, third = todo_rep.get_todos()
+    uid = first.get_uid()
+    assert todo_rep.get_todo_by_uid(uid) is first
+
+    todo_rep._remove_todo(first)
+    assert todo_rep.get_todo_by_uid(uid) is second
+
+    second.set_uid('changed')
+    assert todo_rep.get_todo_by_uid(uid) is third
+    assert todo_rep.get_todo_by_uid('changed') is second
+
+    todo_rep._remove_todos([third])
+    assert todo_rep.get_todo_by_uid(uid) is None
+    assert uid not in todo_rep._todos_with_uid
+
+
+def test_todo_repository_tag_index(todos_as_todo_in_list):
+    '''
+    Test the tag queries and that the tag index follows changes.
+    '''
+    todo_rep = TodoRepository()
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list)
+    todos = todo_rep.get_todos()
+
+    assert todo_rep.get_todos_by_tags(['tag1', 'tag4']) == [
+        todos[0], todos[1], todos[3]
+    ]
+    assert todo_rep.get_todos_by_tags(['tag1', 'tag2'], match_all=True) == [
+        todos[0]
+    ]
+    assert todo_rep.get_todos_by_tags(['tag1', 'tag2'], True, True) == todos[1:]
+    assert todo_rep.get_todos_by_tags('unknown') == []
+
+    todos[3].add_tag('tag1')
+    todos[0].remove_tag('tag1')
+    todos[2].set_tags(['tag1'])
+    assert todo_rep.get_todos_by_tags('tag1') == todos[1:]
+    assert todo_rep.get_todos_by_tags('tag2') == [todos[0]]
+    assert 'tag4' in todo_rep.tag_index.todos_by_tag
+
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list[:1])
+    assert 'tag4' not in todo_rep.tag_index.todos_by_tag
+
+
+def test_todo_repository_due_index(todos_as_todo_in_list):
+    '''
+    Test that the date filters return the tasks in due order and that
+    the due index follows changes.
+    '''
+    todo_rep = TodoRepository()
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list)
+    todos = todo_rep.get_todos()
+
+    # the third task has no due date
+    assert todo_rep.get_todos_by_date() == [todos[0], todos[1], todos[3]]
+    assert todo_rep.due_index.undated == {todos[2]}
+
+    todos[0].set_due(date(2025, 6, 1))
+    todos[2].set_due(date(2025, 4, 1))
+    todos[3].set_due(None)
+    assert todo_rep.get_todos_by_date() == [todos[2], todos[1], todos[0]]
+    assert todo_rep.get_todos_by_daterange('2025-04-02', '') == [todos[1], todos[0]]
+    assert todo_rep.get_todos_by_daterange('', date(2025, 4, 8)) == [
+        todos[2], todos[1]
+    ]
+    assert todo_rep.get_todos_by_date('2025-06-01') == [todos[0]]
+    assert todo_rep.get_todos_by_date('2025-06-01 10:00') == []
+    assert todo_rep.due_index.undated == {todos[3]}
+
+    todo_rep.todos = todos[:2]
+    assert todo_rep.get_todos_by_date() == [todos[1], todos[0]]
+
+
+def test_todo_repository_due_index_bulk(todos_as_todo_in_list):
+    '''
+    Test that the due index built in bulk when populating equals the one
+    built task by task, also for equal due dates and later single adds.
+    '''
+    todo_rep = TodoRepository()
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list * 2)
+    todos = todo_rep.get_todos()
+
+    todo_rep_single = TodoRepository()
+    for todo in todos_as_todo_in_list * 2:
+        todo_rep_single._append_todo(TodoFacade(todo))
+
+    bulk, single = todo_rep.due_index, todo_rep_single.due_index
+    assert bulk.keys == single.keys
+    assert bulk.keys == sorted(bulk.keys)
+    assert [todos.index(todo) for todo in bulk.todos] == [0, 4, 1, 5, 3, 7]
+    assert [bulk.keys_by_todo[todo] for todo in bulk.todos] == bulk.keys
+    assert bulk.undated == {todos[2], todos[6]}
+
+    new_todo = TodoFacade(todos_as_todo_in_list[0])
+    todo_rep._append_todo(new_todo)
+    assert bulk.todos[:3] == [todos[0], todos[4], new_todo]
+
+
+def test_todo_repository_populate_from_query(fake_calendar):
+    '''
+    Test the scoped population with filters, which are sent to the
+    server where possible and filtered on the client side as well.
+    '''
+    calendar = fake_calendar()
+    todo_rep = TodoRepository({'NC_URI': calendar.url})
+    todo_rep.calendar = calendar
+
+    def summaries():
+        return [todo.get_summary() for todo in todo_rep.get_todos()]
+
+    assert todo_rep.populate_from_query(tags='tag1', include_completed=False)
+    assert summaries() == ['another test task']
+    assert b'CATEGORIES' in calendar.queries[-1]
+    assert b'time-range' not in calendar.queries[-1]
+
+    # several tags in an any-of query can not be sent to the server
+    assert todo_rep.populate_from_query(tags=['tag1', 'tag4'])
+    assert summaries() == ['a test task', 'another test task', 'the fourth test task']
+    assert b'CATEGORIES' not in calendar.queries[-1]
+
+    assert todo_rep.populate_from_query('2025-04-08', date(2025, 5, 3), status='COMPLETED') is True
+    assert summaries() == []
+    assert todo_rep.populate_from_query('2025-04-08', date(2025, 5, 3))
+    assert summaries() == ['another test task', 'the fourth test task']
+    assert b'time-range' in calendar.queries[-1]
+
+    # a server without calendar-query support gets filtered locally
+    calendar.supports_query = False
+    assert todo_rep.populate_from_query(tags='tag2', status='COMPLETED')
+    assert summaries() == ['a test task']
+    assert todo_rep.get_todos_by_status('COMPLETED', True) == []
+
+
+def test_todo_repository_window(fake_calendar):
+    '''
+    Test the windowed loading with extending and prefetching windows.
+    '''
+    calendar = fake_calendar(0)
+    now = datetime.now()
+    for weeks in (-6, -3, 0, 2, 4, 8, 12):
+        due = (now + timedelta(weeks=weeks, hours=1)).strftime('%Y%m%dT%H%M%S')
+        calendar.put(f'week{weeks}.ics', (
+            'BEGIN:VCALENDAR\nVERSION:2.0\nBEGIN:VTODO\n'
+            f'UID:week{weeks}\nSUMMARY:week {weeks}\nDUE:{due}\n'
+            'END:VTODO\nEND:VCALENDAR\n'
+        ))
+    todo_rep = TodoRepository({'NC_URI': calendar.url})
+    todo_rep.calendar = calendar
+
+    def uids():
+        return sorted(todo.get_uid() for todo in todo_rep.get_todos())
+
+    def window():
+        assert todo_rep.window is not None
+        return todo_rep.window
+
+    # without future_weeks everything gets loaded
+    assert todo_rep.populate_from_todo_list() is True
+    assert len(uids()) == 7
+    assert todo_rep.window is None
+    assert todo_rep.extend_window(4) is False
+
+    assert todo_rep.populate_from_todo_list(future_weeks=3) is True
+    assert uids() == ['week0', 'week2']
+
+    assert todo_rep.extend_window(future_weeks=2, past_weeks=4) is True
+    assert uids() == ['week-3', 'week0', 'week2', 'week4']
+    # tasks, which are found again, will not be duplicated
+    todo_rep._merge_window(todo_rep._fetch_window(*window()))
+    assert uids() == ['week-3', 'week0', 'week2', 'week4']
+
+    # the neighbours are prefetched and used by extend_window()
+    assert todo_rep.populate_from_todo_list(future_weeks=3, prefetch_weeks=6) is True
+    for _, _, future in todo_rep._prefetched.values():
+        future.result()
+    query_count = len(calendar.queries)
+    todo_rep.extend_window(future_weeks=1)
+    assert len(calendar.queries) == query_count
+    assert uids() == ['week0', 'week2', 'week4', 'week8']
+    start, end = window()
+    assert end - start > timedelta(weeks=9)
+    todo_rep.extend_window(future_weeks=10)
+    assert uids() == ['week0', 'week12', 'week2', 'week4', 'week8']
+
+
+def test_todo_repository_iter_todos(
+    fake_calendar,
+    fake_report_adapter,
+    todos_as_strings_in_list
+):
+    '''
+    Test the streaming of tasks from an incrementally parsed response.
+    '''
+    calendar = fake_calendar(0)
+    todo_rep = TodoRepository({'NC_URI': calendar.url})
+    todo_rep.calendar = calendar
+    adapter = fake_report_adapter(
+        todo_rep.client, todos_as_strings_in_list * 100, calendar.url.path
+    )
+
+    todos = todo_rep.iter_todos()
+    first = next(todos)
+    assert first.get_summary() == 'a test task'
+    assert str(first.caldav_todo.url) == str(calendar.url.join('task0.ics'))
+    # the first task is there before the whole response was read
+    assert adapter.stream.tell() < len(adapter.body)
+    assert sum(1 for _ in todos) == 399
+    assert adapter.requests[0].method == 'REPORT'
+    assert todo_rep.get_todos() == []
+
+    done = list(todo_rep.iter_todos(lambda todo: todo.is_done()))
+    assert len(done) == 100
+    assert all(todo.get_summary() == 'a test task' for todo in done)
+
+
+def test_todo_repository_lazy(todos_as_todo_in_list):
+    '''
+    Test that the indexes and filters do not parse the tasks.
+    '''
+    todo_rep = TodoRepository(lazy=True)
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list)
+    assert todo_rep.get_todo_by_uid('93cf66e2-9a70-4a7b-b350-0feddb9cf37d') is not None
+    assert len(todo_rep.get_todos_by_daterange('2025-04-08', '')) == 2
+    assert len(todo_rep.get_todos_by_tags('tag1')) == 2
+    assert all(
+        todo.caldav_todo._icalendar_instance is None
+        and todo.caldav_todo._vobject_instance is None
+        for todo in todo_rep.get_todos()
+    )
+
+    # the lazy mode is opt-in
+    todo_rep = TodoRepository()
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list[:1])
+    assert todo_rep.get_todos()[0].scanned is None
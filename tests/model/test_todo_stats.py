@@ -0,0 +1,135 @@
+from tododav.model.todo.todo_repository import TodoRepository
+from tododav.model.todo.todo_stats import TodoStats, measure_filter
+
+import pytest
+
+
+def test_todo_stats_record():
+    '''
+    Test the summing up of the events and the hooks.
+    '''
+    stats = TodoStats()
+    events = []
+    stats.add_hook(lambda event, data: events.append((event, data['duration'])))
+
+    stats.record('request', kind='PUT', duration=0.5, bytes_sent=10, bytes_received=0, status=201)
+    stats.record('request', kind='PUT', duration=0.25, bytes_sent=5, status=412)
+    stats.record('request', kind='REPORT calendar-query', duration=1.0, bytes_received=100, status=207)
+    stats.record('xml', kind='REPORT calendar-query', duration=0.1)
+    stats.record('parse', duration=0.01)
+    stats.record('parse', duration=0.03, reparse=True)
+    stats.record('filter', name='TodoQuery.all', duration=0.2, count=3)
+
+    metrics = stats.as_dict()
+    assert metrics['requests']['PUT'] == {
+        'count': 2,
+        'duration': 0.75,
+        'xml_duration': 0.0,
+        'bytes_sent': 15,
+        'bytes_received': 0,
+        'errors': 1
+    }
+    assert metrics['requests']['REPORT calendar-query']['xml_duration'] == 0.1
+    assert (metrics['bytes_sent'], metrics['bytes_received']) == (15, 100)
+    assert metrics['parse'] == {'count': 2, 'duration': 0.04, 'reparses': 1, 'mean': 0.02}
+    assert metrics['filters']['TodoQuery.all'] == {'count': 1, 'duration': 0.2, 'found': 3}
+    assert stats.get_request_count() == 3
+    assert stats.get_request_count('PUT') == 2
+    assert len(events) == 7
+    assert events[0] == ('request', 0.5)
+
+    with pytest.raises(ValueError):
+        stats.record('unknown', duration=1.0)
+
+    stats.reset()
+    assert stats.get_request_count() == 0
+    assert stats.as_dict()['parse']['count'] == 0
+    assert len(stats.hooks) == 1
+
+
+def test_todo_stats_repository(dav_server):
+    '''
+    Test that the repository records its requests (like the server counts
+    them), the parsing of its tasks and its filters.
+    '''
+    events = []
+    server, todo_rep = dav_server()
+    todo_rep.lazy = True
+    todo_rep.stats.add_hook(lambda event, data: events.append(event))
+    todo_rep.connect_calendar()
+    assert todo_rep.sync() is True
+
+    stats = todo_rep.stats
+    for kind in ('PROPFIND', 'REPORT sync-collection', 'REPORT calendar-multiget'):
+        assert stats.get_request_count(kind) == server.counts[kind]
+    assert stats.bytes_received == server.bytes_sent
+    assert stats.bytes_sent == server.bytes_received
+    assert stats.requests['REPORT calendar-multiget']['xml_duration'] > 0
+    assert stats.scan_count == 4
+    assert stats.parse_count == 0
+
+    # the streamed requests are recorded as well
+    assert len(list(todo_rep.iter_todos())) == 4
+    assert stats.get_request_count('REPORT calendar-query') == 1
+    assert stats.bytes_received == server.bytes_sent
+
+    # a setter parses the lazy task and a switch to vobject parses it again
+    todo = todo_rep.get_todos()[0]
+    todo.set_priority(1)
+    todo.vobject
+    todo.set_priority(2)
+    assert (stats.parse_count, stats.reparse_count) == (2, 1)
+
+    todo_rep.get_todos_by_tags('tag1')
+    todo_rep.query().status('COMPLETED').count()
+    assert stats.filters['TodoCollection.get_todos_by_tags']['found'] == 2
+    assert stats.filters['TodoQuery.count']['count'] == 1
+
+    assert all(success for success, _ in todo_rep.save_all().values())
+    assert stats.get_request_count('PUT') == server.counts['PUT'] == 1
+    assert set(events) == {'request', 'xml', 'scan', 'parse', 'filter'}
+
+
+def test_todo_stats_shared(dav_server):
+    '''
+    Test that repositories can share their stats.
+    '''
+    server, todo_rep = dav_server()
+    second_rep = TodoRepository(todo_rep.config, stats=todo_rep.stats)
+    todo_rep.connect_calendar()
+    second_rep.connect_calendar()
+    assert todo_rep.stats is second_rep.stats
+    assert todo_rep.stats.get_request_count() == server.counts['PROPFIND'] == 4
+
+
+def test_todo_stats_nested_filters(fake_calendar):
+    '''
+    Test that only the outermost of nested filter calls is recorded.
+    '''
+    class Collection:
+        def __init__(self):
+            self.stats = TodoStats()
+
+        @measure_filter
+        def inner(self) -> list:
+            return [1, 2]
+
+        @measure_filter
+        def outer(self) -> list:
+            return self.inner() + self.inner()
+
+    collection = Collection()
+    assert collection.outer() == [1, 2, 1, 2]
+    assert collection.inner() == [1, 2]
+    filters = collection.stats.filters
+    assert filters['test_todo_stats_nested_filters.<locals>.Collection.outer']['count'] == 1
+    assert filters['test_todo_stats_nested_filters.<locals>.Collection.outer']['found'] == 4
+    assert filters['test_todo_stats_nested_filters.<locals>.Collection.inner']['count'] == 1
+
+    # the client-side filtering of a scoped population is one filter call
+    calendar = fake_calendar()
+    todo_rep = TodoRepository({'NC_URI': calendar.url})
+    todo_rep.calendar = calendar
+    assert todo_rep.populate_from_query(tags='tag1', include_completed=False)
+    assert list(todo_rep.stats.filters) == ['TodoQuery.all']
+    assert todo_rep.stats.filters['TodoQuery.all']['count'] == 1
@@ -0,0 +1,127 @@
+from tododav.model.todo.todo_collection import TodoCollection
+from tododav.model.todo.todo_repository import TodoRepository
+from tododav.model.todo.todo_store import TodoStore
+from tododav.model.todo.todo_facade import TodoFacade
+from caldav.objects import Todo
+
+from datetime import date
+
+
+def test_todo_store_write_and_query(tmp_path, todos_as_strings_in_list):
+    '''
+    Test writing TodoFacades into the store and querying them again.
+    '''
+    store = TodoStore(str(tmp_path / 'todos.sqlite'))
+    todos = [
+        TodoFacade(Todo(url=f'https://dav.example.org/task{i}.ics', data=todo_str))
+        for i, todo_str in enumerate(todos_as_strings_in_list)
+    ]
+    store.write('tasks', todos, {}, ctag='ctag1', sync_token='token1')
+
+    assert store.get_state('tasks') == ('ctag1', 'token1')
+    assert store.get_state('unknown') == (None, None)
+    assert len(store.get_todos('tasks')) == 4
+
+    # the same filters as the repository, but answered by SQL
+    filtered_a = store.get_todos_by_tags('tasks', 'tag2')
+    assert [todo.get_summary() for todo in filtered_a] == [
+        'a test task', 'the third test task'
+    ]
+    filtered_b = store.get_todos_by_tags('tasks', 'tag1', True)
+    assert [todo.get_summary() for todo in filtered_b] == [
+        'the third test task', 'the fourth test task'
+    ]
+    filtered_c = store.get_todos_by_daterange(
+        'tasks', date(2025, 4, 8), date(2025, 5, 2)
+    )
+    assert [todo.get_summary() for todo in filtered_c] == ['another test task']
+
+    # an end date includes the whole day, like in the TodoCollection
+    filtered_d = store.get_todos_by_daterange('tasks', date(2025, 4, 1), date(2025, 4, 8))
+    collection = TodoCollection(todos)
+    assert [todo.get_summary() for todo in filtered_d] == [
+        todo.get_summary()
+        for todo in collection.get_todos_by_daterange(date(2025, 4, 1), date(2025, 4, 8))
+    ]
+    assert 'another test task' in [todo.get_summary() for todo in filtered_d]
+
+    # delete one and a second store on the same file sees the change
+    store.write('tasks', deleted=[todos[0].caldav_todo.canonical_url])
+    assert len(TodoStore(store.db_file).get_todos('tasks')) == 3
+
+
+def test_todo_store_warm_start(tmp_path, fake_calendar):
+    '''
+    Test a warm start of a TodoRepository from the store.
+    '''
+    calendar = fake_calendar(3)
+    store = TodoStore(str(tmp_path / 'todos.sqlite'))
+
+    # a cold start fetches everything and fills the store
+    todo_rep = TodoRepository({'NC_URI': calendar.url}, store)
+    todo_rep.calendar = calendar
+    assert todo_rep.populate_from_store() is True
+    assert len(todo_rep.get_todos()) == 3
+    assert calendar.multiget_count == 1
+
+    # a warm start with an unchanged ctag does not fetch anything
+    warm_rep = TodoRepository({'NC_URI': calendar.url}, store)
+    warm_rep.calendar = calendar
+    assert warm_rep.populate_from_store() is True
+    assert len(warm_rep.get_todos()) == 3
+    assert calendar.multiget_count == 1
+
+    # after a change, only the changed task gets fetched
+    calendar.remove('task1.ics')
+    warm_rep = TodoRepository({'NC_URI': calendar.url}, store)
+    warm_rep.calendar = calendar
+    assert warm_rep.populate_from_store() is True
+    assert len(warm_rep.get_todos()) == 2
+    assert len(store.get_todos(warm_rep._get_calendar_key(warm_rep.get_calendar_names()[0]))) == 2
+
+    # a plain sync keeps the stored ctag, so that the next warm start
+    # does not have to sync again
+    stored_ctag = store.get_state(warm_rep._get_calendar_key(warm_rep.get_calendar_names()[0]))[0]
+    assert stored_ctag is not None
+    assert warm_rep.sync() is True
+    assert store.get_state(warm_rep._get_calendar_key(warm_rep.get_calendar_names()[0]))[0] == stored_ctag
+
+
+def test_todo_store_accounts(tmp_path, fake_calendar):
+    '''
+    Test that equally named calendars of different servers or users do
+    not share their stored tasks.
+    '''
+    store = TodoStore(str(tmp_path / 'todos.sqlite'))
+    config = {'NC_URI': 'https://dav.example.org/', 'NC_CALENDAR': 'tasks'}
+    for user, calendar in (('alice', fake_calendar(3)), ('bob', fake_calendar(1))):
+        todo_rep = TodoRepository({**config, 'NC_USER': user}, store)
+        todo_rep.calendar = calendar
+        assert todo_rep.populate_from_store() is True
+
+    for user, count in (('alice', 3), ('bob', 1)):
+        todo_rep = TodoRepository({**config, 'NC_USER': user}, store)
+        assert todo_rep.populate_from_store(validate=False) is True
+        assert len(todo_rep.get_todos()) == count
+
+
+def test_todo_store_freshness(tmp_path, fake_calendar):
+    '''
+    Test that a sync and a validation mark the store as checked.
+    '''
+    calendar = fake_calendar(3)
+    store = TodoStore(str(tmp_path / 'todos.sqlite'))
+    todo_rep = TodoRepository({'NC_URI': str(calendar.url)}, store)
+    todo_rep.calendar = calendar
+    calendar_key = todo_rep._get_calendar_key(todo_rep.get_calendar_names()[0])
+    assert store.get_checked(calendar_key) is None
+    assert todo_rep.is_store_fresh(300) is False
+
+    assert todo_rep.populate_from_store() is True
+    assert todo_rep.is_store_fresh(300) is True
+
+    store.set_checked(calendar_key, 0.0)
+    assert todo_rep.is_store_fresh(300) is False
+    assert todo_rep.populate_from_store() is True
+    assert (store.get_checked(calendar_key) or 0.0) > 0.0
+    assert TodoRepository({'NC_URI': calendar.url}).is_store_fresh(300) is False
@@ -0,0 +1,189 @@
+from tododav.model.todo.todo_facade import TodoFacade
+from tododav.model.todo.todo_repository import TodoRepository
+from tododav.model.todo.todo_store import TodoStore
+from caldav.lib import error
+from caldav.objects import Todo
+
+import json
+import time
+
+
+def test_end_to_end_connect_and_populate(dav_server):
+    '''
+    Test the discovery, the cached discovery and a full population
+    against the stand-in server.
+    '''
+    server, todo_rep = dav_server()
+    todo_rep.connect_calendar()
+    assert server.counts['PROPFIND'] == 4
+    assert todo_rep.populate_from_todo_list() is True
+    assert len(todo_rep.get_todos()) == 4
+    assert server.counts['REPORT calendar-query'] == 1
+    assert todo_rep.get_todos_by_tags('tag4')[0].get_summary() == 'the fourth test task'
+
+    # the second start goes straight to the cached calendar
+    server.reset_counts()
+    second_rep = TodoRepository(todo_rep.config)
+    second_rep.connect_calendar()
+    assert server.counts['PROPFIND'] == 0
+    assert second_rep.populate_from_todo_list() is True
+    assert len(second_rep.get_todos()) == 4
+
+
+def test_end_to_end_sync(dav_server, todos_as_strings_in_list):
+    '''
+    Test that sync() only fetches the changed tasks.
+    '''
+    server, todo_rep = dav_server()
+    todo_rep.connect_calendar()
+    assert todo_rep.sync() is True
+    assert len(todo_rep.get_todos()) == 4
+    assert server.counts['REPORT sync-collection'] == 1
+    assert server.counts['REPORT calendar-multiget'] == 1
+
+    calendar = server.calendars['tasks']
+    names = sorted(calendar.resources)
+    calendar.put(names[0], todos_as_strings_in_list[0].replace('a test task', 'changed'))
+    calendar.remove(names[1])
+    server.reset_counts()
+    assert todo_rep.sync() is True
+    assert server.counts['REPORT sync-collection'] == 1
+    assert server.counts['REPORT calendar-multiget'] == 1
+    assert server.counts['REPORT calendar-query'] == 0
+    assert sorted(todo.get_summary() for todo in todo_rep.get_todos()) == [
+        'changed', 'the fourth test task', 'the third test task'
+    ]
+
+
+def test_end_to_end_save_and_delete(dav_server):
+    '''
+    Test the bulk creation, the saving and the deletion with ETags and
+    injected failures.
+    '''
+    server, todo_rep = dav_server()
+    todo_rep.connect_calendar()
+    assert todo_rep.sync() is True
+
+    # caldav retries a failed PUT once
+    server.fail_next(2, kind='PUT')
+    results = todo_rep.add_todos(['one', 'two', 'three'], max_workers=1)
+    assert [success for _, success, _ in results] == [False, True, True]
+    assert isinstance(results[0][2], error.PutError)
+    assert server.counts['PUT'] == 4
+    assert len(server.calendars['tasks'].resources) == 6
+
+    # only the modified task is saved
+    server.reset_counts()
+    todo_rep.get_todos()[0].set_priority(3)
+    assert all(success for success, _ in todo_rep.save_all().values())
+    assert server.counts['PUT'] == 1
+
+    # a task changed on the server meanwhile is not deleted
+    todos = todo_rep.get_todos()[1:3]
+    uids = [todo.get_uid() for todo in todos]
+    calendar = server.calendars['tasks']
+    name = f'{uids[0]}.ics'
+    calendar.put(name, calendar.resources[name][1])
+    results = todo_rep.delete_todos(uids)
+    assert results[todos[0]][0] is False
+    assert isinstance(results[todos[0]][1], error.DeleteError)
+    assert results[todos[1]] == (True, None)
+    assert f'{uids[1]}.ics' not in calendar.resources
+    assert server.counts['DELETE'] == 2
+
+
+def test_end_to_end_query_and_stream(dav_server):
+    '''
+    Test the server-side filtered population and the streaming.
+    '''
+    server, todo_rep = dav_server()
+    todo_rep.connect_calendar()
+
+    server.reset_counts()
+    assert todo_rep.populate_from_query(tags=['tag1']) is True
+    assert sorted(todo.get_summary() for todo in todo_rep.get_todos()) == [
+        'a test task', 'another test task'
+    ]
+    filtered_bytes = server.bytes_sent
+
+    server.reset_counts()
+    assert len(list(todo_rep.iter_todos())) == 4
+    assert server.counts['REPORT calendar-query'] == 1
+    assert server.bytes_sent > filtered_bytes
+
+
+def test_end_to_end_concurrency(dav_server):
+    '''
+    Test that the bulk creation runs its uploads concurrently.
+    '''
+    latency = 0.05
+    server, todo_rep = dav_server(latency=latency)
+    todo_rep.connect_calendar()
+
+    start = time.perf_counter()
+    results = todo_rep.add_todos([f'task {i}' for i in range(16)], max_workers=8)
+    elapsed = time.perf_counter() - start
+    assert all(success for _, success, _ in results)
+    assert server.counts['PUT'] == 16
+    # sequential uploads would take at least 16 * latency
+    assert elapsed < 16 * latency * 0.75
+
+
+def test_end_to_end_moved_calendar(dav_server, tmp_path):
+    '''
+    Test that the requests discover a moved calendar again, when its
+    cached URL is not found anymore.
+    '''
+    server, todo_rep = dav_server()
+    todo_rep.connect_calendar()
+    store = TodoStore(str(tmp_path / 'todos.sqlite'))
+    todo_rep.store = store
+    assert todo_rep.sync() is True
+    calendar = server.calendars['tasks']
+
+    def moved_rep() -> TodoRepository:
+        # the cache points to the old URL of the calendar
+        cache_file = todo_rep.config['CALENDAR_CACHE']
+        with open(cache_file) as f:
+            cache = json.load(f)
+        with open(cache_file, 'w') as f:
+            json.dump({
+                key: url.replace('/tasks/', '/old/') for key, url in cache.items()
+            }, f)
+        moved = TodoRepository(todo_rep.config, store=store)
+        moved.connect_calendar()
+        assert moved.calendars_from_cache is True
+        return moved
+
+    moved = moved_rep()
+    assert len(list(moved.iter_todos())) == 4
+    assert moved.calendars_from_cache is False
+
+    moved = moved_rep()
+    assert moved.add_todo('first').calendar_name == 'tasks'
+    assert moved.calendars_from_cache is False
+    moved = moved_rep()
+    results = moved.add_todos(['second', 'third'])
+    assert all(success for _, success, _ in results)
+    assert moved.calendars_from_cache is False
+    assert len(calendar.resources) == 7
+
+    moved = moved_rep()
+    assert moved.populate_from_store() is True
+    assert moved.calendars_from_cache is False
+    assert len(moved.get_todos()) == 7
+
+    # a task with an URL of the old calendar
+    moved = moved_rep()
+    name = sorted(calendar.resources)[0]
+    moved.add_todo_facade(TodoFacade(Todo(
+        moved.client,
+        url=f'{server.url}calendars/user/old/{name}',
+        data=calendar.resources[name][1],
+        parent=moved.calendar
+    )))
+    moved.get_todos()[0].calendar_name = 'tasks'
+    results = moved.delete_todos([moved.get_todos()[0].get_uid()])
+    assert list(results.values()) == [(True, None)]
+    assert moved.calendars_from_cache is False
+    assert name not in calendar.resources
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+
+
+IMPORT_BUDGET_US = 50000
+'''
+The maximum cumulative import time of "import tododav" in microseconds.
+'''
+
+HEAVY_MODULES = (
+    'caldav', 'dateutil', 'httpx', 'icalendar', 'lxml', 'requests', 'vobject',
+    'yaml'
+)
+'''
+Modules, which must not be imported by "import tododav" alone.
+'''
+
+
+def import_times(*args: str) -> dict[str, int]:
+    '''
+    Run Python with "-X importtime" and the given arguments and return
+    the cumulative import time in microseconds per imported module.
+    '''
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', *args],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True
+    )
+    out = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        out[name.strip()] = int(cumulative)
+    return out
+
+
+def test_import_tododav_is_lazy():
+    '''
+    Test that "import tododav" defers the heavy dependencies and stays
+    within the startup time budget.
+    '''
+    baseline = set(import_times('-c', 'pass'))
+    times = import_times('-c', 'import tododav')
+    imported = set(times) - baseline
+    assert not [
+        name for name in imported
+        if name.split('.')[0] in HEAVY_MODULES
+    ]
+    assert times['tododav'] < IMPORT_BUDGET_US
+
+    # the classes are still there on first use
+    times = import_times('-c', 'from tododav import TodoFacade')
+    assert 'caldav' in times or 'caldav' in baseline
+
+
+def test_main_without_command_is_lazy():
+    '''
+    Test that "python -m tododav" imports nothing heavy without a command.
+    '''
+    baseline = set(import_times('-c', 'pass'))
+    imported = set(import_times('-m', 'tododav')) - baseline
+    assert not [
+        name for name in imported
+        if name.split('.')[0] in HEAVY_MODULES
+    ]
@@ -0,0 +1,145 @@
+from tododav.model.todo.todo_repository import TodoRepository
+from tododav.model.todo.todo_store import TodoStore
+from tododav.utils import list_utils
+
+from datetime import date, timedelta
+
+import io
+import json
+import pytest
+
+
+def run_list(todo_rep, args: list[str]) -> str:
+    '''
+    Run the list command with the given repository and arguments and
+    return the output.
+    '''
+    stream = io.StringIO()
+    options = list_utils.build_parser().parse_args(args)
+    assert list_utils.list_todos(todo_rep, options, stream) == 0
+    return stream.getvalue()
+
+
+def test_list_from_cache(dav_server, tmp_path):
+    '''
+    Test that a fresh cache is listed without any request and that an
+    outdated one is validated against the server.
+    '''
+    store = TodoStore(str(tmp_path / 'todos.sqlite'))
+    server, todo_rep = dav_server()
+    todo_rep.store = store
+    lines = run_list(todo_rep, ['-f', 'ndjson']).splitlines()
+    assert [json.loads(line)['summary'] for line in lines] == [
+        'a test task', 'another test task', 'the third test task', 'the fourth test task'
+    ]
+    assert server.counts['REPORT sync-collection'] == 1
+
+    server.reset_counts()
+    todo_rep = TodoRepository(todo_rep.config, store=store)
+    assert todo_rep.is_store_fresh(300)
+    assert len(run_list(todo_rep, ['-f', 'compact']).splitlines()) == 4
+    assert sum(server.counts.values()) == 0
+
+    # an outdated cache is validated and synced
+    calendar = server.calendars['tasks']
+    calendar.remove(sorted(calendar.resources)[0])
+    todo_rep = TodoRepository(todo_rep.config, store=store)
+    assert len(run_list(todo_rep, ['--max-age', '0', '-f', 'compact']).splitlines()) == 3
+    assert server.counts['REPORT sync-collection'] == 1
+    assert len(store.load(todo_rep._get_calendar_key('tasks'))) == 3
+
+
+def test_list_filters(dav_server, tmp_path):
+    '''
+    Test that the options map onto the filters of the repository.
+    '''
+    server, todo_rep = dav_server()
+    todo_rep.store = TodoStore(str(tmp_path / 'todos.sqlite'))
+    # the first run fills the cache
+    run_list(todo_rep, [])
+
+    def summaries(args: list[str]) -> list[str]:
+        return [
+            json.loads(line)['summary']
+            for line in run_list(todo_rep, args + ['-f', 'ndjson']).splitlines()
+        ]
+
+    assert summaries(['-t', 'tag1']) == ['a test task', 'another test task']
+    assert summaries(['-t', 'tag1', '-t', 'tag2', '--all-tags']) == ['a test task']
+    assert summaries(['-x', 'tag1', '-x', 'tag4']) == ['the third test task']
+    assert summaries(['--open', '-t', 'tag1']) == ['another test task']
+    assert summaries(['-s', 'COMPLETED']) == ['a test task']
+    assert summaries(['--from', '2025-04-08', '--to', '2025-05-03']) \
+        == ['another test task', 'the fourth test task']
+    assert summaries(['--due', '2025-04-07']) == ['a test task']
+    assert summaries(['-o', 'priority', '-r', '-n', '2']) \
+        == ['another test task', 'the fourth test task']
+
+
+def test_list_no_cache(dav_server):
+    '''
+    Test the listing of the streamed tasks instead of the cache.
+    '''
+    server, todo_rep = dav_server()
+    output = run_list(todo_rep, ['--no-cache', '-t', 'tag2', '-f', 'compact'])
+    assert output.splitlines() == [
+        'a test task: due=2025-04-07, priority=1, tags=[tag1,tag2], DONE',
+        'the third test task: tags=[tag2]'
+    ]
+    assert server.counts['REPORT calendar-query'] == 1
+    assert server.counts['REPORT sync-collection'] == 0
+    # the streamed tasks are not kept
+    assert todo_rep.get_todos() == []
+
+    output = run_list(
+        todo_rep, ['--no-cache', '-t', 'tag1', '-o', 'due', '-r', '-n', '1', '-f', 'compact']
+    )
+    assert output.splitlines() == ['another test task: due=2025-04-08, priority=5, tags=[tag1]']
+    output = run_list(todo_rep, ['--no-cache', '-n', '1', '-f', 'compact'])
+    assert output.splitlines() == [
+        'a test task: due=2025-04-07, priority=1, tags=[tag1,tag2], DONE'
+    ]
+
+
+def test_list_formats(todos_as_todo_in_list):
+    '''
+    Test the output formats.
+    '''
+    todo_rep = TodoRepository()
+    todo_rep.populate_from_todo_list(todos_as_todo_in_list)
+    todos = todo_rep.get_todos()
+
+    stream = io.StringIO()
+    list_utils.write_todos(todos[:2], 'table', stream)
+    assert stream.getvalue().splitlines() == [
+        'DUE              PRI STATUS       SUMMARY',
+        '2025-04-07         1 COMPLETED    a test task  [tag1,tag2]',
+        '2025-04-08         5              another test task  [tag1]'
+    ]
+
+    stream = io.StringIO()
+    list_utils.write_todos(todos, 'json', stream)
+    records = json.loads(stream.getvalue())
+    assert [record['summary'] for record in records] == [todo.get_summary() for todo in todos]
+    assert records[0]['due'] == '2025-04-07'
+    assert records[0]['tags'] == ['tag1', 'tag2']
+    assert records[2]['due'] is None
+
+    stream = io.StringIO()
+    list_utils.write_todos([], 'json', stream)
+    assert json.loads(stream.getvalue()) == []
+
+
+def test_list_parse_date():
+    '''
+    Test the date options.
+    '''
+    today = date.today()
+    assert list_utils.parse_date('today') == today
+    assert list_utils.parse_date('Tomorrow') == today + timedelta(days=1)
+    assert list_utils.parse_date('-7') == today - timedelta(days=7)
+    assert list_utils.parse_date('2025-05-01') == date(2025, 5, 1)
+    assert list_utils.parse_date('2025-05-01 10:00') == '2025-05-01 10:00'
+
+    with pytest.raises(SystemExit):
+        list_utils.build_parser().parse_args(['--due', '2025-05-01 10:00'])
@@ -0,0 +1,65 @@
+from tododav.utils import profile_utils
+
+import json
+
+
+def test_profile_cycle(dav_server):
+    '''
+    Test the measured phases, the round trips and the hotspots of the
+    profiled cycle.
+    '''
+    server, todo_rep = dav_server()
+    report = profile_utils.profile_cycle(todo_rep, top=5)
+
+    assert report['tasks'] == 4
+    assert list(report['phases']) == ['connect', 'populate', 'filters', 'save', 'total']
+    # nothing was modified, so nothing is written
+    assert [phase['requests'] for phase in report['phases'].values()] == [4, 1, 0, 0, 5]
+    assert report['phases']['total']['bytes_received'] == server.bytes_sent
+    assert server.counts['PUT'] == 0
+    assert report['stats']['filters']['TodoQuery.all']['count'] == 1
+    assert report['peak_memory'] > 0
+    assert len(report['hotspots']) == 5
+
+    text = profile_utils.format_report(report)
+    assert 'tododav profile: 4 tasks from {}'.format(server.url) in text
+    assert 'REPORT calendar-query' in text
+    assert 'top 5 hotspots (own time):' in text
+
+
+def test_profile_main(todos_as_strings_in_list, tmp_path, capsys):
+    '''
+    Test the command with a local directory of .ics files.
+    '''
+    for i, todo in enumerate(todos_as_strings_in_list):
+        (tmp_path / f'{i}.ics').write_text(todo)
+    (tmp_path / 'notes.txt').write_text('no task')
+
+    assert profile_utils.main([str(tmp_path), '--no-profile', '--save', '--json']) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report['tasks'] == 4
+    assert report['calendars'] == ['tasks']
+    assert report['phases']['save']['requests'] == 2
+    assert report['stats']['requests']['PUT']['errors'] == 0
+    assert 'hotspots' not in report
+
+
+def test_profile_put_unchanged(dav_server):
+    '''
+    Test that writing a task back puts the data of the server with its
+    ETag as If-Match, so that a change meanwhile is not overwritten.
+    '''
+    server, todo_rep = dav_server()
+    todo_rep.connect_calendar()
+    todo_rep.populate_from_todo_list()
+    todo = todo_rep.get_todos()[0]
+    calendar = server.calendars['tasks']
+    name = str(todo.caldav_todo.url).rsplit('/', 1)[1]
+
+    # someone else changed the task after it was fetched
+    changed = calendar.resources[name][1].replace('a test task', 'a changed task')
+    calendar.put(name, changed)
+    assert profile_utils.put_unchanged(todo_rep, todo) is True
+    assert server.counts['PUT'] == 1
+    # the client sends the iCalendar line endings
+    assert calendar.resources[name][1].replace('\r\n', '\n') == changed
@@ -1,14 +1,60 @@
 '''
 A CalDAV VTODO abstraction layer module.
 
+The classes will only be imported on their first use (PEP 562), so that
+"import tododav" does not pull in caldav, icalendar and friends, e.g.
+for "python -m tododav config" or short-lived scripts.
+
 Author: Manuel Senfft (www.tagirijus.de)
 '''
 
-from .model.todo.todo_facade import TodoFacade
-from .model.todo.todo_repository import TodoRepository
+from typing import TYPE_CHECKING
+
+import importlib
+
+if TYPE_CHECKING:
+    from .model.todo.async_todo_repository import AsyncTodoRepository
+    from .model.todo.todo_collection import TodoCollection
+    from .model.todo.todo_facade import TodoFacade
+    from .model.todo.todo_query import TodoQuery
+    from .model.todo.todo_record import TodoRecord
+    from .model.todo.todo_repository import TodoRepository
+    from .model.todo.todo_stats import TodoStats
+    from .model.todo.todo_store import TodoStore
+
+
+_LAZY_IMPORTS = {
+    'AsyncTodoRepository': '.model.todo.async_todo_repository',
+    'TodoCollection': '.model.todo.todo_collection',
+    'TodoFacade': '.model.todo.todo_facade',
+    'TodoQuery': '.model.todo.todo_query',
+    'TodoRecord': '.model.todo.todo_record',
+    'TodoRepository': '.model.todo.todo_repository',
+    'TodoStats': '.model.todo.todo_stats',
+    'TodoStore': '.model.todo.todo_store'
+}
 
 
 __all__ = [
+    'AsyncTodoRepository',
+    'TodoCollection',
     'TodoFacade',
-    'TodoRepository'
+    'TodoQuery',
+    'TodoRecord',
+    'TodoRepository',
+    'TodoStats',
+    'TodoStore'
 ]
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    # cache it, so that __getattr__ is not called again for this name
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -7,11 +7,23 @@ Author: Manuel Senfft (www.tagirijus.de)
 
 if __name__ == "__main__":
 
-    from .model.config import Config
-    from .utils import file_utils
     import sys
 
     command = sys.argv[1] if len(sys.argv) > 1 else None
     if command and command == 'config':
+        # only import, what the command needs, to keep the start fast
+        from .model.config import Config
+        from .utils import file_utils
+
         config = Config()
         file_utils.open_in_editor(config.config_file)
+
+    elif command and command == 'list':
+        from .utils import list_utils
+
+        sys.exit(list_utils.main(sys.argv[2:]))
+
+    elif command and command == 'profile':
+        from .utils import profile_utils
+
+        sys.exit(profile_utils.main(sys.argv[2:]))
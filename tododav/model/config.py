@@ -51,7 +51,8 @@ class Config(ConfigBase):
             'NC_CALENDAR',
             'calendar_name',
             [
-                'The NextCloud calendar name to use.'
+                'The NextCloud calendar name to use. It can also be a list',
+                'of calendar names, which will then be fetched in parallel.'
             ]
         )
 
@@ -6,6 +6,7 @@ for creating or updating the config and also for
 loading it, of course.
 '''
 
+import copy
 import os
 import yaml
 
@@ -15,6 +16,13 @@ class ConfigBase:
     The config class, which can modify the config.
     '''
 
+    LOADED_CONFIGS: dict[str, tuple[tuple[int, int], dict]] = {}
+    '''
+    The already loaded config files of this process: the path as the key
+    and the tuple (file stat key, user config) as the value. A file will
+    only be read again, if its modification time or size changed.
+    '''
+
     def __init__(
         self,
         program_name: str = 'PROGRAM',
@@ -82,16 +90,21 @@ class ConfigBase:
         # change the data_dir and all depending internals accordingly
         self.change_data_dir(data_dir)
 
-    def add_comments_on_config(self) -> bool:
+    def add_comments_on_config(self, config_file: str = '') -> bool:
         '''
         Add comments to the keys in the config, where comment
         strings exist.
 
+        Args:
+            config_file (str): \
+                The file to comment; the config file, if left blank. \
+                (default: `''`)
+
         Returns:
             bool: Returns True on success.
         '''
         try:
-            with open(self.config_file, 'r+') as file:
+            with open(config_file or self.config_file, 'r+') as file:
                 content = file.readlines()
                 file.seek(0)
                 first_line = True
@@ -166,15 +179,17 @@ class ConfigBase:
         and maybe update new keys with its defaults ot so.
         Also this method thus would create a new config
         for the programm on its first run.
-        '''
-        user_config = {}
 
-        # first load user config, if it exists
-        if os.path.exists(self.config_file):
-            with open(self.config_file, 'r') as yaml_file:
-                user_config = yaml.safe_load(yaml_file)
-        if not user_config:
+        The config file will only be written, if it does not exist yet
+        or if keys are missing in it. Otherwise loading is read-only and
+        an unchanged file will not even be read again in this process.
+        '''
+        user_config = self.load_user_config()
+        if user_config is None:
             user_config = {}
+            write = True
+        else:
+            write = False
 
         # set user config to the internal values
         for key, value in user_config.items():
@@ -184,8 +199,10 @@ class ConfigBase:
         for key, value in self.get_defaults().items():
             if key not in user_config:
                 self.set(key, value)
+                write = True
 
-        self.save()
+        if write:
+            self.save()
 
     def get(self, key: str) -> object:
         '''
@@ -249,6 +266,32 @@ class ConfigBase:
             output[key] = value['value']
         return output
 
+    def load_user_config(self) -> dict | None:
+        '''
+        Load the config file without writing anything. The result will
+        be cached for this process as long as the file does not change.
+
+        Returns:
+            dict | None: \
+                The config of the file (a copy, which can be changed) or \
+                None, if there is no config file yet.
+        '''
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+
+        cached = self.LOADED_CONFIGS.get(self.config_file)
+        if cached is None or cached[0] != stat_key:
+            with open(self.config_file, 'r') as yaml_file:
+                user_config = yaml.safe_load(yaml_file)
+            if not isinstance(user_config, dict):
+                user_config = {}
+            cached = (stat_key, user_config)
+            self.LOADED_CONFIGS[self.config_file] = cached
+        return copy.deepcopy(cached[1])
+
     def save(self) -> bool:
         '''
         Save the config.
@@ -260,14 +303,25 @@ class ConfigBase:
             if not os.path.exists(self.data_dir):
                 os.makedirs(self.data_dir)
 
-            with open(self.config_file, 'w') as file:
+            # write a temporary file first and replace the config with it,
+            # so that a parallel process never reads a half written config
+            temp_file = f'{self.config_file}.{os.getpid()}.tmp'
+            with open(temp_file, 'w') as file:
                 yaml.dump(
                     self.get_values(),
                     file,
                     default_flow_style=False,
                     allow_unicode=True
                 )
-            self.add_comments_on_config()
+            self.add_comments_on_config(temp_file)
+            os.replace(temp_file, self.config_file)
+
+            # the written values do not have to be read again
+            stat = os.stat(self.config_file)
+            self.LOADED_CONFIGS[self.config_file] = (
+                (stat.st_mtime_ns, stat.st_size),
+                copy.deepcopy(self.get_values())
+            )
             return True
         except Exception:
             return False
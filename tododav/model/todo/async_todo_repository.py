@@ -0,0 +1,530 @@
+'''
+AsyncTodoRepository class.
+
+An asyncio-native variant of the TodoRepository. It talks to the CalDAV
+server with one shared keep-alive httpx connection pool, so that many
+fetches, saves and deletes can be awaited concurrently on one event loop.
+The filtering API is the same as the one of the TodoRepository, since
+both share the TodoRepositoryBase. The blocking methods of the
+TodoRepository (sync(), populate_from_query(), ...) are not available
+here, so that nothing blocks the event loop.
+
+This needs the optional "httpx" dependency: pip install tododav[async]
+'''
+
+from tododav.model.todo.todo_facade import TodoFacade
+from tododav.model.todo.todo_repository_base import TodoRepositoryBase
+from tododav.model.todo.todo_stats import TodoStats
+
+from tododav.utils import dav_utils
+
+from caldav.elements import cdav, dav
+from caldav.lib import error
+from caldav.objects import Calendar, Todo
+from datetime import date, datetime, timedelta
+from typing import cast
+from urllib.parse import urljoin
+
+import asyncio
+import time
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class AsyncTodoRepository(TodoRepositoryBase):
+
+    MAX_CONNECTIONS = 10
+    '''
+    The default size of the shared HTTP connection pool and thus the
+    maximum number of concurrent requests.
+    '''
+
+    def __init__(
+        self,
+        config_dict: dict = {},
+        max_connections: int = MAX_CONNECTIONS,
+        transport=None,
+        lazy: bool = False,
+        stats: TodoStats | None = None
+    ):
+        '''
+        Initialize the AsyncTodoRepository and give an optional config dict.
+        Otherwise use the programs config. Use it as an async context
+        manager or call aclose() at the end to close the connection pool.
+
+        Args:
+            config_dict (dict): \
+                If not empty, use it's values to replace internal \
+                config values. (default: `{}`)
+            max_connections (int): \
+                The size of the keep-alive connection pool. (default: `10`)
+            transport (httpx.AsyncBaseTransport | None): \
+                An optional custom httpx transport. (default: `None`)
+            lazy (bool): \
+                If True, the loaded tasks will be wrapped into lazy \
+                TodoFacades, which only parse their iCalendar data when \
+                needed. (default: `False`)
+            stats (TodoStats | None): \
+                The metrics. A new TodoStats will be used, if not given; \
+                passing one allows to share it between repositories. \
+                (default: `None`)
+        '''
+        if httpx is None:
+            raise ImportError(
+                'AsyncTodoRepository needs httpx: pip install tododav[async]'
+            )
+        super().__init__(config_dict, lazy, stats)
+        self.http = httpx.AsyncClient(
+            auth=httpx.BasicAuth(
+                str(self.config['NC_USER']),
+                str(self.config['NC_PASSWORD'])
+            ),
+            headers={'Content-Type': 'text/xml; charset=utf-8'},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            transport=transport
+        )
+        self.calendar_urls: dict[str, str] = {}
+
+    @property
+    def calendar_url(self) -> str:
+        '''
+        The url of the first (default) calendar or '' if not connected.
+        '''
+        return self.calendar_urls.get(self.get_calendar_names()[0], '')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        '''
+        Close the shared HTTP connection pool and the session of the
+        caldav client, which the caldav objects of the tasks refer to.
+        '''
+        await self.http.aclose()
+        self.close()
+
+    async def add_todo(
+        self,
+        summary: str,
+        due: date | datetime | None = None,
+        priority: int = 0,
+        tags: list = [],
+        calendar_name: str = ''
+    ) -> TodoFacade:
+        '''
+        Create and add a new TodoFacade to the internal list and return
+        it. If the calendar is connected, the task will be saved
+        immediately.
+
+        Args:
+            summary (str): \
+                The summary.
+            due (date | datetime | None): \
+                The optional due date. (default: `None`)
+            priority (int): \
+                The optional priority between 0-9. (default: `0`)
+            tags (list): \
+                A list of tags. (default: `[]`)
+            calendar_name (str): \
+                The name of the calendar to add the task to. If left \
+                blank, the first configured calendar will be used. \
+                (default: `''`)
+
+        Returns:
+            TodoFacade: The newly added TodoFacade.
+        '''
+        calendar_name = calendar_name or self.get_calendar_names()[0]
+        if self.calendar_urls and calendar_name not in self.calendar_urls:
+            raise ValueError(f'Calendar "{calendar_name}" is not connected.')
+
+        new_todo_facade = TodoFacade(
+            None,
+            summary,
+            due,
+            'NEEDS-ACTION',
+            priority,
+            tags
+        )
+        new_todo_facade.calendar_name = calendar_name
+        if self.calendar_urls:
+            success, exception = await self.save_todo(new_todo_facade)
+            if not success and exception is not None:
+                raise exception
+        self._append_todo(new_todo_facade)
+        return new_todo_facade
+
+    async def connect_calendar(self):
+        '''
+        Connect to the online calendar(s) with the internal config: find
+        the principal, its calendar home and the calendars by their names.
+        '''
+        base_url = str(self.config['NC_URI'])
+
+        principal = await self._propfind_one(
+            base_url, [dav.CurrentUserPrincipal()]
+        )
+        principal_url = urljoin(
+            base_url, principal.get(dav.CurrentUserPrincipal.tag) or base_url
+        )
+
+        home = await self._propfind_one(principal_url, [cdav.CalendarHomeSet()])
+        home_url = urljoin(
+            principal_url, home.get(cdav.CalendarHomeSet.tag) or principal_url
+        )
+
+        names = self.get_calendar_names()
+        response = await self._request(
+            'PROPFIND',
+            home_url,
+            dav_utils.to_xml(
+                dav.Propfind() + (dav.Prop() + [dav.DisplayName(), dav.ResourceType()])
+            ),
+            {'Depth': '1'}
+        )
+        found = {}
+        for href, props in self._parse_multistatus(response):
+            if cdav.Calendar.tag not in (props.get(dav.ResourceType.tag) or []):
+                continue
+            calendar_id = href.rstrip('/').rsplit('/', 1)[-1]
+            for name in names:
+                if name in (props.get(dav.DisplayName.tag), calendar_id):
+                    found[name] = urljoin(home_url, href)
+
+        missing = [name for name in names if name not in found]
+        if missing:
+            raise error.NotFoundError(
+                'No calendar with name {} found in {}.'.format(
+                    ', '.join(missing), home_url
+                )
+            )
+
+        self.calendar_urls = {name: found[name] for name in names}
+        self.calendars = {
+            name: Calendar(client=self.client, url=url, name=name)
+            for name, url in self.calendar_urls.items()
+        }
+        self.calendar = self.calendars[names[0]]
+
+    async def delete_todo(self, todo: TodoFacade) -> tuple[bool, Exception | None]:
+        '''
+        Delete the given TodoFacade on the server (if the etag is known
+        only if it was not changed meanwhile) and remove it from the
+        internal list.
+
+        Args:
+            todo (TodoFacade): The TodoFacade to delete.
+
+        Returns:
+            tuple: Returns success tuple (bool, Exception | None).
+        '''
+        try:
+            url = todo.caldav_todo.url
+            if url is not None:
+                href = self._get_href(todo.caldav_todo)
+                headers = {}
+                if href in self.etags:
+                    headers['If-Match'] = self.etags[href]
+                response = await self._send('DELETE', str(url), headers=headers)
+                if response.status_code not in (200, 204, 404):
+                    raise error.DeleteError(
+                        f'{response.status_code} {response.reason_phrase}'
+                    )
+                self.etags.pop(href, None)
+            if todo in self._positions:
+                self._remove_todo(todo)
+            return (True, None)
+        except Exception as e:
+            return (False, e)
+
+    async def delete_todo_by_uid(self, uid: str) -> bool:
+        '''
+        Delete an internal TodoFacade by its uid.
+
+        Args:
+            uid (str): the UID of the todo entry.
+
+        Returns:
+            bool: Returns True, if task was found and deleted, otherwise False.
+        '''
+        todo = self.get_todo_by_uid(uid)
+        if todo is None:
+            return False
+        success, _ = await self.delete_todo(todo)
+        return success
+
+    async def populate_from_todo_list(
+        self,
+        todo_list: list[Todo] | None = None,
+        future_weeks: int = -1,
+        past_weeks: int = 1
+    ) -> bool:
+        '''
+        Initialize with a given todo list or, without one, with the VTODOs
+        of the connected calendars, which will be fetched concurrently with
+        one calendar-query REPORT per calendar.
+
+        With future_weeks only the not completed tasks in the window from
+        past_weeks ago until future_weeks from now will be loaded, like
+        with the TodoRepository. The window is sent to the server as a
+        time-range filter and the completed tasks are left out on the
+        client side.
+
+        Args:
+            todo_list (list[Todo] | None): \
+                A list containing Todo instances.
+            future_weeks (int): \
+                If above -1 this will set how many weeks in the future will be \
+                fetched from the todo repository.
+            past_weeks (int): \
+                How many weeks in the past will be fetched, if future_weeks \
+                is set. (default: `1`)
+
+        Returns:
+            bool: True on success.
+        '''
+        if todo_list is not None:
+            self._reset_sync_state()
+            self.todos = [self._to_facade(todo) for todo in todo_list]
+            return True
+        if not self.calendar_urls:
+            return False
+
+        filters = []
+        if future_weeks > -1:
+            now = datetime.now()
+            filters.append(cdav.TimeRange(
+                now - timedelta(weeks=past_weeks),
+                now + timedelta(weeks=future_weeks)
+            ))
+        responses = await asyncio.gather(*(
+            self._request(
+                'REPORT',
+                url,
+                dav_utils.build_todo_query(filters),
+                {'Depth': '1'}
+            )
+            for url in self.calendar_urls.values()
+        ))
+
+        self._reset_sync_state()
+        todo_facades = []
+        for (calendar_name, url), response in zip(
+            self.calendar_urls.items(), responses
+        ):
+            for href, props in self._parse_multistatus(response):
+                data = props.get(cdav.CalendarData.tag)
+                if not data:
+                    continue
+                todo = Todo(
+                    self.client,
+                    url=urljoin(url, href),
+                    data=data,
+                    parent=self.calendars.get(calendar_name)
+                )
+                todo_facade = self._to_facade(todo, calendar_name)
+                if filters and (
+                    todo_facade.get_status() in ('COMPLETED', 'CANCELLED')
+                    or todo_facade.get_completed() is not None
+                ):
+                    continue
+                etag = props.get(dav.GetEtag.tag)
+                if etag is not None:
+                    self.etags[self._get_href(todo)] = etag
+                todo_facades.append(todo_facade)
+        self.todos = todo_facades
+        return True
+
+    async def save_all(
+        self,
+        max_workers: int = MAX_CONNECTIONS
+    ) -> dict[str, tuple[bool, Exception | None]]:
+        '''
+        Save all modified (dirty) TodoFacades concurrently. Untouched ones
+        will be skipped.
+
+        Args:
+            max_workers (int): \
+                The maximum number of concurrent saves. (default: `10`)
+
+        Returns:
+            dict: \
+                The UID as the key and the success tuple \
+                (bool, Exception | None) as the value.
+        '''
+        dirty_todos = [todo for todo in self.todos if todo.is_dirty()]
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def save(todo: TodoFacade):
+            async with semaphore:
+                return await self.save_todo(todo)
+
+        results = await asyncio.gather(*(save(todo) for todo in dirty_todos))
+        return {
+            todo.get_uid(): result for todo, result in zip(dirty_todos, results)
+        }
+
+    async def save_todo(self, todo: TodoFacade) -> tuple[bool, Exception | None]:
+        '''
+        Save the given TodoFacade to the calendar with a PUT. A new task
+        will get an url inside its connected calendar.
+
+        Args:
+            todo (TodoFacade): The TodoFacade to save.
+
+        Returns:
+            tuple: Returns success tuple (bool, Exception | None).
+        '''
+        try:
+            caldav_todo = todo.caldav_todo
+            if caldav_todo.url is None:
+                calendar_name = todo.calendar_name or self.get_calendar_names()[0]
+                if calendar_name not in self.calendar_urls:
+                    raise error.PutError(f'Calendar "{calendar_name}" not connected.')
+                todo.calendar_name = calendar_name
+                todo.caldav_todo = Todo(
+                    self.client,
+                    url=urljoin(
+                        self.calendar_urls[calendar_name], todo.get_uid() + '.ics'
+                    ),
+                    data=caldav_todo.data,
+                    parent=self.calendars[calendar_name]
+                )
+                caldav_todo = todo.caldav_todo
+
+            response = await self._send(
+                'PUT',
+                str(caldav_todo.url),
+                caldav_todo.wire_data,
+                {'Content-Type': 'text/calendar; charset=utf-8'}
+            )
+            if response.status_code not in (200, 201, 204):
+                raise error.PutError(
+                    f'{response.status_code} {response.reason_phrase}'
+                )
+
+            href = self._get_href(caldav_todo)
+            if 'ETag' in response.headers:
+                self.etags[href] = response.headers['ETag']
+            else:
+                self.etags.pop(href, None)
+            todo.mark_clean()
+            return (True, None)
+        except Exception as e:
+            return (False, e)
+
+    def _parse_multistatus(self, response) -> list[tuple[str, dict]]:
+        '''
+        Parse the multistatus body of the given response (see
+        dav_utils.parse_multistatus()) and record the duration in the stats.
+
+        Args:
+            response (httpx.Response): The response.
+
+        Returns:
+            list[tuple[str, dict]]: A list with (href, props) tuples.
+        '''
+        start = time.perf_counter()
+        results = dav_utils.parse_multistatus(response.content)
+        self.stats.record(
+            'xml',
+            kind=dav_utils.get_request_kind(
+                response.request.method, response.request.content
+            ),
+            duration=time.perf_counter() - start
+        )
+        return results
+
+    async def _propfind_one(self, url: str, props: list) -> dict:
+        '''
+        Do a PROPFIND with depth 0 and return the found properties.
+
+        Args:
+            url (str): The url.
+            props (list): The caldav property elements.
+
+        Returns:
+            dict: The properties as a tag -> value dict.
+        '''
+        response = await self._request(
+            'PROPFIND',
+            url,
+            dav_utils.to_xml(dav.Propfind() + (dav.Prop() + props)),
+            {'Depth': '0'}
+        )
+        results = self._parse_multistatus(response)
+        return results[0][1] if results else {}
+
+    async def _request(self, method: str, url: str, body: bytes, headers: dict):
+        '''
+        Send a request with the shared HTTP client and raise a caldav
+        error for an unsuccessful response.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The url.
+            body (bytes): The request body.
+            headers (dict): Additional headers.
+
+        Returns:
+            httpx.Response: The response.
+        '''
+        response = await self._send(method, url, body, headers)
+        if response.status_code == 404:
+            raise error.NotFoundError(f'{method} {url}: 404')
+        if response.status_code >= 400:
+            exception_class = cast(
+                type[error.DAVError], error.exception_by_method[method.lower()]
+            )
+            raise exception_class(
+                f'{method} {url}: {response.status_code} {response.reason_phrase}'
+            )
+        return response
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        body: bytes = b'',
+        headers: dict | None = None
+    ):
+        '''
+        Send a request with the shared HTTP client and record it in the
+        stats.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The url.
+            body (bytes): The request body. (default: `b''`)
+            headers (dict | None): Additional headers. (default: `None`)
+
+        Returns:
+            httpx.Response: The response.
+        '''
+        status = None
+        received = 0
+        start = time.perf_counter()
+        try:
+            response = await self.http.request(
+                method, url, content=body, headers=headers
+            )
+            status = response.status_code
+            received = len(response.content)
+            return response
+        finally:
+            self.stats.record(
+                'request',
+                kind=dav_utils.get_request_kind(method, body),
+                duration=time.perf_counter() - start,
+                bytes_sent=len(body),
+                bytes_received=received,
+                status=status
+            )
@@ -0,0 +1,451 @@
+'''
+TodoCollection class.
+
+The base class of the TodoRepository, which holds a list of tasks with
+its indexes and provides the filter methods on it. The tasks can be
+TodoFacade instances or anything with the same getters (e.g. the
+read-only TodoRecord).
+'''
+
+from tododav.model.todo.todo_facade import TodoFacade
+from tododav.model.todo.todo_index import DueIndex, TagIndex
+from tododav.model.todo.todo_query import TodoQuery
+from tododav.model.todo.todo_record import TodoRecord
+from tododav.model.todo.todo_stats import TodoStats, measure_filter
+
+from tododav.utils import utils
+
+from datetime import date, datetime, timedelta
+from dateutil import tz
+from typing import Callable, Iterable, cast
+
+import math
+
+
+class TodoCollection:
+
+    def __init__(
+        self,
+        todos: Iterable[TodoFacade | TodoRecord] = (),
+        stats: TodoStats | None = None
+    ):
+        '''
+        A list of tasks with a UID index, a tag index and a due index,
+        which answer the filter methods.
+
+        Args:
+            todos (Iterable[TodoFacade | TodoRecord]): \
+                The initial tasks. (default: `()`)
+            stats (TodoStats | None): \
+                Optional metrics, which record the duration of the filter \
+                methods. (default: `None`)
+        '''
+        self.stats = stats
+        self._todos: list[TodoFacade] = []
+        self.todos_by_uid: dict[str, TodoFacade] = {}
+        self._todos_with_uid: dict[str, list[TodoFacade]] = {}
+        self._uids_by_todo: dict[int, str] = {}
+        self.tag_index = TagIndex()
+        self.due_index = DueIndex()
+        self._positions: dict[TodoFacade, int] = {}
+        self._next_position = 0
+        # the indexes and filters only use the getters, which a
+        # TodoRecord has as well
+        self._append_todos(cast(Iterable[TodoFacade], todos))
+
+    def __iter__(self):
+        return iter(self._todos)
+
+    def __len__(self) -> int:
+        return len(self._todos)
+
+    @property
+    def todos(self) -> list[TodoFacade]:
+        '''
+        The internal list of tasks. Assigning a new list rebuilds the
+        indexes; the list itself should not be modified directly, but
+        with the methods of the collection.
+        '''
+        return self._todos
+
+    @todos.setter
+    def todos(self, todos: list[TodoFacade]):
+        self._clear_todos()
+        self._append_todos(todos)
+
+    def get_todo_by_uid(self, uid: str) -> TodoFacade | None:
+        '''
+        Get a TodoFacade instance of the internal list by its UID.
+
+        Args:
+            uid (str): The UID so look for.
+
+        Returns:
+            TodoFacade | None: A TodoFacade instance or None, if nothing found.
+        '''
+        return self.todos_by_uid.get(uid)
+
+    def get_todos(self) -> list[TodoFacade]:
+        '''
+        Get the list of TodoFacade instances.
+
+        Returns:
+            list[Todofacades]: Returns the list of TodoFacades.
+        '''
+        return self.todos
+
+    @measure_filter
+    def get_todos_filtered(
+        self,
+        filter_func: Callable[[TodoFacade], bool]
+    ) -> list[TodoFacade]:
+        '''
+        Filter the internal list of TodoFacade objects with a given
+        callable filter function, which gets a TodoFacade as the first
+        parameter and returns a boolean. With that filter the internal
+        todos list and reutrn it filtered (in a non-destructive way).
+
+        Args:
+            filter_func (Callable): \
+                The callable filter function to be called on each TodoFacade item \
+                in the internal list to filter on. If it returns True, the item \
+                will be remain in the original list.
+
+        Returns:
+            list[TodoFacade]: Returns a list with TOdoFacade instances.
+        '''
+        out = self.todos.copy()
+        out = [
+            todo for todo in out if filter_func(todo)
+        ]
+        return out
+
+    @measure_filter
+    def get_todos_by_date(self, datetime_str: str = '') -> list[TodoFacade]:
+        '''
+        Filter by the given date / datetime. There can be a date like
+        "YYYY-MM-DD" or "YYYY-MM-DD HH:MM" or "YYYYMMDD" or "YYYYMMDDTHHMMZ".
+
+        If a datetime is given, the time has to be equal as well exactly! Otherwise
+        the check will only check for the day, even if the DUE date of the VTODO
+        would have a time.
+
+        The result is sorted by the due date.
+
+        Args:
+            datetime (str): Can be a date or datetime string. (default `''`)
+
+        Returns:
+            list[TodoFacade]: Returns a list with TodoFacade instances.
+        '''
+        exact_datetime = utils.string_to_datetime(datetime_str)
+        if exact_datetime is None:
+            return self.due_index.get_range()
+
+        # a datetime with just 00:00:00.000 time is basically just a date
+        is_basically_date = (
+            exact_datetime.hour == 0
+            and exact_datetime.minute == 0
+            and exact_datetime.second == 0
+            and exact_datetime.microsecond == 0
+        )
+        start = utils.to_timestamp(exact_datetime)
+        if is_basically_date:
+            end = utils.to_timestamp(exact_datetime.date() + timedelta(days=1))
+        else:
+            end = start + 1
+        return self.due_index.get_range(start, end)
+
+    @measure_filter
+    def get_todos_by_daterange(
+        self,
+        start: str | date | datetime = '',
+        end: str | date | datetime = ''
+    ) -> list[TodoFacade]:
+        '''
+        Filter by the given time range, given as a string, date or datetime.
+        As a string there can be a start and / or a end date(time) as "YYYY-MM-DD"
+        or "YYYY-MM-DD HH:MM" or "YYYYMMDD" or "YYYYMMDDTHHMMZ".
+
+        The filter logic for start is ">=", while the filter logic for the end is
+        only "<". Not sure why, but it feels intuitive to me. The result is
+        sorted by the due date.
+
+        Args:
+            start (str | date | datetime): \
+                The start date/datetime as a string. (default: `''`)
+            end (str | date | datetime): \
+                The end date/datetime as a string. (default: `''`)
+
+        Returns:
+            list[TodoFacade]: Returns a list with TodoFacade instances.
+        '''
+        start_datetime, end_datetime = self._to_range(start, end)
+        return self.due_index.get_range(
+            self._to_bound(start_datetime),
+            self._to_bound(end_datetime)
+        )
+
+    @measure_filter
+    def get_todos_by_status(
+        self,
+        status: str | list = '',
+        exclude: bool = False
+    ) -> list[TodoFacade]:
+        '''
+        Filter todos, which have the given status / one of the given
+        statuses, or do not have it (if exclude is True). Statuses are
+        e.g. "NEEDS-ACTION", "IN-PROCESS", "COMPLETED" or "CANCELLED".
+
+        Args:
+            status (str | list): \
+                The status or status list to filter on.
+            exclude (bool): \
+                Exclude instead of include if True.
+
+        Returns:
+            list[TodoFacade]: Returns a list with TodoFacade instances.
+        '''
+        if isinstance(status, str):
+            status = [status]
+        statuses = set(status)
+
+        return [
+            todo for todo in self._todos
+            if (todo.get_status() in statuses) != exclude
+        ]
+
+    @measure_filter
+    def get_todos_by_tags(
+        self,
+        tags: str | list = '',
+        exclude: bool = False,
+        match_all: bool = False
+    ) -> list[TodoFacade]:
+        '''
+        Filter todos, which contain the given tag / tags, or do not
+        contain them (if exclude is True) and return the list of
+        TodoFaade instances. The filter is answered by the tag index
+        with set operations.
+
+        Args:
+            tags (str | list): \
+                The tag or tag list to filter on.
+            exclude (bool): \
+                Exclude instead of include if True.
+            match_all (bool): \
+                If True, a todo has to contain all of the tags instead \
+                of at least one of them. (default: `False`)
+
+        Returns:
+            list[TodoFacade]: Returns a list with TOdoFacade instances.
+        '''
+        if isinstance(tags, str):
+            tags = [tags]
+
+        if match_all:
+            found = self.tag_index.get_all_of(tags)
+        else:
+            found = self.tag_index.get_any_of(tags)
+
+        if exclude:
+            return [todo for todo in self._todos if todo not in found]
+        return self._in_list_order(found)
+
+    def query(self) -> TodoQuery:
+        '''
+        Start a lazy, chainable query on the tasks, e.g.:
+
+            repo.query().due_between('2025-05-01').tags('work').limit(10)
+
+        Returns:
+            TodoQuery: The query.
+        '''
+        return TodoQuery(self)
+
+    def _append_todo(self, todo: TodoFacade):
+        '''
+        Append a task to the internal list and index it.
+
+        Args:
+            todo (TodoFacade): The task to append.
+        '''
+        self.due_index.add(todo, self._append_to_list(todo))
+
+    def _append_todos(self, todos: Iterable[TodoFacade]):
+        '''
+        Append many tasks to the internal list and index them. The due
+        index is built with one sort instead of an insertion per task.
+
+        Args:
+            todos (Iterable[TodoFacade]): The tasks to append.
+        '''
+        self.due_index.add_all([(todo, self._append_to_list(todo)) for todo in todos])
+
+    def _append_to_list(self, todo: TodoFacade) -> int:
+        '''
+        Append a task to the internal list and index it by its UID and
+        tags. The due index is left to the caller.
+
+        Args:
+            todo (TodoFacade): The task to append.
+
+        Returns:
+            int: The position of the task.
+        '''
+        position = self._next_position
+        self._todos.append(todo)
+        self._positions[todo] = position
+        self._next_position += 1
+        self._index_uid(todo)
+        self.tag_index.add(todo)
+        return position
+
+    def _clear_todos(self):
+        '''
+        Remove all tasks from the internal list and the indexes.
+        '''
+        self._todos = []
+        self.todos_by_uid = {}
+        self._todos_with_uid = {}
+        self._uids_by_todo = {}
+        self.tag_index.clear()
+        self.due_index.clear()
+        self._positions = {}
+
+    def _in_list_order(self, todos: set[TodoFacade]) -> list[TodoFacade]:
+        '''
+        Return the given set of internal TodoFacades as a list in the
+        order of the internal list.
+
+        Args:
+            todos (set[TodoFacade]): The TodoFacades.
+
+        Returns:
+            list[TodoFacade]: The sorted list.
+        '''
+        return sorted(todos, key=self._positions.__getitem__)
+
+    def _index_uid(self, todo: TodoFacade):
+        '''
+        Put the TodoFacade into the UID index. The first TodoFacade of
+        a UID in the list wins, like a linear search would do; the others
+        (e.g. the same task in two calendars) are kept as well, so that
+        one of them takes over, when the first one is removed.
+
+        Args:
+            todo (TodoFacade): The TodoFacade to index.
+        '''
+        uid = todo.get_uid()
+        if not uid:
+            return
+        self._uids_by_todo[id(todo)] = uid
+        self._todos_with_uid.setdefault(uid, []).append(todo)
+        first = self.todos_by_uid.get(uid)
+        if first is None or self._positions[todo] < self._positions[first]:
+            self.todos_by_uid[uid] = todo
+
+    def _remove_todo(self, todo: TodoFacade):
+        '''
+        Remove a task from the internal list and its indexes.
+
+        Args:
+            todo (TodoFacade): The task to remove.
+        '''
+        self._todos.remove(todo)
+        self._unindex_todo(todo)
+
+    def _remove_todos(self, todos: Iterable[TodoFacade]):
+        '''
+        Remove many tasks from the internal list and its indexes with one
+        pass over the list.
+
+        Args:
+            todos (Iterable[TodoFacade]): The tasks to remove.
+        '''
+        removing = set(todos)
+        if not removing:
+            return
+        self._todos = [todo for todo in self._todos if todo not in removing]
+        for todo in removing:
+            self._unindex_todo(todo)
+
+    @staticmethod
+    def _to_bound(value: datetime | None) -> int | None:
+        '''
+        Convert a range limit into a timestamp for the DueIndex. Due
+        timestamps are whole seconds, so rounding the limit up keeps the
+        ">=" and "<" logic exact.
+
+        Args:
+            value (datetime | None): The limit or None for no limit.
+
+        Returns:
+            int | None: The timestamp or None.
+        '''
+        if value is None:
+            return None
+        return math.ceil(value.timestamp())
+
+    @staticmethod
+    def _to_range(
+        start: str | date | datetime = '',
+        end: str | date | datetime = ''
+    ) -> tuple[datetime | None, datetime | None]:
+        '''
+        Convert the start and end of a date range filter into local
+        datetimes. An end date includes the whole day.
+
+        Args:
+            start (str | date | datetime): The start. (default: `''`)
+            end (str | date | datetime): The end. (default: `''`)
+
+        Returns:
+            tuple: The tuple (start, end) with None for no limit.
+        '''
+        if isinstance(start, str):
+            start_datetime = utils.string_to_datetime(start)
+        else:
+            start_datetime = utils.to_local_datetime(start)
+
+        if isinstance(end, str):
+            end_datetime = utils.string_to_datetime(end)
+        elif isinstance(end, date) and not isinstance(end, datetime):
+            end_datetime = datetime.combine(end, datetime.max.time(), tz.tzlocal())
+        else:
+            end_datetime = utils.to_local_datetime(end)
+
+        return (start_datetime, end_datetime)
+
+    def _unindex_todo(self, todo: TodoFacade):
+        '''
+        Remove a task from the indexes.
+
+        Args:
+            todo (TodoFacade): The task to remove.
+        '''
+        self._positions.pop(todo, None)
+        self._unindex_uid(todo)
+        self.tag_index.remove(todo)
+        self.due_index.remove(todo)
+
+    def _unindex_uid(self, todo: TodoFacade):
+        '''
+        Remove the TodoFacade from the UID index.
+
+        Args:
+            todo (TodoFacade): The TodoFacade to remove.
+        '''
+        uid = self._uids_by_todo.pop(id(todo), None)
+        if uid is None:
+            return
+        others = [other for other in self._todos_with_uid[uid] if other is not todo]
+        if others:
+            self._todos_with_uid[uid] = others
+        else:
+            del self._todos_with_uid[uid]
+        if self.todos_by_uid.get(uid) is todo:
+            if others:
+                self.todos_by_uid[uid] = min(others, key=self._positions.__getitem__)
+            else:
+                del self.todos_by_uid[uid]
@@ -7,11 +7,17 @@ of the caldav module and provides methods, which I personally
 find more intuitive to use.
 '''
 
+from tododav.model.todo.todo_stats import TodoStats
+
+from tododav.utils import ical_utils
+
 from caldav.objects import Todo
 
 from datetime import date, datetime
 from dateutil import tz
+from typing import Callable
 
+import time
 import uuid
 
 
@@ -32,7 +38,8 @@ END:VCALENDAR
         due: date | datetime | None = None,
         status: str | None = None,
         priority: int = 0,
-        tags: list | None = None
+        tags: list | None = None,
+        lazy: bool = False
     ):
         '''
         A wrapper / facade for the caldav object "Todo" with
@@ -52,7 +59,59 @@ END:VCALENDAR
             status (str | None): The status of the task.
             priority (int): The priority of the task.
             tags (list | None): The tags of the task.
+            lazy (bool): \
+                If True, the iCalendar data of the given caldav_todo will \
+                not be parsed until it is needed. The getters will read the \
+                common fields with a cheap scan of the raw data instead. \
+                (default: `False`)
+        '''
+        self.dirty = False
+        '''
+        True, if the task was modified since it was loaded or saved.
+        '''
+
+        self.calendar_name = ''
+        '''
+        The name of the calendar this task belongs to. It will be set by
+        the TodoRepository, which loaded the task.
+        '''
+
+        self.observers: list[Callable[[TodoFacade, str], None]] = []
+        '''
+        Callables, which get this TodoFacade and the name of the changed
+        field after a change. A TodoRepository registers itself here to keep
+        its indexes up to date.
+        '''
+
+        self.lazy = lazy
+        '''
+        If True, the raw data will only be scanned, until the parsed
+        representation is really needed (see ical_utils.scan_vtodo()).
+        '''
+
+        self.scanned: dict | None = None
+        '''
+        The scanned fields of the raw data in lazy mode. It will be
+        dropped as soon as the parsed representation is accessed.
+        '''
+
+        self.cache: dict = {}
+        '''
+        The field values read from the parsed representation, so that the
+        getters do not have to read them again. The setters clear it.
+        '''
+
+        self.parse_count = 0
+        '''
+        How often the iCalendar data of this task had to be parsed.
+        '''
+
+        self.stats: TodoStats | None = None
+        '''
+        Optional metrics, which record the duration of each parse. It
+        will be set by the TodoRepository, which loaded the task.
         '''
+
         if caldav_todo is None:
             self.caldav_todo = Todo(data=self.DEFAULT_TODO)
             self.set_summary(summary)
@@ -63,6 +122,7 @@ END:VCALENDAR
             self.set_uid(str(uuid.uuid4()))
         else:
             self.caldav_todo = caldav_todo
+            self.scan()
 
     def __str__(self) -> str:
         '''
@@ -106,14 +166,50 @@ END:VCALENDAR
 
     @property
     def ical(self):
+        '''
+        The icalendar VTODO component, which is the only representation
+        the TodoFacade works with. caldav parses the data again, whenever
+        one switches between its icalendar and vobject representations.
+        '''
+        self.scanned = None
+        instance = self.caldav_todo._icalendar_instance
+        if instance is None:
+            self.parse_count += 1
+            if self.stats is None:
+                return self.caldav_todo.icalendar_component
+            start = time.perf_counter()
+            component = self.caldav_todo.icalendar_component
+            self.stats.record(
+                'parse',
+                duration=time.perf_counter() - start,
+                reparse=self.parse_count > 1
+            )
+            return component
+        # caldav's icalendar_component serializes the whole calendar on
+        # every access (to check, if it is loaded), so look it up directly
+        for component in instance.subcomponents:
+            if component.name == 'VTODO':
+                return component
         return self.caldav_todo.icalendar_component
 
     @property
     def vtodo(self):
+        '''
+        The vobject VTODO. Changes done with it bypass the field cache,
+        so better use the setters of the TodoFacade.
+        '''
+        self.scanned = None
+        self.cache = {}
         return self.caldav_todo.vobject_instance.vtodo
 
     @property
     def vobject(self):
+        '''
+        The vobject instance. Changes done with it bypass the field cache,
+        so better use the setters of the TodoFacade.
+        '''
+        self.scanned = None
+        self.cache = {}
         return self.caldav_todo.vobject_instance
 
     def add_tag(self, tag: str = ''):
@@ -123,11 +219,12 @@ END:VCALENDAR
         Args:
             tag (str): The tag string. (default: `''`)
         """
-        if 'CATEGORIES' not in self.ical:
-            self.ical.add('CATEGORIES', [tag])
-        elif isinstance(self.vtodo.categories.value, list):
-            if tag and tag not in self.get_tags():
-                self.vtodo.categories.value.append(tag)
+        tags = self.get_tags()
+        if 'CATEGORIES' not in self.ical or (tag and tag not in tags):
+            self._set_property('CATEGORIES', tags + [tag])
+            # only a real change makes the task dirty, so that save_all()
+            # does not upload unchanged tasks
+            self.mark_dirty('tags')
 
     def complete(self, completion_date: datetime = datetime.now()):
         '''
@@ -157,8 +254,7 @@ END:VCALENDAR
         Returns:
             date | datetime: Returns the completed string.
         '''
-        if 'COMPLETED' in self.ical:
-            return self.vtodo.completed.value
+        return self._get_field('COMPLETED')
 
     def get_due(self) -> date | datetime:
         '''
@@ -168,11 +264,8 @@ END:VCALENDAR
         Returns:
             date | datetime: Returns the due date of the todo.
         '''
-        # return self.caldav_todo.vobject_instance.vtodo.due.value
-        if 'DUE' in self.ical:
-            return self.vtodo.due.value
-        else:
-            return datetime.now()
+        due = self._get_field('DUE')
+        return due if due is not None else datetime.now()
 
     def get_priority(self) -> int | None:
         '''
@@ -181,10 +274,7 @@ END:VCALENDAR
         Returns:
             int: Returns the priority integer.
         '''
-        if 'PRIORITY' in self.ical and self.vtodo.priority.value is not None:
-            return int(self.vtodo.priority.value)
-        else:
-            return None
+        return self._get_field('PRIORITY')
 
     def get_status(self) -> str | None:
         '''
@@ -193,10 +283,7 @@ END:VCALENDAR
         Returns:
             str: Returns the status string.
         '''
-        if 'STATUS' in self.ical:
-            return self.vtodo.status.value
-        else:
-            return None
+        return self._get_field('STATUS')
 
     def get_summary(self) -> str | None:
         '''
@@ -205,10 +292,7 @@ END:VCALENDAR
         Returns:
             str: Returns the summary string.
         '''
-        if 'SUMMARY' in self.ical:
-            return self.vtodo.summary.value
-        else:
-            return None
+        return self._get_field('SUMMARY')
 
     def get_tags(self) -> list:
         """
@@ -217,10 +301,7 @@ END:VCALENDAR
         Return:
             list: The list with the tags.
         """
-        if 'CATEGORIES' in self.ical and self.vtodo.categories.value is not None:
-            return self.vtodo.categories.value
-        else:
-            return []
+        return list(self._get_field('CATEGORIES') or [])
 
     def get_uid(self) -> str:
         '''
@@ -229,10 +310,7 @@ END:VCALENDAR
         Returns:
             str: Returns the UID string.
         '''
-        if 'UID' in self.ical and self.vtodo.uid.value is not None:
-            return self.vtodo.uid.value
-        else:
-            return ''
+        return self._get_field('UID') or ''
 
     def has_due(self) -> bool:
         '''
@@ -241,7 +319,7 @@ END:VCALENDAR
         Returns:
             bool: Returns True if there is a DUE value.
         '''
-        return 'DUE' in self.ical
+        return self._get_field('DUE') is not None
 
     def has_priority(self) -> bool:
         '''
@@ -259,7 +337,7 @@ END:VCALENDAR
         Returns:
             bool: True if it has a RRULE.
         '''
-        return 'RRULE' in self.ical
+        return self._get_field('RRULE') is not None
 
     def has_tags(self) -> bool:
         '''
@@ -279,6 +357,34 @@ END:VCALENDAR
         '''
         return self.get_status() == 'COMPLETED'
 
+    def is_dirty(self) -> bool:
+        '''
+        Returns if the task was modified since it was loaded or saved.
+
+        Returns:
+            bool: Returns True if it was modified.
+        '''
+        return self.dirty
+
+    def mark_clean(self):
+        '''
+        Mark the task as not modified; e.g. after it was saved.
+        '''
+        self.dirty = False
+
+    def mark_dirty(self, field: str = ''):
+        '''
+        Mark the task as modified and inform the observers. All setters
+        do this automatically.
+
+        Args:
+            field (str): The name of the changed field. (default: `''`)
+        '''
+        self.dirty = True
+        self.cache = {}
+        for observer in self.observers:
+            observer(self, field)
+
     def remove_tag(self, tag: str = ''):
         """
         Remove a tag.
@@ -286,8 +392,10 @@ END:VCALENDAR
         Args:
             tag (str): The tag string. (default: `''`)
         """
-        if self.vtodo.categories.value is not None:
-            self.vtodo.categories.value.remove(tag)
+        tags = self.get_tags()
+        tags.remove(tag)
+        self._set_property('CATEGORIES', tags or None)
+        self.mark_dirty('tags')
 
     def save(self) -> tuple[bool, Exception | None]:
         '''
@@ -301,10 +409,40 @@ END:VCALENDAR
         '''
         try:
             self.caldav_todo.save()
+            self.mark_clean()
             return (True, None)
         except Exception as e:
             return (False, e)
 
+    def scan(self):
+        '''
+        Scan the raw data of the caldav Todo for the common fields, if
+        the lazy mode is on and the data was not parsed yet.
+        '''
+        self.scanned = None
+        if (
+            self.lazy
+            and self.caldav_todo._icalendar_instance is None
+            and self.caldav_todo._vobject_instance is None
+            and self.caldav_todo.data
+        ):
+            self.scanned = ical_utils.scan_vtodo(self.caldav_todo.data)
+
+    def set_caldav_todo(self, caldav_todo: Todo):
+        '''
+        Replace the wrapped caldav Todo; e.g. with a newer version from
+        the server. The task counts as not modified afterwards.
+
+        Args:
+            caldav_todo (Todo): The new caldav Todo instance.
+        '''
+        self.caldav_todo = caldav_todo
+        self.cache = {}
+        self.scan()
+        self.dirty = False
+        for observer in self.observers:
+            observer(self, 'caldav_todo')
+
     def set_completed(self, completed: datetime | None = None):
         """
         Set the completed date for the task. Can be set to "None" to
@@ -315,12 +453,10 @@ END:VCALENDAR
                 Set the completed date with a datetime \
                 or even None to remove it. (default: `None`)
         """
-        if 'COMPLETED' in self.ical:
-            self.ical.pop('COMPLETED')
         if isinstance(completed, datetime):
-            self.ical.add('COMPLETED', completed.replace(tzinfo=tz.tzlocal()))
-        elif hasattr(self.vtodo, 'COMPLETED'):
-            self.vtodo.remove(self.vtodo.completed)
+            completed = completed.replace(tzinfo=tz.tzlocal())
+        self._set_property('COMPLETED', completed)
+        self.mark_dirty('completed')
 
     def set_due(self, due: date | datetime | None = None):
         """
@@ -332,14 +468,10 @@ END:VCALENDAR
                 Set the due date with a date, datetime \
                 or even None to remove it. (default: `None`)
         """
-        if 'DUE' in self.ical:
-            self.ical.pop('DUE')
-        if isinstance(due, date) and not isinstance(due, datetime):
-            self.ical.add('DUE', due)
-        elif isinstance(due, datetime):
-            self.ical.add('DUE', due.replace(tzinfo=tz.tzlocal()))
-        elif hasattr(self.vtodo, 'DUE'):
-            self.vtodo.remove(self.vtodo.due)
+        if isinstance(due, datetime):
+            due = due.replace(tzinfo=tz.tzlocal())
+        self._set_property('DUE', due)
+        self.mark_dirty('due')
 
     def set_priority(self, priority: int | None = None):
         '''
@@ -350,13 +482,8 @@ END:VCALENDAR
             priority (int | None): \
                 The new priority. If no parameter is given, it will be removed.
         '''
-        if 'PRIORITY' in self.ical:
-            if priority is None:
-                self.ical.pop('PRIORITY')
-            else:
-                self.vtodo.priority.value = priority
-        elif priority is not None and priority != 0:
-            self.ical.add('PRIORITY', priority)
+        self._set_property('PRIORITY', priority or None)
+        self.mark_dirty('priority')
 
     def set_status(self, status: str | None = None):
         '''
@@ -367,13 +494,8 @@ END:VCALENDAR
                 The new status. If no parameter is given, it will be None \
                 and thus removed.
         '''
-        if 'STATUS' in self.ical:
-            if status is None:
-                self.ical.pop('STATUS')
-            else:
-                self.vtodo.status.value = status
-        elif status is not None:
-            self.ical.add('STATUS', status)
+        self._set_property('STATUS', status)
+        self.mark_dirty('status')
 
     def set_summary(self, summary: str | None = None):
         '''
@@ -384,13 +506,8 @@ END:VCALENDAR
                 The new summary. If no parameter is given, it will be None \
                 and thus removed.
         '''
-        if 'SUMMARY' in self.ical:
-            if summary is None:
-                self.ical.pop('SUMMARY')
-            else:
-                self.vtodo.summary.value = summary
-        elif summary is not None:
-            self.ical.add('SUMMARY', summary)
+        self._set_property('SUMMARY', summary)
+        self.mark_dirty('summary')
 
     def set_tags(self, tags: list | None = None):
         '''
@@ -401,13 +518,8 @@ END:VCALENDAR
                 The new tags list. If no parameter is given, it will be None \
                 and thus removed.
         '''
-        if 'CATEGORIES' in self.ical:
-            if tags is None:
-                self.ical.pop('CATEGORIES')
-            else:
-                self.vtodo.categories.value = tags
-        elif tags is not None and tags:
-            self.ical.add('CATEGORIES', tags)
+        self._set_property('CATEGORIES', list(tags) if tags else None)
+        self.mark_dirty('tags')
 
     def set_uid(self, uid: str = ''):
         '''
@@ -416,10 +528,8 @@ END:VCALENDAR
         Args:
             uid (str): The new uid. If no parameter is given, it will be ''.
         '''
-        if 'UID' in self.ical:
-            self.vtodo.uid.value = uid
-        else:
-            self.ical.add('UID', uid)
+        self._set_property('UID', uid)
+        self.mark_dirty('uid')
 
     def uncomplete(self):
         '''
@@ -430,3 +540,62 @@ END:VCALENDAR
         if self.is_done():
             self.set_status('NEEDS-ACTION')
             self.set_completed(None)
+
+    def _get_field(self, name: str):
+        '''
+        Get the value of the given property; from the scan in lazy mode,
+        else from the field cache or the icalendar component.
+
+        Args:
+            name (str): The property name, e.g. "DUE".
+
+        Returns:
+            The value or None, if the property is not set.
+        '''
+        if self.scanned is not None:
+            return self.scanned.get(name)
+        if name not in self.cache:
+            self.cache[name] = self._read_field(name)
+        return self.cache[name]
+
+    def _read_field(self, name: str):
+        '''
+        Read the value of the given property from the icalendar component
+        as the same Python value, which ical_utils.scan_vtodo() gives.
+
+        Args:
+            name (str): The property name, e.g. "DUE".
+
+        Returns:
+            The value or None, if the property is not set.
+        '''
+        value = self.ical.get(name)
+        if value is None:
+            return None
+        if isinstance(value, list):
+            # only the first occurrence counts
+            value = value[0]
+        if name in ('DUE', 'COMPLETED'):
+            return value.dt
+        if name == 'CATEGORIES':
+            return [str(tag) for tag in value.cats]
+        if name == 'PRIORITY':
+            return int(value)
+        if name == 'RRULE':
+            return value.to_ical().decode()
+        return str(value)
+
+    def _set_property(self, name: str, value=None):
+        '''
+        Replace the given property of the icalendar component or remove
+        it, if the value is None.
+
+        Args:
+            name (str): The property name, e.g. "DUE".
+            value: The new value or None. (default: `None`)
+        '''
+        ical = self.ical
+        if name in ical:
+            ical.pop(name)
+        if value is not None:
+            ical.add(name, value)
@@ -0,0 +1,265 @@
+'''
+Index classes for the TodoRepository.
+
+The indexes will be maintained incrementally by the TodoRepository,
+which observes its TodoFacades for changes, so that the filters do not
+have to scan (and parse) every task on every call.
+'''
+
+from tododav.model.todo.todo_facade import TodoFacade
+
+from tododav.utils import utils
+
+from typing import Iterable
+
+import bisect
+
+
+class DueIndex:
+
+    def __init__(self):
+        '''
+        A sorted index of the normalised due timestamps (see
+        utils.to_timestamp()), so that date range queries become binary
+        search slices, which are already in due order. Tasks without a due
+        date are held separately.
+        '''
+        self.keys: list[tuple[int, int]] = []
+        '''
+        The sorted (timestamp, position) keys. The position of the
+        TodoFacade in the repository breaks ties.
+        '''
+
+        self.todos: list[TodoFacade] = []
+        '''
+        The TodoFacades in the same order as the keys.
+        '''
+
+        self.keys_by_todo: dict[TodoFacade, tuple[int, int]] = {}
+        '''
+        The indexed key of each TodoFacade, so that it can be removed from
+        the index again, even if its due date changed meanwhile.
+        '''
+
+        self.undated: set[TodoFacade] = set()
+        '''
+        The TodoFacades without a due date.
+        '''
+
+    def add(self, todo: TodoFacade, position: int = 0):
+        '''
+        Add the TodoFacade with its current due date to the index.
+
+        Args:
+            todo (TodoFacade): \
+                The TodoFacade to add.
+            position (int): \
+                The position of the TodoFacade in the repository, which \
+                sorts TodoFacades with the same due. (default: `0`)
+        '''
+        if not todo.has_due():
+            self.undated.add(todo)
+            return
+        key = (utils.to_timestamp(todo.get_due()), position)
+        i = bisect.bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.todos.insert(i, todo)
+        self.keys_by_todo[todo] = key
+
+    def add_all(self, todos: Iterable[tuple[TodoFacade, int]]):
+        '''
+        Add many TodoFacades at once, e.g. when populating. Their keys are
+        sorted together with the indexed ones in one pass, instead of
+        inserting them one by one, which moves the lists for every task.
+
+        Args:
+            todos (Iterable[tuple[TodoFacade, int]]): \
+                The (TodoFacade, position) tuples (see add()).
+        '''
+        entries = list(zip(self.keys, self.todos))
+        for todo, position in todos:
+            if not todo.has_due():
+                self.undated.add(todo)
+                continue
+            key = (utils.to_timestamp(todo.get_due()), position)
+            self.keys_by_todo[todo] = key
+            entries.append((key, todo))
+        # the positions are unique, so the keys never compare equal
+        entries.sort(key=lambda entry: entry[0])
+        self.keys = [key for key, _ in entries]
+        self.todos = [todo for _, todo in entries]
+
+    def clear(self):
+        '''
+        Remove everything from the index.
+        '''
+        self.keys = []
+        self.todos = []
+        self.keys_by_todo = {}
+        self.undated = set()
+
+    def get_range(
+        self,
+        start: int | None = None,
+        end: int | None = None
+    ) -> list[TodoFacade]:
+        '''
+        Get the TodoFacades with a due timestamp >= start and < end,
+        sorted by their due.
+
+        Args:
+            start (int | None): \
+                The start timestamp or None for no lower limit. (default: `None`)
+            end (int | None): \
+                The end timestamp or None for no upper limit. (default: `None`)
+
+        Returns:
+            list[TodoFacade]: The found TodoFacades.
+        '''
+        lo, hi = self.get_range_bounds(start, end)
+        return self.todos[lo:hi]
+
+    def get_range_bounds(
+        self,
+        start: int | None = None,
+        end: int | None = None
+    ) -> tuple[int, int]:
+        '''
+        Get the slice bounds of the range in self.todos (see get_range()),
+        without copying anything.
+
+        Args:
+            start (int | None): \
+                The start timestamp or None for no lower limit. (default: `None`)
+            end (int | None): \
+                The end timestamp or None for no upper limit. (default: `None`)
+
+        Returns:
+            tuple[int, int]: The tuple (lo, hi).
+        '''
+        lo = 0 if start is None else bisect.bisect_left(self.keys, (start, -1))
+        hi = len(self.keys) if end is None else bisect.bisect_left(self.keys, (end, -1))
+        return (lo, hi)
+
+    def remove(self, todo: TodoFacade):
+        '''
+        Remove the TodoFacade from the index.
+
+        Args:
+            todo (TodoFacade): The TodoFacade to remove.
+        '''
+        self.undated.discard(todo)
+        key = self.keys_by_todo.pop(todo, None)
+        if key is None:
+            return
+        i = bisect.bisect_left(self.keys, key)
+        while self.todos[i] is not todo:
+            i += 1
+        del self.keys[i]
+        del self.todos[i]
+
+    def update(self, todo: TodoFacade, position: int = 0):
+        '''
+        Re-index the TodoFacade after its due date changed.
+
+        Args:
+            todo (TodoFacade): \
+                The changed TodoFacade.
+            position (int): \
+                The position of the TodoFacade in the repository. (default: `0`)
+        '''
+        self.remove(todo)
+        self.add(todo, position)
+
+
+class TagIndex:
+
+    def __init__(self):
+        '''
+        An inverted index, which maps each tag to the set of TodoFacades
+        having this tag. Any-of, all-of and exclude queries can then be
+        answered with set operations.
+        '''
+        self.todos_by_tag: dict[str, set[TodoFacade]] = {}
+        '''
+        The tag -> set of TodoFacades mapping.
+        '''
+
+        self.tags_by_todo: dict[TodoFacade, frozenset[str]] = {}
+        '''
+        The indexed tags of each TodoFacade, so that it can be removed
+        from the index again, even if its tags changed meanwhile.
+        '''
+
+    def add(self, todo: TodoFacade):
+        '''
+        Add the TodoFacade with its current tags to the index.
+
+        Args:
+            todo (TodoFacade): The TodoFacade to add.
+        '''
+        tags = frozenset(todo.get_tags())
+        self.tags_by_todo[todo] = tags
+        for tag in tags:
+            self.todos_by_tag.setdefault(tag, set()).add(todo)
+
+    def clear(self):
+        '''
+        Remove everything from the index.
+        '''
+        self.todos_by_tag = {}
+        self.tags_by_todo = {}
+
+    def get_all_of(self, tags: Iterable[str]) -> set[TodoFacade]:
+        '''
+        Get the TodoFacades, which have all of the given tags.
+
+        Args:
+            tags (Iterable[str]): The tags.
+
+        Returns:
+            set[TodoFacade]: The found TodoFacades.
+        '''
+        # start with the rarest tag to keep the intersections small
+        todo_sets = sorted(
+            (self.todos_by_tag.get(tag, set()) for tag in set(tags)),
+            key=len
+        )
+        if not todo_sets:
+            return set()
+        return todo_sets[0].intersection(*todo_sets[1:])
+
+    def get_any_of(self, tags: Iterable[str]) -> set[TodoFacade]:
+        '''
+        Get the TodoFacades, which have at least one of the given tags.
+
+        Args:
+            tags (Iterable[str]): The tags.
+
+        Returns:
+            set[TodoFacade]: The found TodoFacades.
+        '''
+        return set().union(*(self.todos_by_tag.get(tag, set()) for tag in set(tags)))
+
+    def remove(self, todo: TodoFacade):
+        '''
+        Remove the TodoFacade from the index.
+
+        Args:
+            todo (TodoFacade): The TodoFacade to remove.
+        '''
+        for tag in self.tags_by_todo.pop(todo, frozenset()):
+            todos = self.todos_by_tag[tag]
+            todos.discard(todo)
+            if not todos:
+                del self.todos_by_tag[tag]
+
+    def update(self, todo: TodoFacade):
+        '''
+        Re-index the TodoFacade after its tags changed.
+
+        Args:
+            todo (TodoFacade): The changed TodoFacade.
+        '''
+        self.remove(todo)
+        self.add(todo)
@@ -0,0 +1,411 @@
+'''
+TodoQuery class.
+
+A lazy, chainable query on a TodoCollection (e.g. the TodoRepository):
+
+    repo.query().due_between('2025-05-01', '2025-06-01').tags('work') \
+        .status('COMPLETED', exclude=True).order_by('due').limit(10)
+
+Nothing will be filtered, until the query is iterated. Then the planner
+starts from the most selective index (the due index for a due range, the
+tag index for tags) instead of scanning all tasks, and checks the other
+conditions only on these candidates.
+'''
+
+from tododav.model.todo.todo_facade import TodoFacade
+from tododav.model.todo.todo_stats import TodoStats, measure_filter
+
+from tododav.utils import utils
+
+from datetime import date, datetime
+from itertools import islice
+from typing import Callable, Iterable, Iterator, TYPE_CHECKING
+
+import heapq
+
+if TYPE_CHECKING:
+    from tododav.model.todo.todo_collection import TodoCollection
+
+
+class TodoQuery:
+
+    ORDER_KEYS = ('due', 'priority', 'summary', 'uid')
+    '''
+    The field names, which order_by() accepts besides a key function.
+    '''
+
+    def __init__(self, collection: 'TodoCollection'):
+        '''
+        A lazy query on the given collection. Every method returns a new
+        TodoQuery, so that a query can be used as the base of others.
+
+        Args:
+            collection (TodoCollection): The collection to query.
+        '''
+        self.collection = collection
+        self.due_range: tuple[int | None, int | None] | None = None
+        self.tag_filters: list[tuple[frozenset[str], bool, bool]] = []
+        self.status_filters: list[tuple[frozenset, bool]] = []
+        self.filter_funcs: list[Callable[[TodoFacade], bool]] = []
+        self.order_key: str | Callable | None = None
+        self.order_reverse = False
+        self.max_count: int | None = None
+
+    def __iter__(self) -> Iterator[TodoFacade]:
+        index, candidates = self._plan()
+        todos: Iterable[TodoFacade] = filter(self.matches, candidates)
+
+        if self.order_key is None:
+            # the default is the order of the internal list
+            if index != 'scan':
+                todos = self.collection._in_list_order(set(todos))
+        elif index == 'due_index' and self.order_key == 'due' and not self.order_reverse:
+            # the due index already delivers the tasks in due order, so
+            # a limit can stop early
+            pass
+        else:
+            key = self._get_order_key()
+            if self.max_count is not None:
+                select = heapq.nlargest if self.order_reverse else heapq.nsmallest
+                todos = select(self.max_count, todos, key=key)
+            else:
+                todos = sorted(todos, key=key, reverse=self.order_reverse)
+
+        if self.max_count is not None:
+            todos = islice(todos, self.max_count)
+        return iter(todos)
+
+    @property
+    def stats(self) -> TodoStats | None:
+        '''
+        The metrics of the collection, which record the duration of all()
+        and count().
+        '''
+        return self.collection.stats
+
+    @measure_filter
+    def all(self) -> list[TodoFacade]:
+        '''
+        Run the query.
+
+        Returns:
+            list[TodoFacade]: The found tasks.
+        '''
+        return list(self)
+
+    @measure_filter
+    def count(self) -> int:
+        '''
+        Count the found tasks.
+
+        Returns:
+            int: The number of found tasks.
+        '''
+        return sum(1 for _ in self)
+
+    def due_between(
+        self,
+        start: str | date | datetime = '',
+        end: str | date | datetime = ''
+    ) -> 'TodoQuery':
+        '''
+        Only tasks with a due date in the given range, with the logic of
+        TodoCollection.get_todos_by_daterange().
+
+        Args:
+            start (str | date | datetime): The start. (default: `''`)
+            end (str | date | datetime): The end. (default: `''`)
+
+        Returns:
+            TodoQuery: The new query.
+        '''
+        start_datetime, end_datetime = self.collection._to_range(start, end)
+        start_bound = self.collection._to_bound(start_datetime)
+        end_bound = self.collection._to_bound(end_datetime)
+        query = self._copy()
+        if query.due_range is not None:
+            # narrow an existing range
+            old_start, old_end = query.due_range
+            if old_start is not None:
+                start_bound = old_start if start_bound is None else max(old_start, start_bound)
+            if old_end is not None:
+                end_bound = old_end if end_bound is None else min(old_end, end_bound)
+        query.due_range = (start_bound, end_bound)
+        return query
+
+    def explain(self) -> str:
+        '''
+        Tell, where the planner would start the query.
+
+        Returns:
+            str: "due_index", "tag_index" or "scan".
+        '''
+        return self._plan_index()
+
+    def first(self) -> TodoFacade | None:
+        '''
+        Get the first found task.
+
+        Returns:
+            TodoFacade | None: The first task or None.
+        '''
+        return next(iter(self.limit(1)), None)
+
+    def limit(self, count: int) -> 'TodoQuery':
+        '''
+        Return at most the given number of tasks.
+
+        Args:
+            count (int): The maximum number of tasks.
+
+        Returns:
+            TodoQuery: The new query.
+        '''
+        query = self._copy()
+        query.max_count = count if query.max_count is None else min(query.max_count, count)
+        return query
+
+    def matches(self, todo: TodoFacade) -> bool:
+        '''
+        Check a task against all conditions (but not the order and the
+        limit). The due range and the tags are checked with the values,
+        which the indexes already hold. A task, which is not in the
+        collection (e.g. one of TodoRepository.iter_todos()), is checked
+        with its own values.
+
+        Args:
+            todo (TodoFacade): The task.
+
+        Returns:
+            bool: True, if it matches.
+        '''
+        indexed = todo in self.collection._positions
+        if self.due_range is not None:
+            if indexed:
+                key = self.collection.due_index.keys_by_todo.get(todo)
+                due = key[0] if key is not None else None
+            else:
+                due = utils.to_timestamp(todo.get_due()) if todo.has_due() else None
+            if due is None:
+                return False
+            start, end = self.due_range
+            if (start is not None and due < start) or (end is not None and due >= end):
+                return False
+
+        if indexed:
+            todo_tags = self.collection.tag_index.tags_by_todo.get(todo, frozenset())
+        else:
+            todo_tags = frozenset(todo.get_tags())
+        for tags, exclude, match_all in self.tag_filters:
+            found = tags <= todo_tags if match_all else not tags.isdisjoint(todo_tags)
+            if found == exclude:
+                return False
+
+        for statuses, exclude in self.status_filters:
+            if (todo.get_status() in statuses) == exclude:
+                return False
+
+        return all(filter_func(todo) for filter_func in self.filter_funcs)
+
+    def order_by(self, key: str | Callable, reverse: bool = False) -> 'TodoQuery':
+        '''
+        Sort the result by one of the ORDER_KEYS or with a key function.
+        Tasks without a value for the field come last.
+
+        Args:
+            key (str | Callable): \\
+                The field name or a function, which gets a task.
+            reverse (bool): \\
+                Sort descending. (default: `False`)
+
+        Raises:
+            ValueError: If the field name is unknown.
+
+        Returns:
+            TodoQuery: The new query.
+        '''
+        if isinstance(key, str) and key not in self.ORDER_KEYS:
+            raise ValueError(f'Cannot order by "{key}".')
+        query = self._copy()
+        query.order_key = key
+        query.order_reverse = reverse
+        return query
+
+    def status(self, status: str | list, exclude: bool = False) -> 'TodoQuery':
+        '''
+        Only tasks with the given status / one of the given statuses, or
+        without it (if exclude is True).
+
+        Args:
+            status (str | list): The status or status list.
+            exclude (bool): Exclude instead of include if True.
+
+        Returns:
+            TodoQuery: The new query.
+        '''
+        if isinstance(status, str):
+            status = [status]
+        query = self._copy()
+        query.status_filters.append((frozenset(status), exclude))
+        return query
+
+    def tags(
+        self,
+        tags: str | list,
+        exclude: bool = False,
+        match_all: bool = False
+    ) -> 'TodoQuery':
+        '''
+        Only tasks with the given tag / tags, with the logic of
+        TodoCollection.get_todos_by_tags().
+
+        Args:
+            tags (str | list): The tag or tag list.
+            exclude (bool): Exclude instead of include if True.
+            match_all (bool): All tags instead of any of them. (default: `False`)
+
+        Returns:
+            TodoQuery: The new query.
+        '''
+        if isinstance(tags, str):
+            tags = [tags]
+        query = self._copy()
+        query.tag_filters.append((frozenset(tags), exclude, match_all))
+        return query
+
+    def where(self, filter_func: Callable[[TodoFacade], bool]) -> 'TodoQuery':
+        '''
+        Only tasks, for which the given function returns True. These
+        functions will be called last and only for the candidates of the
+        indexes.
+
+        Args:
+            filter_func (Callable): The function, which gets a task.
+
+        Returns:
+            TodoQuery: The new query.
+        '''
+        query = self._copy()
+        query.filter_funcs.append(filter_func)
+        return query
+
+    def _copy(self) -> 'TodoQuery':
+        '''
+        Copy this query, so that a chained method does not change it.
+
+        Returns:
+            TodoQuery: The copy.
+        '''
+        query = TodoQuery(self.collection)
+        query.due_range = self.due_range
+        query.tag_filters = self.tag_filters.copy()
+        query.status_filters = self.status_filters.copy()
+        query.filter_funcs = self.filter_funcs.copy()
+        query.order_key = self.order_key
+        query.order_reverse = self.order_reverse
+        query.max_count = self.max_count
+        return query
+
+    def _estimate_due(self) -> int | None:
+        '''
+        Get the number of candidates of the due range.
+
+        Returns:
+            int | None: The number or None, if there is no due range.
+        '''
+        if self.due_range is None:
+            return None
+        lo, hi = self.collection.due_index.get_range_bounds(*self.due_range)
+        return hi - lo
+
+    def _estimate_tags(self) -> tuple[int, int] | None:
+        '''
+        Estimate the number of candidates of the most selective include
+        tag filter.
+
+        Returns:
+            tuple | None: The (estimate, filter number) or None.
+        '''
+        best = None
+        todos_by_tag = self.collection.tag_index.todos_by_tag
+        for i, (tags, exclude, match_all) in enumerate(self.tag_filters):
+            if exclude:
+                continue
+            sizes = [len(todos_by_tag.get(tag, ())) for tag in tags]
+            estimate = (min(sizes) if match_all else sum(sizes)) if sizes else 0
+            if best is None or estimate < best[0]:
+                best = (estimate, i)
+        return best
+
+    def _get_order_key(self) -> Callable:
+        '''
+        Get the sort key function for order_by().
+
+        Returns:
+            Callable: The key function.
+        '''
+        if callable(self.order_key):
+            return self.order_key
+
+        due_keys = self.collection.due_index.keys_by_todo
+        positions = self.collection._positions
+
+        def order_key(todo: TodoFacade):
+            if self.order_key == 'due':
+                key = due_keys.get(todo)
+                value = key[0] if key is not None else None
+            elif self.order_key == 'priority':
+                value = todo.get_priority() or None
+            elif self.order_key == 'summary':
+                value = todo.get_summary()
+            else:
+                value = todo.get_uid()
+            # tasks without a value come last and ties keep the list
+            # order (also when reversed)
+            missing = value is None
+            position = positions.get(todo, 0)
+            return (
+                missing != self.order_reverse,
+                value if not missing else 0,
+                -position if self.order_reverse else position
+            )
+
+        return order_key
+
+    def _plan(self) -> tuple[str, Iterable[TodoFacade]]:
+        '''
+        Get the candidates of the most selective index.
+
+        Returns:
+            tuple: The name of the index (see explain()) and the candidates.
+        '''
+        index = self._plan_index()
+        if index == 'due_index':
+            assert self.due_range is not None
+            lo, hi = self.collection.due_index.get_range_bounds(*self.due_range)
+            return (index, islice(self.collection.due_index.todos, lo, hi))
+        if index == 'tag_index':
+            tag_estimate = self._estimate_tags()
+            assert tag_estimate is not None
+            tags, _, match_all = self.tag_filters[tag_estimate[1]]
+            tag_index = self.collection.tag_index
+            found = tag_index.get_all_of(tags) if match_all else tag_index.get_any_of(tags)
+            return (index, found)
+        return (index, self.collection.todos)
+
+    def _plan_index(self) -> str:
+        '''
+        Choose the index with the fewest candidates.
+
+        Returns:
+            str: "due_index", "tag_index" or "scan".
+        '''
+        due_estimate = self._estimate_due()
+        tag_estimate = self._estimate_tags()
+        if tag_estimate is not None and (
+            due_estimate is None or tag_estimate[0] < due_estimate
+        ):
+            return 'tag_index'
+        if due_estimate is not None:
+            return 'due_index'
+        return 'scan'
@@ -0,0 +1,234 @@
+'''
+TodoRecord class.
+
+A compact, read-only snapshot of a task for read-mostly workloads (e.g.
+reports over a lot of tasks). It only keeps the common fields with
+__slots__, interned strings and integer timestamps, but has the same
+getters as the TodoFacade, so that a TodoCollection of TodoRecords can
+be filtered with the same methods as the TodoRepository.
+'''
+
+from tododav.model.todo.todo_facade import TodoFacade
+
+from tododav.utils import utils
+
+from datetime import date, datetime
+from dateutil import tz
+
+import sys
+
+
+class TodoRecord:
+
+    __slots__ = (
+        'uid', 'summary', 'due', 'due_is_date', 'status', 'priority',
+        'tags', 'completed', 'calendar_name', 'href'
+    )
+
+    def __init__(
+        self,
+        uid: str = '',
+        summary: str | None = None,
+        due: int | None = None,
+        due_is_date: bool = False,
+        status: str | None = None,
+        priority: int | None = None,
+        tags: tuple = (),
+        completed: int | None = None,
+        calendar_name: str = '',
+        href: str = ''
+    ):
+        '''
+        The snapshot of a task. Use TodoRecord.from_facade() to create
+        one from a TodoFacade.
+
+        Args:
+            uid (str): The UID.
+            summary (str | None): The summary.
+            due (int | None): The normalised due timestamp (see utils.to_timestamp()).
+            due_is_date (bool): True, if the due is a date without time.
+            status (str | None): The status.
+            priority (int | None): The priority.
+            tags (tuple): The tags.
+            completed (int | None): The completed timestamp.
+            calendar_name (str): The name of the calendar.
+            href (str): The href of the task on the server.
+        '''
+        self.uid = uid
+        self.summary = summary
+        self.due = due
+        self.due_is_date = due_is_date
+        self.status = status
+        self.priority = priority
+        self.tags = tags
+        self.completed = completed
+        self.calendar_name = calendar_name
+        self.href = href
+
+    @classmethod
+    def from_facade(cls, todo: TodoFacade) -> 'TodoRecord':
+        '''
+        Create the snapshot of the given TodoFacade. A lazy TodoFacade
+        will not be parsed for this.
+
+        Args:
+            todo (TodoFacade): The TodoFacade.
+
+        Returns:
+            TodoRecord: The new TodoRecord.
+        '''
+        due = todo.get_due() if todo.has_due() else None
+        completed = todo.get_completed()
+        status = todo.get_status()
+        url = todo.caldav_todo.url
+        return cls(
+            uid=todo.get_uid(),
+            summary=todo.get_summary(),
+            due=utils.to_timestamp(due) if due is not None else None,
+            due_is_date=due is not None and not isinstance(due, datetime),
+            status=sys.intern(status) if status is not None else None,
+            priority=todo.get_priority(),
+            tags=tuple(sys.intern(tag) for tag in todo.get_tags()),
+            completed=utils.to_timestamp(completed) if completed is not None else None,
+            calendar_name=sys.intern(todo.calendar_name),
+            href=str(url.canonical()) if url is not None else ''
+        )
+
+    def __str__(self) -> str:
+        '''
+        The string representation of the TodoRecord, like the one of
+        the TodoFacade.
+        '''
+        str_list = []
+
+        if self.has_due():
+            str_list.append('due=' + self.get_due().strftime(
+                '%Y-%m-%d' if self.due_is_date else '%Y-%m-%d %H:%M'
+            ))
+
+        if self.has_priority():
+            str_list.append('priority=' + str(self.priority))
+
+        if self.has_tags():
+            str_list.append('tags=[{}]'.format(','.join(self.tags)))
+
+        if self.is_done():
+            str_list.append('DONE')
+
+        data = (': ' if str_list else '') + ', '.join(str_list)
+
+        return f'{self.summary}{data}'
+
+    def __repr__(self) -> str:
+        '''
+        The representation should be the class name and the __str__ output.
+
+        Returns:
+            str: The representation of the class.
+        '''
+        return f'{self.__class__.__name__}: {self.__str__()}'
+
+    def get_completed(self) -> datetime | None:
+        '''
+        Get the completed datetime in the local timezone.
+
+        Returns:
+            datetime | None: The completed datetime or None.
+        '''
+        if self.completed is None:
+            return None
+        return datetime.fromtimestamp(self.completed, tz.tzlocal())
+
+    def get_due(self) -> date | datetime:
+        '''
+        Get the due date or datetime (in the local timezone). Returns the
+        today datetime, if there is no due date / datetime.
+
+        Returns:
+            date | datetime: Returns the due date of the todo.
+        '''
+        if self.due is None:
+            return datetime.now()
+        due = datetime.fromtimestamp(self.due, tz.tzlocal())
+        return due.date() if self.due_is_date else due
+
+    def get_priority(self) -> int | None:
+        '''
+        Get the priority integer.
+
+        Returns:
+            int | None: Returns the priority integer.
+        '''
+        return self.priority
+
+    def get_status(self) -> str | None:
+        '''
+        Get the status string.
+
+        Returns:
+            str | None: Returns the status string.
+        '''
+        return self.status
+
+    def get_summary(self) -> str | None:
+        '''
+        Get the summary string.
+
+        Returns:
+            str | None: Returns the summary string.
+        '''
+        return self.summary
+
+    def get_tags(self) -> list:
+        '''
+        Get the tags.
+
+        Returns:
+            list: The list with the tags.
+        '''
+        return list(self.tags)
+
+    def get_uid(self) -> str:
+        '''
+        Get the UID string.
+
+        Returns:
+            str: Returns the UID string.
+        '''
+        return self.uid
+
+    def has_due(self) -> bool:
+        '''
+        Returns if the task has a due date after all.
+
+        Returns:
+            bool: Returns True if there is a due date.
+        '''
+        return self.due is not None
+
+    def has_priority(self) -> bool:
+        '''
+        Returns if the task has a priority after all.
+
+        Returns:
+            bool: Returns True if there is a priority.
+        '''
+        return self.priority != 0 and self.priority is not None
+
+    def has_tags(self) -> bool:
+        '''
+        Returns if the task has tags.
+
+        Returns:
+            bool: Returns True if it has tags.
+        '''
+        return len(self.tags) != 0
+
+    def is_done(self) -> bool:
+        '''
+        Returns if the task is done or not. Done status is "COMPLETED".
+
+        Returns:
+            bool: Returns True if it is done, False otherwise.
+        '''
+        return self.status == 'COMPLETED'
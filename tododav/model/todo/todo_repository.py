@@ -4,23 +4,58 @@ TodoRepository class.
 A repository which can get Todo objects (as TodoFacade) and manage them.
 '''
 
-from tododav.model.config import Config
+from tododav.model.todo.todo_collection import TodoCollection
 from tododav.model.todo.todo_facade import TodoFacade
+from tododav.model.todo.todo_query import TodoQuery
+from tododav.model.todo.todo_record import TodoRecord
+from tododav.model.todo.todo_repository_base import TodoRepositoryBase
+from tododav.model.todo.todo_stats import TodoStats
+from tododav.model.todo.todo_store import TodoStore
 
-from tododav.utils import utils
+from tododav.utils import dav_utils
 
-from typing import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, TypeVar
 from datetime import date, datetime, timedelta
-from dateutil import tz
+from caldav.elements import cdav, dav
+from caldav.lib import error, vcal
 from caldav.objects import Calendar, Todo
 
-import caldav
+import itertools
+import json
+import os
+import time
 import uuid
 
+T = TypeVar('T')
 
-class TodoRepository:
 
-    def __init__(self, config_dict: dict = {}):
+class TodoRepository(TodoRepositoryBase):
+
+    SYNC_MULTIGET_CHUNK = 100
+    '''
+    How many changed hrefs will be fetched with one calendar-multiget
+    REPORT during a sync() at most.
+    '''
+
+    SAVE_WORKERS = 8
+    '''
+    The default number of concurrent PUT requests of save_all().
+    '''
+
+    PREFETCH_WORKERS = 2
+    '''
+    The number of background threads, which prefetch the windows next
+    to the loaded window (see populate_from_todo_list()).
+    '''
+
+    def __init__(
+        self,
+        config_dict: dict = {},
+        store: TodoStore | None = None,
+        lazy: bool = False,
+        stats: TodoStats | None = None
+    ):
         '''
         Initialize the TodoRepository and give an optional config dict.
         Otherwise use the programs config.
@@ -29,22 +64,52 @@ class TodoRepository:
             config_dict (dict): \
                 If not empty, use it's values to replace internal \
                 config values. (default: `{}`)
+            store (TodoStore | None): \
+                An optional persistent local store. If given, sync() \
+                will write its changes into it and populate_from_store() \
+                can be used for a warm start. (default: `None`)
+            lazy (bool): \
+                If True, the loaded tasks will be wrapped into lazy \
+                TodoFacades, which only parse their iCalendar data when \
+                needed. The indexes and filters will then work on a cheap \
+                scan of the raw data. (default: `False`)
+            stats (TodoStats | None): \
+                The metrics of the requests, the parsing and the filters. \
+                A new TodoStats will be used, if not given; passing one \
+                allows to share it between repositories. (default: `None`)
         '''
-        self.config = self.init_config(config_dict)
-        self.client = caldav.DAVClient(
-            url=self.config['NC_URI'],
-            username=self.config['NC_USER'],
-            password=self.config['NC_PASSWORD']
-        )
-        self.calendar = None
-        self.todos: list[TodoFacade] = []
+        super().__init__(config_dict, lazy, stats)
+        self.store = store
+        self.window: tuple[datetime, datetime] | None = None
+        self.prefetch_weeks = 0
+        self._prefetched: dict[str, tuple[datetime, datetime, Future]] = {}
+        self._prefetch_executor: ThreadPoolExecutor | None = None
+        self.calendars_from_cache = False
+
+    def __enter__(self) -> 'TodoRepository':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def sync_token(self) -> str | None:
+        '''
+        The sync-token of the first (default) calendar.
+        '''
+        return self.sync_tokens.get(self.get_calendar_names()[0])
+
+    @sync_token.setter
+    def sync_token(self, sync_token: str | None):
+        self.sync_tokens[self.get_calendar_names()[0]] = sync_token
 
     def add_todo(
         self,
         summary: str,
         due: date | datetime | None = None,
         priority: int = 0,
-        tags: list = []
+        tags: list = [],
+        calendar_name: str = ''
     ) -> TodoFacade:
         '''
         Create and add a new TodoFacade to the internal list and
@@ -63,52 +128,167 @@ class TodoRepository:
                 The optional priority between 0-9. (default: `0`)
             tags (list): \
                 A list of tags. (default: `[]`)
+            calendar_name (str): \
+                The name of the calendar to add the task to. If left \
+                blank, the first configured calendar will be used. \
+                (default: `''`)
 
         Returns:
             TodoFacade: The newly added TodoFacade.
         '''
-        if isinstance(self.calendar, Calendar):
-            new_caldav_todo = self.calendar.save_todo(
-                summary=summary,
-                dtstamp=datetime.now(),
-                due=due,
-                status='NEEDS-ACTION',
-                priority=priority,
-                categories=','.join(tags),
-                uid=str(uuid.uuid4())
-            )
-            new_todo_facade = TodoFacade(new_caldav_todo)
-            self.todos.append(new_todo_facade)
-        else:
-            new_todo_facade = TodoFacade(
-                None,
-                summary,
-                due,
-                'NEEDS-ACTION',
-                priority,
-                tags
+        def create() -> TodoFacade:
+            todo_facade = self._new_todo_facade(
+                summary, due, priority, tags, calendar_name
             )
-            self.todos.append(new_todo_facade)
+            if isinstance(todo_facade.caldav_todo.parent, Calendar):
+                todo_facade.caldav_todo.save()
+            return todo_facade
+
+        new_todo_facade = self._with_rediscovery(create)
+        self._append_todo(new_todo_facade)
 
         return new_todo_facade
 
     def add_todo_facade(self, todo_facade: TodoFacade):
         '''
-        Simply add a TodoFacade "manually" to the internal list.
+        Simply add a TodoFacade "manually" to the internal list. A TodoFacade
+        with an already known UID won't be added twice.
 
         Args:
             todo_facade (TodoFacade): The TodoFacade to add.
         '''
-        if todo_facade not in self.todos:
-            self.todos.append(todo_facade)
+        uid = todo_facade.get_uid()
+        if uid in self.todos_by_uid:
+            return
+        if not uid and todo_facade in self._todos:
+            return
+        self._append_todo(todo_facade)
 
-    def connect_calendar(self):
+    def add_todos(
+        self,
+        specs: Iterable[dict[str, Any] | str],
+        calendar_name: str = '',
+        max_workers: int = SAVE_WORKERS
+    ) -> list[tuple[TodoFacade | None, bool, Exception | None]]:
         '''
-        Connect to the online calendar with the internal config.
+        Create many new tasks at once, e.g. for importing a checklist. The
+        tasks will be uploaded concurrently with a bounded pool of workers
+        and a failing task does not abort the others. Only the successfully
+        saved tasks will be added to the internal list (without a connected
+        calendar all of them, like with add_todo()).
+
+        Args:
+            specs (Iterable[dict[str, Any] | str]): \
+                The tasks as dicts with the keyword arguments of add_todo() \
+                (summary, due, priority, tags, calendar_name) or just \
+                the summary as a string.
+            calendar_name (str): \
+                The default calendar for specs without a calendar_name. \
+                (default: `''`)
+            max_workers (int): \
+                The maximum number of concurrent uploads. (default: `8`)
+
+        Returns:
+            list: \
+                A tuple (TodoFacade | None, bool, Exception | None) per \
+                spec in the same order. The TodoFacade is None, if it could \
+                not even be created from the spec. A failed TodoFacade can \
+                be saved again later with TodoFacade.save().
         '''
-        with self.client as client:
-            principal = client.principal()
-        self.calendar = principal.calendar(self.config['NC_CALENDAR'])
+        results: list[tuple[TodoFacade | None, bool, Exception | None]] = []
+        created: dict[int, TodoFacade] = {}
+        fields_by_index: dict[int, dict[str, Any]] = {}
+        uploads = []
+        for spec in specs:
+            fields: dict[str, Any] = {'summary': spec} if isinstance(spec, str) else spec
+            fields = {'calendar_name': calendar_name, **fields}
+            try:
+                todo_facade = self._new_todo_facade(**fields)
+            except Exception as e:
+                results.append((None, False, e))
+                continue
+            created[len(results)] = todo_facade
+            fields_by_index[len(results)] = fields
+            if isinstance(todo_facade.caldav_todo.parent, Calendar):
+                uploads.append(len(results))
+            results.append((todo_facade, True, None))
+
+        def upload(indexes: list[int]):
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                saved = executor.map(lambda i: created[i].save(), indexes)
+                for i, (success, exception) in zip(indexes, saved):
+                    results[i] = (created[i], success, exception)
+
+        if uploads:
+            upload(uploads)
+            # tasks for a moved calendar are created again for the
+            # discovered one and uploaded once more
+            missing = [i for i in uploads if self._is_not_found(results[i][2])]
+            if missing and self._rediscover_calendars():
+                for i in missing:
+                    created[i] = self._new_todo_facade(**fields_by_index[i])
+                upload(missing)
+
+        for i, todo_facade in created.items():
+            if results[i][1]:
+                self._append_todo(todo_facade)
+        return results
+
+    def close(self):
+        '''
+        Close the HTTP session of the client and stop the background
+        prefetching. The repository can also be used as a context manager,
+        which calls this method at the end.
+        '''
+        self._reset_window()
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=False)
+            self._prefetch_executor = None
+        super().close()
+
+    def connect_calendar(self, use_cache: bool = True):
+        '''
+        Connect to the online calendar(s) with the internal config. All
+        calendars will be looked up with one listing of the principals
+        calendars. The first one will also be available as self.calendar.
+
+        The found calendar URLs will be cached on disk (see the
+        CALENDAR_CACHE config), so that the next connect can go straight
+        to the calendars without the discovery requests. If a cached
+        calendar is gone (404), the repository discovers it again on the
+        first request.
+
+        Args:
+            use_cache (bool): \
+                Use the cached calendar URLs, if they are known. \
+                (default: `True`)
+        '''
+        names = self.get_calendar_names()
+        if use_cache and self._connect_cached_calendars():
+            return
+
+        # no "with" block here, since it would close the session, which
+        # all following requests should keep using
+        principal = self.client.principal()
+
+        if len(names) == 1:
+            found = {names[0]: principal.calendar(names[0])}
+        else:
+            found = {
+                calendar.name: calendar
+                for calendar in principal.calendars()
+                if calendar.name in names
+            }
+            missing = [name for name in names if name not in found]
+            if missing:
+                raise error.NotFoundError(
+                    'No calendar with name {} found.'.format(', '.join(missing))
+                )
+
+        self.calendars = {name: found[name] for name in names}
+        self.calendar = self.calendars[names[0]]
+        self.calendars_from_cache = False
+        self._write_calendar_cache()
 
     def delete_todo_by_uid(self, uid: str) -> bool:
         '''
@@ -120,262 +300,1082 @@ class TodoRepository:
         Returns:
             bool: Returns True, if task was found and deleted, otherwise False.
         '''
-        for i, task in enumerate(self.todos):
-            if task.get_uid() == uid:
-                task.delete()
-                self.todos.pop(i)
-                return True
-        return False
+        task = self.todos_by_uid.get(uid)
+        if task is None:
+            return False
+        task.delete()
+        self._remove_todo(task)
+        return True
 
-    def get_todo_by_uid(self, uid: str) -> TodoFacade | None:
+    def delete_todos(
+        self,
+        todos: Iterable[str] | Callable[[TodoFacade], bool] | TodoQuery,
+        max_workers: int = SAVE_WORKERS
+    ) -> dict[TodoFacade | str, tuple[bool, Exception | None]]:
         '''
-        Get a TodoFacade instance of the internal list by its UID.
+        Delete many tasks at once: the DELETE requests run concurrently
+        with a bounded pool of workers and the deleted tasks are removed
+        from the internal list in one pass afterwards.
+
+        Each DELETE is sent with an If-Match header with the known ETag
+        of the task (from sync() or the store), so that a task, which was
+        changed on the server since it was loaded, won't be deleted. Tasks
+        without a known ETag are deleted unconditionally, like with
+        delete_todo_by_uid().
 
         Args:
-            uid (str): The UID so look for.
+            todos (Iterable[str] | Callable | TodoQuery): \
+                The UIDs, a function which gets a TodoFacade and returns \
+                True for the tasks to delete, or a TodoQuery.
+            max_workers (int): \
+                The maximum number of concurrent DELETEs. (default: `8`)
 
         Returns:
-            TodoFacade | None: A TodoFacade instance or None, if nothing found.
+            dict: \
+                The TodoFacade as the key and the success tuple \
+                (bool, Exception | None) as the value. TodoFacades, which \
+                are not in this repository (e.g. of a TodoQuery on another \
+                collection), and unknown UIDs (then the key) get \
+                (False, None) without any request.
         '''
-        for task in self.todos:
-            if task.get_uid() == uid:
-                return task
-        return None
+        results: dict[TodoFacade | str, tuple[bool, Exception | None]] = {}
+        if isinstance(todos, TodoQuery):
+            candidates = list(todos)
+        elif callable(todos):
+            candidates = [todo for todo in self._todos if todos(todo)]
+        else:
+            candidates = []
+            for uid in [todos] if isinstance(todos, str) else todos:
+                todo = self.todos_by_uid.get(uid)
+                if todo is None:
+                    results[uid] = (False, None)
+                else:
+                    candidates.append(todo)
+        targets = []
+        for todo in dict.fromkeys(candidates):
+            if todo in self._positions:
+                targets.append(todo)
+            else:
+                results[todo] = (False, None)
+        if not targets:
+            return results
+
+        hrefs = {
+            todo: self._get_href(todo.caldav_todo)
+            for todo in targets
+            if todo.caldav_todo.url is not None
+        }
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            deleted = list(executor.map(self._delete_todo, targets))
+            # a 404 can also mean, that the calendar was moved; then the
+            # tasks are deleted once more at the discovered calendar
+            missing = [
+                i for i, (_, exception) in enumerate(deleted)
+                if self._is_not_found(exception)
+            ]
+            if missing and self._rediscover_calendars():
+                for i in missing:
+                    self._relink_todo(targets[i])
+                retried = executor.map(self._delete_todo, [targets[i] for i in missing])
+                for i, result in zip(missing, retried):
+                    deleted[i] = result
+
+        removed = []
+        hrefs_by_calendar: dict[str, list[str]] = {}
+        for todo, result in zip(targets, deleted):
+            if self._is_not_found(result[1]):
+                # already gone on the server, which counts as deleted
+                result = (True, None)
+            results[todo] = result
+            if not result[0]:
+                continue
+            removed.append(todo)
+            if todo in hrefs:
+                # the etag follows a relinked task, the store still knows
+                # it by its old href
+                self.etags.pop(self._get_href(todo.caldav_todo), None)
+                hrefs_by_calendar.setdefault(todo.calendar_name, []).append(hrefs[todo])
+        self._remove_todos(removed)
+
+        if self.store is not None:
+            for calendar_name, hrefs in hrefs_by_calendar.items():
+                # the ctag changed with the deletion, but the sync-token
+                # can still be used for the next incremental sync
+                self.store.write(
+                    self._get_calendar_key(calendar_name),
+                    deleted=hrefs,
+                    sync_token=self.sync_tokens.get(calendar_name)
+                )
+        return results
 
-    def get_todos(self) -> list[TodoFacade]:
+    def extend_window(self, future_weeks: int = 0, past_weeks: int = 0) -> bool:
         '''
-        Get the list of TodoFacade instances.
+        Extend the window loaded with populate_from_todo_list(future_weeks)
+        by the given weeks into the future and / or the past. Prefetched
+        windows will be used, if there are any; in that case the window may
+        grow by more than the given weeks. The new tasks will be merged into
+        the internal list without duplicates.
+
+        Args:
+            future_weeks (int): \
+                Weeks to add after the window. (default: `0`)
+            past_weeks (int): \
+                Weeks to add before the window. (default: `0`)
 
         Returns:
-            list[Todofacades]: Returns the list of TodoFacades.
+            bool: True on success, False if no window was loaded.
+        '''
+        if self.window is None:
+            return False
+        start, end = self.window
+
+        if past_weeks > 0:
+            start = self._load_window('past', start, start - timedelta(weeks=past_weeks))
+        if future_weeks > 0:
+            end = self._load_window('future', end, end + timedelta(weeks=future_weeks))
+
+        self.window = (start, end)
+        self._prefetch_window()
+        return True
+
+    def get_records(self, stream: bool = False) -> TodoCollection:
+        '''
+        Get compact read-only snapshots (TodoRecord) of the tasks in a
+        TodoCollection, which has the same filter methods as the repository
+        (get_todos_by_date(), get_todos_by_tags(), ...), but needs only a
+        fraction of the memory.
+
+        Args:
+            stream (bool): \
+                If True, the tasks will be streamed from the server with \
+                iter_todos() instead of taken from the internal list, so \
+                that not all TodoFacades exist at once. (default: `False`)
+
+        Returns:
+            TodoCollection: The TodoRecords in a TodoCollection.
+        '''
+        todos = self.iter_todos() if stream else self._todos
+        return TodoCollection(TodoRecord.from_facade(todo) for todo in todos)
+
+    def is_store_fresh(self, max_age: float) -> bool:
+        '''
+        Check, if the store was confirmed to match the server for all
+        calendars (by sync() or by populate_from_store()) within the last
+        max_age seconds. Then populate_from_store() can skip the
+        validation and nothing has to be requested from the server.
+
+        Args:
+            max_age (float): The maximum age in seconds.
+
+        Returns:
+            bool: True, if the store is fresh.
+        '''
+        if self.store is None:
+            return False
+        now = time.time()
+        for calendar_name in self.get_calendar_names():
+            checked = self.store.get_checked(self._get_calendar_key(calendar_name))
+            if checked is None or now - checked > max_age:
+                return False
+        return True
+
+    def iter_todos(
+        self,
+        filter_func: Callable[[TodoFacade], bool] | None = None
+    ) -> Iterator[TodoFacade]:
         '''
-        return self.todos
+        Stream the tasks of the connected calendars one by one, while the
+        server response is still arriving. The tasks will not be added to
+        the internal list, so the memory usage stays bounded; this is meant
+        for scripts which e.g. export or count the tasks.
 
-    def get_todos_filtered(
+        Args:
+            filter_func (Callable | None): \
+                Optional function, which gets a TodoFacade and returns \
+                True, if it should be yielded. (default: `None`)
+
+        Yields:
+            TodoFacade: The (matching) tasks.
+        '''
+        query = dav_utils.build_todo_query()
+        for calendar_name in list(self._get_calendars()):
+            def start_report() -> tuple[Calendar, Iterator[tuple[str, dict]]]:
+                calendar = self._get_calendars()[calendar_name]
+                if calendar.url is None:
+                    return (calendar, iter(()))
+                responses = dav_utils.iter_report(self.client, str(calendar.url), query)
+                # the request is sent for the first response, so that a
+                # moved calendar raises here and not while yielding
+                first = next(responses, None)
+                if first is None:
+                    return (calendar, iter(()))
+                return (calendar, itertools.chain([first], responses))
+
+            calendar, responses = self._with_rediscovery(start_report)
+            calendar_url = calendar.url
+            if calendar_url is None:
+                continue
+            for href, props in responses:
+                data = props.get(cdav.CalendarData.tag)
+                if not data or 'BEGIN:VTODO' not in data:
+                    continue
+                todo = self._to_facade(Todo(
+                    self.client,
+                    url=calendar_url.join(href),
+                    data=data,
+                    parent=calendar,
+                    props={dav.GetEtag.tag: props.get(dav.GetEtag.tag)}
+                ), calendar_name)
+                if filter_func is None or filter_func(todo):
+                    yield todo
+
+    def populate_from_query(
         self,
-        filter_func: Callable[[TodoFacade], bool]
-    ) -> list[TodoFacade]:
+        start: str | date | datetime = '',
+        end: str | date | datetime = '',
+        tags: str | list = '',
+        match_all: bool = False,
+        status: str | list = '',
+        include_completed: bool = True
+    ) -> bool:
         '''
-        Filter the internal list of TodoFacade objects with a given
-        callable filter function, which gets a TodoFacade as the first
-        parameter and returns a boolean. With that filter the internal
-        todos list and reutrn it filtered (in a non-destructive way).
+        Populate only with the tasks, which match the given filters. The
+        filters work like get_todos_by_daterange(), get_todos_by_tags()
+        and get_todos_by_status(). As far as possible they are sent to the
+        server as a CalDAV calendar-query, so that only the matching tasks
+        will be transferred. Servers may ignore filters or match them more
+        loosely (e.g. tags as substrings), so the result is filtered on the
+        client side again. If a server rejects the query, all tasks will be
+        fetched and filtered on the client side.
 
         Args:
-            filter_func (Callable): \
-                The callable filter function to be called on each TodoFacade item \
-                in the internal list to filter on. If it returns True, the item \
-                will be remain in the original list.
+            start (str | date | datetime): \
+                The start of the due range. (default: `''`)
+            end (str | date | datetime): \
+                The end of the due range. (default: `''`)
+            tags (str | list): \
+                The tag or tag list to filter on. (default: `''`)
+            match_all (bool): \
+                If True, a task has to contain all of the tags instead \
+                of at least one of them. (default: `False`)
+            status (str | list): \
+                The status or status list to filter on. (default: `''`)
+            include_completed (bool): \
+                If False, completed tasks will be left out. (default: `True`)
 
         Returns:
-            list[TodoFacade]: Returns a list with TOdoFacade instances.
+            bool: True on success.
         '''
-        out = self.todos.copy()
-        out = [
-            todo for todo in out if filter_func(todo)
-        ]
-        return out
+        start_datetime, end_datetime = self._to_range(start, end)
+        has_range = start_datetime is not None or end_datetime is not None
+        if isinstance(tags, str):
+            tags = [tags] if tags else []
+        if isinstance(status, str):
+            status = [status] if status else []
+
+        filters = []
+        if has_range:
+            # the filters read every DUE as local time, while the server
+            # compares in UTC; one more day on each side covers any offset
+            filters.append(dav_utils.build_due_filter(
+                start_datetime - timedelta(days=1) if start_datetime else None,
+                end_datetime + timedelta(days=1) if end_datetime else None
+            ))
+        # the prop-filters of a query all have to match, so any-of queries
+        # with several tags or statuses can only be done on the client side
+        if len(tags) == 1 or match_all:
+            filters += [dav_utils.build_text_filter('CATEGORIES', tag) for tag in tags]
+        if len(status) == 1:
+            filters.append(dav_utils.build_text_filter('STATUS', status[0]))
+        query = dav_utils.build_todo_query(filters)
 
-    def get_todos_by_date(self, datetime_str: str = '') -> list[TodoFacade]:
+        def fetch(calendar: Calendar) -> list[Todo]:
+            try:
+                # caldav annotates comp_class as an instance, not a class
+                return calendar.search(xml=query, comp_class=Todo)  # type: ignore
+            except error.DAVError:
+                return calendar.todos(include_completed=True)
+
+        if not self._populate_from_calendars(fetch):
+            return False
+
+        # one query, so that the client-side filtering is measured once
+        found = self.query()
+        if has_range:
+            found = found.due_between(start, end)
+        if tags:
+            found = found.tags(tags, match_all=match_all)
+        if status:
+            found = found.status(status)
+        if not include_completed:
+            found = found.status('COMPLETED', exclude=True)
+        self.todos = found.all()
+        return True
+
+    def populate_from_todo_list(
+        self,
+        todo_list: list[Todo] | None = None,
+        future_weeks: int = -1,
+        past_weeks: int = 1,
+        prefetch_weeks: int = 0
+    ) -> bool:
         '''
-        Filter by the given date / datetime. There can be a date like
-        "YYYY-MM-DD" or "YYYY-MM-DD HH:MM" or "YYYYMMDD" or "YYYYMMDDTHHMMZ".
+        Initialize with a given todo list. This method will be used internally
+        to initialize with the server connection, but also can be used by
+        the tests without the server connection. Multiple connected calendars
+        will be fetched in parallel.
 
-        If a datetime is given, the time has to be equal as well exactly! Otherwise
-        the check will only check for the day, even if the DUE date of the VTODO
-        would have a time.
+        With future_weeks only the (not completed) tasks in the window from
+        past_weeks ago until future_weeks from now will be loaded. The window
+        can be extended later with extend_window(). With prefetch_weeks the
+        windows next to the loaded one will be fetched in the background
+        already, so that extending the window does not have to wait for the
+        server.
 
         Args:
-            datetime (str): Can be a date or datetime string. (default `''`)
+            todo_list (list[Todo] | None): \
+                A list containing Todo instances.
+            future_weeks (int): \
+                If above -1 this will set how many weeks in the future will be \
+                fetched from the todo repository.
+            past_weeks (int): \
+                How many weeks in the past will be fetched, if future_weeks \
+                is set. (default: `1`)
+            prefetch_weeks (int): \
+                How many weeks before and after the window will be fetched \
+                in the background. 0 disables prefetching. (default: `0`)
 
         Returns:
-            list[TodoFacade]: Returns a list with TodoFacade instances.
-        '''
-        exact_datetime = utils.string_to_datetime(datetime_str)
-        if exact_datetime is not None:
-            # a datetime with just 00:00:00.000 time is basically just a date
-            is_basically_date = (
-                exact_datetime.hour == 0
-                and exact_datetime.minute == 0
-                and exact_datetime.second == 0
-                and exact_datetime.microsecond == 0
-            )
-        else:
-            is_basically_date = False
+            bool: True on success.
+        '''
+        if todo_list is None:
+            if future_weeks == -1:
+                return self._populate_from_calendars(
+                    lambda calendar: calendar.todos(include_completed=True)
+                )
 
-        def daterange_check(todo: TodoFacade):
-            due_date_tmp = todo.get_due()
-            if (
-                isinstance(due_date_tmp, date)
-                and not isinstance(due_date_tmp, datetime)
+            now = datetime.now()
+            start = now - timedelta(weeks=past_weeks)
+            end = now + timedelta(weeks=future_weeks)
+            if not self._populate_from_calendars(
+                lambda calendar: self._search_window(calendar, start, end)
             ):
-                due_date = datetime.combine(due_date_tmp, datetime.min.time())
-            else:
-                due_date = due_date_tmp
+                return False
+            self.window = (start, end)
+            self.prefetch_weeks = prefetch_weeks
+            self._prefetch_window()
+            return True
 
-            if isinstance(due_date, datetime):
-                due_date = due_date.replace(tzinfo=tz.tzlocal())
+        if isinstance(todo_list, list):
+            # a full population invalidates the state of a previous sync()
+            self._reset_sync_state()
+            self._reset_window()
+            self.todos = [self._to_facade(todo) for todo in todo_list]
+            return True
 
-            due_date = (
-                due_date if not is_basically_date
-                else due_date.replace(hour=0, minute=0, second=0, microsecond=0)
-            )
+        return False
+
+    def populate_from_store(self, validate: bool = True) -> bool:
+        '''
+        Populate the internal list from the persistent local store (warm
+        start). The sync-tokens and the etags of the stored tasks will be
+        restored as well, so that a following sync() is incremental.
+
+        If validate is True and the calendars are connected, the stored
+        ctags will be compared with the calendars ctags (one cheap PROPFIND
+        per calendar). Only if one differs, sync() will fetch the changes
+        and update the store.
 
-            exact_check = (
-                exact_datetime is not None and due_date == exact_datetime
-            ) if exact_datetime is not None else True
+        Args:
+            validate (bool): \
+                Validate the stored data against the calendar. (default: `True`)
 
-            return todo.has_due() and exact_check
+        Returns:
+            bool: True on success.
+        '''
+        if self.store is None:
+            return False
 
-        return self.get_todos_filtered(daterange_check)
+        calendars = self._get_calendars()
+        stored_ctags = {}
+        self._reset_window()
+        todo_facades = []
+        self.etags = {}
+        for calendar_name in self.get_calendar_names():
+            key = self._get_calendar_key(calendar_name)
+            stored_ctag, stored_sync_token = self.store.get_state(key)
+            stored_ctags[calendar_name] = stored_ctag
+            self.sync_tokens[calendar_name] = stored_sync_token
+            for href, etag, data in self.store.load(key):
+                todo_facades.append(self._to_facade(
+                    Todo(
+                        self.client,
+                        url=href,
+                        data=data,
+                        parent=calendars.get(calendar_name)
+                    ),
+                    calendar_name
+                ))
+                if etag is not None:
+                    self.etags[href] = etag
+        self.todos = todo_facades
 
-    def get_todos_by_daterange(
+        if not validate or not calendars:
+            return True
+
+        def fetch_ctags() -> dict[str, str | None]:
+            calendars = self._get_calendars()
+            with ThreadPoolExecutor(max_workers=len(calendars)) as executor:
+                return dict(zip(
+                    calendars,
+                    executor.map(dav_utils.get_ctag, calendars.values())
+                ))
+
+        ctags = self._with_rediscovery(fetch_ctags)
+        if all(
+            ctag is not None and ctag == stored_ctags.get(calendar_name)
+            for calendar_name, ctag in ctags.items()
+        ):
+            for calendar_name in ctags:
+                self.store.set_checked(self._get_calendar_key(calendar_name))
+            return True
+
+        if not self.sync():
+            return False
+        for calendar_name, ctag in ctags.items():
+            # without a sync-token the store was not updated by sync()
+            if self.sync_tokens.get(calendar_name) is not None:
+                self.store.set_state(
+                    self._get_calendar_key(calendar_name),
+                    ctag,
+                    self.sync_tokens[calendar_name]
+                )
+        return True
+
+    def save_all(
         self,
-        start: str | date | datetime = '',
-        end: str | date | datetime = ''
-    ) -> list[TodoFacade]:
+        max_workers: int = SAVE_WORKERS
+    ) -> dict[str, tuple[bool, Exception | None]]:
+        '''
+        Save all modified (dirty) TodoFacades to the calendar concurrently
+        with a bounded pool of workers. Untouched ones will be skipped.
+
+        Args:
+            max_workers (int): \
+                The maximum number of concurrent saves. (default: `8`)
+
+        Returns:
+            dict: \
+                The UID as the key and the success tuple \
+                (bool, Exception | None) of TodoFacade.save() as the value.
+        '''
+        dirty_todos = [todo for todo in self.todos if todo.is_dirty()]
+        if not dirty_todos:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            results = executor.map(lambda todo: todo.save(), dirty_todos)
+            return {
+                todo.get_uid(): result
+                for todo, result in zip(dirty_todos, results)
+            }
+
+    def sync(self) -> bool:
+        '''
+        Incrementally synchronize the internal TodoFacade list with the
+        calendar(s) by using a RFC 6578 sync-collection REPORT. Only changed
+        or new VTODOs will be fetched (with calendar-multiget) and deleted
+        ones will be removed from the internal list. Already existing
+        TodoFacade instances will be patched in place, so that references
+        to them stay valid. Multiple calendars will be synced in parallel.
+
+        The first call (or a call after the server invalidated the stored
+        sync-token) will do a full synchronization. If the server does not
+        support sync-collection at all, this method falls back to
+        populate_from_todo_list().
+
+        Returns:
+            bool: True on success.
+        '''
+        calendars = self._get_calendars()
+        if not calendars:
+            return False
+
+        def fetch_changes() -> tuple[dict[str, Calendar], list[tuple | None]]:
+            calendars = self._get_calendars()
+            with ThreadPoolExecutor(max_workers=len(calendars)) as executor:
+                return (
+                    calendars,
+                    list(executor.map(self._fetch_sync_changes, calendars.items()))
+                )
+
+        calendars, results = self._with_rediscovery(fetch_changes)
+        if any(result is None for result in results):
+            return self.populate_from_todo_list()
+
+        by_href = {
+            self._get_href(todo.caldav_todo): todo
+            for todo in self.todos
+            if todo.caldav_todo.url is not None
+        }
+
+        for calendar_name, calendar, result in zip(
+            calendars, calendars.values(), results
+        ):
+            assert result is not None
+            full_sync, sync_token, listed, changed, todos = result
+
+            deleted = {href for href, etag in listed.items() if etag is None}
+            if full_sync:
+                # everything of this calendar the server did not list is gone
+                prefix = self._get_href(calendar)
+                deleted |= {
+                    href for href in set(by_href) | set(self.etags)
+                    if href.startswith(prefix) and href not in listed
+                }
+
+            # also remember the etags of non-VTODO resources, so that they
+            # won't be fetched again on every sync
+            for href in changed:
+                self.etags[href] = listed[href]
+
+            changed_todos = []
+            for todo in todos:
+                href = self._get_href(todo)
+                if href in by_href:
+                    by_href[href].set_caldav_todo(todo)
+                else:
+                    new_todo_facade = self._to_facade(todo, calendar_name)
+                    by_href[href] = new_todo_facade
+                    self._append_todo(new_todo_facade)
+                changed_todos.append(by_href[href])
+
+            for href in deleted:
+                self.etags.pop(href, None)
+                if href in by_href:
+                    self._remove_todo(by_href.pop(href))
+
+            self.sync_tokens[calendar_name] = sync_token
+
+            if self.store is not None:
+                key = self._get_calendar_key(calendar_name)
+                self.store.write(
+                    key,
+                    changed_todos,
+                    self.etags,
+                    deleted,
+                    replace=full_sync,
+                    sync_token=sync_token
+                )
+                self.store.set_checked(key)
+
+        # the calendars are loaded completely now
+        self._reset_window()
+        return True
+
+    def _connect_cached_calendars(self) -> bool:
         '''
-        Filter by the given time range, given as a string, date or datetime.
-        As a string there can be a start and / or a end date(time) as "YYYY-MM-DD"
-        or "YYYY-MM-DD HH:MM" or "YYYYMMDD" or "YYYYMMDDTHHMMZ".
+        Connect the calendars with their cached URLs, without any request.
 
-        The filter logic for start is ">=", while the filter logic for the end is
-        only "<". Not sure why, but it feels intuitive to me.
+        Returns:
+            bool: True, if all configured calendars were in the cache.
+        '''
+        cache = self._read_calendar_cache()
+        names = self.get_calendar_names()
+        urls = {name: cache.get(self._get_calendar_key(name)) for name in names}
+        if not all(urls.values()):
+            return False
+
+        self.calendars = {
+            name: Calendar(client=self.client, url=url, name=name)
+            for name, url in urls.items()
+        }
+        self.calendar = self.calendars[names[0]]
+        self.calendars_from_cache = True
+        return True
+
+    def _delete_todo(self, todo: TodoFacade) -> tuple[bool, Exception | None]:
+        '''
+        The network part of delete_todos() for one task: a DELETE with the
+        known ETag as If-Match. A task, which is not found on the server,
+        fails with an error.NotFoundError, so that delete_todos() can tell
+        a moved calendar from an already deleted task.
 
         Args:
-            start (str | date | datetime): \
-                The start date/datetime as a string. (default: `''`)
-            end (str | date | datetime): \
-                The end date/datetime as a string. (default: `''`)
+            todo (TodoFacade): The TodoFacade to delete.
 
         Returns:
-            list[TodoFacade]: Returns a list with TodoFacade instances.
+            tuple: The success tuple (bool, Exception | None).
         '''
-        if isinstance(start, str):
-            start_datetime = utils.string_to_datetime(start)
-        elif isinstance(start, date) and not isinstance(start, datetime):
-            start_datetime = datetime.combine(start, datetime.min.time(), tz.tzlocal())
-        else:
-            start_datetime = start.replace(tzinfo=tz.tzlocal())
+        caldav_todo = todo.caldav_todo
+        if caldav_todo.url is None:
+            # never saved, so only known locally
+            return (True, None)
+        etag = (
+            self.etags.get(self._get_href(caldav_todo))
+            or caldav_todo.props.get(dav.GetEtag.tag)
+        )
+        headers = {'If-Match': etag} if etag else {}
+        try:
+            response = (caldav_todo.client or self.client).request(
+                str(caldav_todo.url), 'DELETE', '', headers
+            )
+            if response.status == 404:
+                raise error.NotFoundError(str(caldav_todo.url), 'not found')
+            if response.status == 412:
+                raise error.DeleteError(
+                    f'{caldav_todo.url} was changed on the server meanwhile.'
+                )
+            if response.status not in (200, 204):
+                raise error.DeleteError(
+                    f'{caldav_todo.url}: {response.status} {response.reason}'
+                )
+            return (True, None)
+        except Exception as e:
+            return (False, e)
 
-        if isinstance(end, str):
-            end_datetime = utils.string_to_datetime(end)
-        elif isinstance(end, date) and not isinstance(end, datetime):
-            end_datetime = datetime.combine(end, datetime.max.time(), tz.tzlocal())
-        else:
-            end_datetime = end.replace(tzinfo=tz.tzlocal())
+    def _fetch_sync_changes(self, item: tuple[str, Calendar]) -> tuple | None:
+        '''
+        The network part of sync() for one calendar: request the changes
+        since the stored sync-token and fetch the changed VTODOs.
 
-        def daterange_check(todo: TodoFacade):
-            if (
-                isinstance(todo.get_due(), date)
-                and not isinstance(todo.get_due(), datetime)
-            ):
-                due_date = datetime.combine(todo.get_due(), datetime.min.time())
-            else:
-                due_date = todo.get_due()
+        Args:
+            item (tuple[str, Calendar]): The calendar name and the Calendar.
+
+        Returns:
+            tuple | None: \
+                The tuple (full_sync, sync_token, listed, changed, todos) \
+                with listed as a href -> etag dict (None for deleted ones), \
+                changed as a list of changed hrefs and todos as the fetched \
+                Todo instances. None, if the server does not support \
+                sync-collection.
+        '''
+        calendar_name, calendar = item
+        sync_token = self.sync_tokens.get(calendar_name)
 
-            if isinstance(due_date, datetime):
-                due_date = due_date.replace(tzinfo=tz.tzlocal())
+        full_sync = sync_token is None
+        changes = self._request_sync_changes(calendar, sync_token)
+        if changes is None and not full_sync:
+            # the server does not know the token anymore; start over
+            full_sync = True
+            changes = self._request_sync_changes(calendar, None)
+        if changes is None:
+            return None
 
-            start_check = (
-                start_datetime is not None and due_date >= start_datetime
-            ) if start_datetime is not None else True
+        listed = {}
+        changed = {}
+        for obj in changes:
+            href = self._get_href(obj)
+            etag = obj.props.get(dav.GetEtag.tag)
+            # a response without an etag is a deleted resource
+            listed[href] = etag
+            if etag is not None and self.etags.get(href) != etag:
+                changed[href] = (obj.url, etag)
 
-            end_check = (
-                end_datetime is not None and due_date < end_datetime
-            ) if end_datetime is not None else True
+        todos = self._fetch_todos_by_href(calendar, changed)
+        return (full_sync, changes.sync_token, listed, list(changed), todos)
 
-            return todo.has_due() and start_check and end_check
+    def _fetch_todos_by_href(self, calendar: Calendar, changed: dict) -> list[Todo]:
+        '''
+        Fetch the given hrefs with calendar-multiget REPORTs in chunks
+        and return the found VTODOs as caldav Todo instances. Resources
+        which are not VTODOs (or vanished meanwhile) will be skipped.
 
-        return self.get_todos_filtered(daterange_check)
+        Args:
+            calendar (Calendar): \
+                The calendar to fetch from.
+            changed (dict): \
+                Dict with the href string as the key and a tuple \
+                (URL, etag) as the value.
 
-    def get_todos_by_tags(
+        Returns:
+            list[Todo]: The fetched Todo instances.
+        '''
+        out = []
+        items = list(changed.values())
+        for i in range(0, len(items), self.SYNC_MULTIGET_CHUNK):
+            chunk = items[i:i + self.SYNC_MULTIGET_CHUNK]
+            etags = {str(url.canonical()): etag for url, etag in chunk}
+            for obj in calendar.calendar_multiget(url for url, _ in chunk):
+                if not obj.data or 'BEGIN:VTODO' not in obj.data:
+                    continue
+                href = self._get_href(obj)
+                out.append(Todo(
+                    self.client,
+                    url=obj.url,
+                    data=obj.data,
+                    parent=calendar,
+                    props={dav.GetEtag.tag: etags.get(href)}
+                ))
+        return out
+
+    def _fetch_window(
         self,
-        tags: str | list = '',
-        exclude: bool = False
-    ) -> list[TodoFacade]:
+        start: datetime,
+        end: datetime
+    ) -> list[tuple[str, list[Todo]]]:
         '''
-        Filter todos, which contain the given tag / tags, or do not
-        contain them (if exclude is True) and return the list of
-        TodoFaade instances.
+        Search the tasks of all connected calendars in the given window
+        in parallel. This does not touch the internal list, so it can run
+        in a background thread.
 
         Args:
-            tags (str | list): The tag or tag list to filter on.
-            exclude (bool): Exclude instead of include if True.
+            start (datetime): The start of the window.
+            end (datetime): The end of the window.
 
         Returns:
-            list[TodoFacade]: Returns a list with TOdoFacade instances.
+            list[tuple[str, list[Todo]]]: The (calendar name, Todos) tuples.
         '''
-        if isinstance(tags, str):
-            tags = [tags]
+        calendars = self._get_calendars()
+        if not calendars:
+            return []
+        with ThreadPoolExecutor(max_workers=len(calendars)) as executor:
+            todo_lists = executor.map(
+                lambda calendar: self._search_window(calendar, start, end),
+                calendars.values()
+            )
+            return list(zip(calendars, todo_lists))
+
+    def _get_calendar_key(self, calendar_name: str) -> str:
+        '''
+        Get the key of a calendar in the calendar cache and in the store,
+        so that equally named calendars of different servers or users do
+        not share their entries.
 
-        return self.get_todos_filtered(
-            lambda todo: (not exclude) == bool(set(tags) & set(todo.get_tags()))
+        Args:
+            calendar_name (str): The calendar name.
 
+        Returns:
+            str: The key with the server, the user and the calendar name.
+        '''
+        return '{} {} {}'.format(
+            self.config['NC_URI'], self.config['NC_USER'], calendar_name
         )
 
-    def init_config(self, config_dict: dict = {}) -> dict:
+    def _is_not_found(self, exception: Exception | None) -> bool:
         '''
-        Init the config with an optional config dict to overwrite the
-        programs config.
+        Check, if the given exception of a request means, that the resource
+        or its calendar was not found. caldav raises an error.NotFoundError
+        for most requests, but only an error.PutError with the status as
+        its message for a PUT; a PUT into a missing calendar gets a 409
+        Conflict (RFC 4918).
 
         Args:
-            config_dict (dict): \
-                If not empty, use it's values to replace internal \
-                config values. (default: `{}`)
+            exception (Exception | None): The exception or None.
 
         Returns:
-            dict: Returns the config as a dict.
-        '''
-        config = Config()
-        out = {
-            'NC_URI': config_dict.get('NC_URI', config.get('NC_URI')),
-            'NC_USER': config_dict.get('NC_USER', config.get('NC_USER')),
-            'NC_PASSWORD': config_dict.get('NC_PASSWORD', config.get('NC_PASSWORD')),
-            'NC_CALENDAR': config_dict.get('NC_CALENDAR', config.get('NC_CALENDAR'))
-        }
-        return out
+            bool: True, if it is a "not found" error.
+        '''
+        if isinstance(exception, error.NotFoundError):
+            return True
+        if not isinstance(exception, error.PutError):
+            return False
+        # caldav passes the message as the url of the error
+        return any(
+            str(text).startswith(('404 ', '409 '))
+            for text in (exception.url, exception.reason)
+        )
 
-    def populate_from_todo_list(
+    def _new_todo_facade(
         self,
-        todo_list: list[Todo] | None = None,
-        future_weeks: int = -1
+        summary: str,
+        due: date | datetime | None = None,
+        priority: int = 0,
+        tags: list = [],
+        calendar_name: str = ''
+    ) -> TodoFacade:
+        '''
+        Create a new TodoFacade (see add_todo()) without saving it. If
+        the calendar is connected, the caldav Todo is linked to it, so that
+        it can be saved there.
+
+        Args:
+            summary (str): The summary.
+            due (date | datetime | None): The optional due date.
+            priority (int): The optional priority between 0-9.
+            tags (list): A list of tags.
+            calendar_name (str): The name of the calendar or '' for the first.
+
+        Raises:
+            ValueError: If the calendar is not connected.
+
+        Returns:
+            TodoFacade: The new TodoFacade.
+        '''
+        calendar_name = calendar_name or self.get_calendar_names()[0]
+        calendars = self._get_calendars()
+        if calendars and calendar_name not in calendars:
+            raise ValueError(f'Calendar "{calendar_name}" is not connected.')
+        calendar = calendars.get(calendar_name)
+
+        if isinstance(calendar, Calendar):
+            new_todo_facade = TodoFacade(Todo(
+                calendar.client,
+                data=vcal.create_ical(
+                    objtype='VTODO',
+                    summary=summary,
+                    dtstamp=datetime.now(),
+                    due=due,
+                    status='NEEDS-ACTION',
+                    priority=priority,
+                    categories=','.join(tags),
+                    uid=str(uuid.uuid4())
+                ),
+                parent=calendar
+            ))
+            new_todo_facade.calendar_name = calendar_name
+        else:
+            new_todo_facade = TodoFacade(
+                None,
+                summary,
+                due,
+                'NEEDS-ACTION',
+                priority,
+                tags
+            )
+        return new_todo_facade
+
+    def _load_window(self, side: str, limit: datetime, target: datetime) -> datetime:
+        '''
+        Load the tasks between the given limit of the window and the
+        target and merge them into the internal list. A prefetched window
+        on that side will be used first.
+
+        Args:
+            side (str): \
+                Either "past" or "future".
+            limit (datetime): \
+                The current start (past) or end (future) of the window.
+            target (datetime): \
+                The new start or end of the window.
+
+        Returns:
+            datetime: The new start or end, which may be further than the target.
+        '''
+        past = side == 'past'
+        prefetched = self._prefetched.pop(side, None)
+        if prefetched is not None:
+            start, end, future = prefetched
+            try:
+                self._merge_window(future.result())
+                limit = start if past else end
+            except Exception:
+                # the prefetch failed; simply load it again
+                pass
+
+        if (past and target < limit) or (not past and target > limit):
+            start, end = (target, limit) if past else (limit, target)
+            self._merge_window(self._fetch_window(start, end))
+            limit = target
+        return limit
+
+    def _merge_window(self, results: list[tuple[str, list[Todo]]]):
+        '''
+        Merge the Todos of a window into the internal list. Tasks, which
+        are already known by their UID, will be skipped, so that they keep
+        possible local changes.
+
+        Args:
+            results (list[tuple[str, list[Todo]]]): \
+                The (calendar name, Todos) tuples of _fetch_window().
+        '''
+        for calendar_name, todos in results:
+            for todo in todos:
+                self.add_todo_facade(self._to_facade(todo, calendar_name))
+
+    def _populate_from_calendars(
+        self,
+        fetch: Callable[[Calendar], list[Todo]]
     ) -> bool:
         '''
-        Initialize with a given todo list. This method will be used internally
-        to initialize with the server connection, but also can be used by
-        the tests without the server connection.
+        Replace the internal list with the Todos, which the given fetch
+        function returns for each connected calendar. The calendars will
+        be fetched in parallel.
 
         Args:
-            todo_list (list[Todo] | None): \
-                A list containing Todo instances.
-            future_weeks (int): \
-                If above -1 this will set how many weeks in the future will be \
-                fetched from the todo repository.
+            fetch (Callable): \
+                Function, which gets a Calendar and returns its Todos.
 
         Returns:
-            bool: True on success.
+            bool: True on success, False if no calendar is connected.
         '''
-        if todo_list is None:
-            if isinstance(self.calendar, Calendar):
-                if future_weeks != -1:
-                    now = datetime.now()
-                    start = now - timedelta(weeks=1)
-                    end = now + timedelta(weeks=5)
-
-                    # Todos mit Kategorie 'week' abrufen
-                    todo_list = self.calendar.search(
-                        todo=True,
-                        start=start,
-                        end=end
-                    )
-                else:
-                    todo_list = self.calendar.todos(include_completed=True)
+        calendars = self._get_calendars()
+        if not calendars:
+            return False
 
-        if isinstance(todo_list, list):
-            self.todos = []
-            for todo in todo_list:
-                self.todos.append(TodoFacade(todo))
-            return True
+        def fetch_all() -> tuple[dict[str, Calendar], list[list[Todo]]]:
+            calendars = self._get_calendars()
+            with ThreadPoolExecutor(max_workers=len(calendars)) as executor:
+                return (calendars, list(executor.map(fetch, calendars.values())))
 
-        return False
+        calendars, todo_lists = self._with_rediscovery(fetch_all)
+
+        # a full population invalidates the state of a previous sync()
+        self._reset_sync_state()
+        self._reset_window()
+        self.todos = [
+            self._to_facade(todo, calendar_name)
+            for calendar_name, todos in zip(calendars, todo_lists)
+            for todo in todos
+        ]
+        return True
+
+    def _prefetch_window(self):
+        '''
+        Start fetching the windows before and after the loaded window in
+        the background, if prefetch_weeks is set.
+        '''
+        if self.window is None or self.prefetch_weeks <= 0:
+            return
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(
+                max_workers=self.PREFETCH_WORKERS
+            )
+
+        start, end = self.window
+        weeks = timedelta(weeks=self.prefetch_weeks)
+        for side, window in (
+            ('past', (start - weeks, start)),
+            ('future', (end, end + weeks))
+        ):
+            if side not in self._prefetched:
+                self._prefetched[side] = (*window, self._prefetch_executor.submit(
+                    self._fetch_window, *window
+                ))
+
+    def _read_calendar_cache(self) -> dict:
+        '''
+        Read the cached calendar URLs.
+
+        Returns:
+            dict: The cache key -> URL dict; empty, if there is no cache.
+        '''
+        if not self.config.get('CALENDAR_CACHE'):
+            return {}
+        try:
+            with open(self.config['CALENDAR_CACHE'], 'r') as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+        return cache if isinstance(cache, dict) else {}
+
+    def _rediscover_calendars(self) -> bool:
+        '''
+        Discover the calendars again, if they were connected from the
+        cache, since a cached URL was not found (anymore).
+
+        Returns:
+            bool: True, if the calendars were discovered again.
+        '''
+        if not self.calendars_from_cache:
+            return False
+        self.connect_calendar(use_cache=False)
+        return True
+
+    def _relink_todo(self, todo: TodoFacade):
+        '''
+        Move the caldav Todo of the given TodoFacade into the connected
+        calendar of the same name, e.g. after the calendars were
+        discovered again. The file name of the resource is kept.
+
+        Args:
+            todo (TodoFacade): The TodoFacade.
+        '''
+        calendar = self._get_calendars().get(todo.calendar_name)
+        caldav_todo = todo.caldav_todo
+        if calendar is None or calendar.url is None or caldav_todo.url is None:
+            return
+        old_href = self._get_href(caldav_todo)
+        caldav_todo.url = calendar.url.join(str(caldav_todo.url).rstrip('/').rsplit('/', 1)[-1])
+        caldav_todo.parent = calendar
+        if old_href in self.etags:
+            self.etags[self._get_href(caldav_todo)] = self.etags.pop(old_href)
+
+    def _request_sync_changes(self, calendar: Calendar, sync_token: str | None):
+        '''
+        Request the sync-collection REPORT for the given token.
+
+        Args:
+            calendar (Calendar): \
+                The calendar.
+            sync_token (str | None): \
+                The sync-token of the last sync or None for all objects.
+
+        Returns:
+            SynchronizableCalendarObjectCollection | None: \
+                The changes or None, if the server rejected the request.
+        '''
+        try:
+            return calendar.objects_by_sync_token(sync_token)
+        except error.DAVError:
+            return None
+
+    def _reset_window(self):
+        '''
+        Forget the loaded window and its prefetched neighbours.
+        '''
+        for _, _, future in self._prefetched.values():
+            future.cancel()
+        self._prefetched = {}
+        self.window = None
+
+    def _search_window(
+        self,
+        calendar: Calendar,
+        start: datetime,
+        end: datetime
+    ) -> list[Todo]:
+        '''
+        Search the not completed tasks of the calendar in the given window.
+
+        Args:
+            calendar (Calendar): The calendar.
+            start (datetime): The start of the window.
+            end (datetime): The end of the window.
+
+        Returns:
+            list[Todo]: The found Todos.
+        '''
+        return calendar.search(todo=True, start=start, end=end)
+
+    def _with_rediscovery(self, request: Callable[[], T]) -> T:
+        '''
+        Run the given request function. If it fails, since a calendar was
+        not found (anymore) and the calendars were connected from the
+        cache, they are discovered again and the function is run once
+        more; so it has to look the calendars up itself.
+
+        Args:
+            request (Callable): \
+                The function, which sends the request(s).
+
+        Returns:
+            The result of the function.
+        '''
+        try:
+            return request()
+        except error.DAVError as e:
+            if not self._is_not_found(e) or not self._rediscover_calendars():
+                raise
+        return request()
+
+    def _write_calendar_cache(self):
+        '''
+        Write the URLs of the connected calendars into the calendar cache.
+        The file will be replaced atomically, so that parallel processes
+        never read a half written cache.
+        '''
+        if not self.config.get('CALENDAR_CACHE'):
+            return
+        cache = self._read_calendar_cache()
+        for name, calendar in self.calendars.items():
+            cache[self._get_calendar_key(name)] = str(calendar.url)
+        try:
+            os.makedirs(os.path.dirname(self.config['CALENDAR_CACHE']) or '.', exist_ok=True)
+            temp_file = '{}.{}.tmp'.format(self.config['CALENDAR_CACHE'], os.getpid())
+            with open(temp_file, 'w') as cache_file:
+                json.dump(cache, cache_file, indent=2)
+            os.replace(temp_file, self.config['CALENDAR_CACHE'])
+        except OSError:
+            # the cache is only an optimisation
+            pass
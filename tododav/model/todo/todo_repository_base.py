@@ -0,0 +1,257 @@
+'''
+TodoRepositoryBase class.
+
+The common part of the TodoRepository and the AsyncTodoRepository: the
+config, the connected calendars and the internal list of TodoFacades with
+its indexes and filters. It does not do any request itself, so that the
+blocking and the asyncio-native repository can each add their own I/O.
+'''
+
+from tododav.model.config import Config
+from tododav.model.todo.todo_collection import TodoCollection
+from tododav.model.todo.todo_facade import TodoFacade
+from tododav.model.todo.todo_stats import TodoStats
+
+from tododav.utils import dav_utils
+
+from typing import Iterable
+from caldav.objects import Calendar, Todo
+
+import os
+import time
+
+
+class TodoRepositoryBase(TodoCollection):
+
+    CALENDAR_CACHE_FILE = 'calendar_cache.json'
+    '''
+    The file name of the cached calendar URLs in the data dir of the
+    config (see TodoRepository.connect_calendar()).
+    '''
+
+    stats: TodoStats
+    '''
+    The metrics of the requests, the parsing and the filters. Unlike a
+    plain TodoCollection, a repository always has them.
+    '''
+
+    def __init__(
+        self,
+        config_dict: dict = {},
+        lazy: bool = False,
+        stats: TodoStats | None = None
+    ):
+        '''
+        Initialize the repository and give an optional config dict.
+        Otherwise use the programs config.
+
+        Args:
+            config_dict (dict): \
+                If not empty, use it's values to replace internal \
+                config values. (default: `{}`)
+            lazy (bool): \
+                If True, the loaded tasks will be wrapped into lazy \
+                TodoFacades, which only parse their iCalendar data when \
+                needed. (default: `False`)
+            stats (TodoStats | None): \
+                The metrics. A new TodoStats will be used, if not given. \
+                (default: `None`)
+        '''
+        if stats is None:
+            stats = TodoStats()
+        self.config = self.init_config(config_dict)
+        self.client = dav_utils.StatsDAVClient(
+            url=self.config['NC_URI'],
+            username=self.config['NC_USER'],
+            password=self.config['NC_PASSWORD'],
+            stats=stats
+        )
+        self.calendar = None
+        self.calendars: dict[str, Calendar] = {}
+        super().__init__(stats=stats)
+        self.sync_tokens: dict[str, str | None] = {}
+        self.etags: dict[str, str] = {}
+        self.lazy = lazy
+
+    def close(self):
+        '''
+        Close the HTTP session of the client.
+        '''
+        self.client.close()
+
+    def get_calendar_names(self) -> list[str]:
+        '''
+        Get the configured calendar names. NC_CALENDAR can either be
+        one name or a list of names.
+
+        Returns:
+            list[str]: The list of calendar names.
+        '''
+        names = self.config['NC_CALENDAR']
+        if isinstance(names, str):
+            return [names]
+        return [str(name) for name in names]
+
+    def init_config(self, config_dict: dict = {}) -> dict:
+        '''
+        Init the config with an optional config dict to overwrite the
+        programs config.
+
+        Args:
+            config_dict (dict): \
+                If not empty, use it's values to replace internal \
+                config values. (default: `{}`)
+
+        Returns:
+            dict: Returns the config as a dict.
+        '''
+        config = Config()
+        out = {
+            'NC_URI': config_dict.get('NC_URI', config.get('NC_URI')),
+            'NC_USER': config_dict.get('NC_USER', config.get('NC_USER')),
+            'NC_PASSWORD': config_dict.get('NC_PASSWORD', config.get('NC_PASSWORD')),
+            'NC_CALENDAR': config_dict.get('NC_CALENDAR', config.get('NC_CALENDAR')),
+            'CALENDAR_CACHE': config_dict.get(
+                'CALENDAR_CACHE',
+                os.path.join(config.data_dir, self.CALENDAR_CACHE_FILE)
+            )
+        }
+        return out
+
+    def _append_todo(self, todo: TodoFacade):
+        '''
+        Append a TodoFacade to the internal list, index it and observe it
+        for changes. It records its parsing into the stats from now on.
+
+        Args:
+            todo (TodoFacade): The TodoFacade to append.
+        '''
+        if todo.stats is None:
+            todo.stats = self.stats
+        super()._append_todo(todo)
+        todo.observers.append(self._on_todo_changed)
+
+    def _append_todos(self, todos: Iterable[TodoFacade]):
+        '''
+        Append many TodoFacades to the internal list, index them and
+        observe them for changes (see _append_todo()).
+
+        Args:
+            todos (Iterable[TodoFacade]): The TodoFacades to append.
+        '''
+        todos = list(todos)
+        for todo in todos:
+            if todo.stats is None:
+                todo.stats = self.stats
+        super()._append_todos(todos)
+        for todo in todos:
+            todo.observers.append(self._on_todo_changed)
+
+    def _clear_todos(self):
+        '''
+        Stop observing the internal TodoFacades and remove them.
+        '''
+        for todo in self._todos:
+            todo.observers.remove(self._on_todo_changed)
+        super()._clear_todos()
+
+    def _get_calendars(self) -> dict[str, Calendar]:
+        '''
+        Get the connected calendars as a name -> Calendar dict. If only
+        self.calendar was set, it will be used with the first configured
+        calendar name.
+
+        Returns:
+            dict[str, Calendar]: The connected calendars.
+        '''
+        if self.calendars:
+            return self.calendars
+        if isinstance(self.calendar, Calendar):
+            return {self.get_calendar_names()[0]: self.calendar}
+        return {}
+
+    def _get_href(self, obj) -> str:
+        '''
+        Get a canonical href string from the given caldav object, which
+        can be used as a key for comparing resources.
+
+        Args:
+            obj (CalendarObjectResource): The caldav object.
+
+        Returns:
+            str: The canonical href string.
+        '''
+        return str(obj.url.canonical())
+
+    def _on_todo_changed(self, todo: TodoFacade, field: str):
+        '''
+        Observer for the internal TodoFacades, which keeps the indexes
+        up to date.
+
+        Args:
+            todo (TodoFacade): The changed TodoFacade.
+            field (str): The name of the changed field.
+        '''
+        if field in ('uid', 'caldav_todo', ''):
+            self._unindex_uid(todo)
+            self._index_uid(todo)
+        if field in ('tags', 'caldav_todo', ''):
+            self.tag_index.update(todo)
+        if field in ('due', 'caldav_todo', ''):
+            self.due_index.update(todo, self._positions[todo])
+
+    def _remove_todo(self, todo: TodoFacade):
+        '''
+        Remove a TodoFacade from the internal list and its indexes.
+
+        Args:
+            todo (TodoFacade): The TodoFacade to remove.
+        '''
+        super()._remove_todo(todo)
+        todo.observers.remove(self._on_todo_changed)
+
+    def _remove_todos(self, todos: Iterable[TodoFacade]):
+        '''
+        Remove many TodoFacades from the internal list and its indexes.
+
+        Args:
+            todos (Iterable[TodoFacade]): The TodoFacades to remove.
+        '''
+        todos = set(todos)
+        super()._remove_todos(todos)
+        for todo in todos:
+            todo.observers.remove(self._on_todo_changed)
+
+    def _reset_sync_state(self):
+        '''
+        Forget the sync-tokens and etags of a previous sync.
+        '''
+        self.sync_tokens = {}
+        self.etags = {}
+
+    def _to_facade(self, todo: Todo, calendar_name: str = '') -> TodoFacade:
+        '''
+        Wrap the given Todo into a TodoFacade, which knows its calendar.
+
+        Args:
+            todo (Todo): \
+                The caldav Todo.
+            calendar_name (str): \
+                The name of the source calendar. If left blank, it will be \
+                looked up by the Todos parent. (default: `''`)
+
+        Returns:
+            TodoFacade: The TodoFacade.
+        '''
+        start = time.perf_counter()
+        todo_facade = TodoFacade(todo, lazy=self.lazy)
+        if todo_facade.scanned is not None:
+            self.stats.record('scan', duration=time.perf_counter() - start)
+        todo_facade.stats = self.stats
+        if not calendar_name:
+            for name, calendar in self._get_calendars().items():
+                if todo.parent is calendar:
+                    calendar_name = name
+                    break
+        todo_facade.calendar_name = calendar_name
+        return todo_facade
@@ -0,0 +1,253 @@
+'''
+TodoStats class.
+
+Metrics of a TodoRepository, so that it can be told where the time of
+e.g. a slow sync goes: into the HTTP requests, the XML of the responses,
+the iCalendar parsing of the tasks or the filters. The repository (and
+its client and TodoFacades) report events to its TodoStats, which sums
+them up and passes them on to the registered hooks, e.g. to export them
+to a monitoring:
+
+    repo.stats.add_hook(lambda event, data: print(event, data))
+'''
+
+from typing import Callable
+
+import functools
+import threading
+import time
+
+
+class TodoStats:
+
+    EVENTS = ('request', 'xml', 'parse', 'scan', 'filter')
+    '''
+    The names of the events, which record() accepts:
+
+    - request: one HTTP request with kind, duration, bytes_sent, \
+      bytes_received and status.
+    - xml: the parsing of the XML response of one request with kind \
+      and duration.
+    - parse: the full iCalendar parsing of one task with duration and \
+      reparse (True, if the task was parsed before already).
+    - scan: the cheap scan of one lazy task with duration.
+    - filter: one filter call with name (e.g. "TodoQuery.all"), duration \
+      and count (found tasks).
+    '''
+
+    def __init__(self):
+        '''
+        The summed up metrics and the hooks, which get every single event.
+        It is thread-safe, since the requests run in worker threads.
+        '''
+        self.hooks: list[Callable[[str, dict], None]] = []
+        '''
+        Callables, which get the event name and the event data dict after
+        each recorded event.
+        '''
+
+        self.lock = threading.Lock()
+        self.reset()
+
+    def add_hook(self, hook: Callable[[str, dict], None]):
+        '''
+        Register a hook, which gets the name and the data of every event
+        (see EVENTS). It is called in the thread, which recorded the
+        event, so it should be fast.
+
+        Args:
+            hook (Callable): The hook.
+        '''
+        self.hooks.append(hook)
+
+    def as_dict(self) -> dict:
+        '''
+        Get a copy of the summed up metrics, e.g. for an export.
+
+        Returns:
+            dict: The metrics.
+        '''
+        with self.lock:
+            return {
+                'requests': {kind: values.copy() for kind, values in self.requests.items()},
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received,
+                'parse': {
+                    'count': self.parse_count,
+                    'duration': self.parse_duration,
+                    'reparses': self.reparse_count,
+                    'mean': self.parse_duration / self.parse_count if self.parse_count else 0.0
+                },
+                'scan': {
+                    'count': self.scan_count,
+                    'duration': self.scan_duration,
+                    'mean': self.scan_duration / self.scan_count if self.scan_count else 0.0
+                },
+                'filters': {name: values.copy() for name, values in self.filters.items()}
+            }
+
+    def get_request_count(self, kind: str = '') -> int:
+        '''
+        Get the number of requests of the given kind or of all requests.
+
+        Args:
+            kind (str): \
+                The request kind, e.g. "PROPFIND" or "REPORT sync-collection". \
+                If left blank, all requests are counted. (default: `''`)
+
+        Returns:
+            int: The number of requests.
+        '''
+        with self.lock:
+            if kind:
+                return int(self.requests.get(kind, {}).get('count', 0))
+            return int(sum(values['count'] for values in self.requests.values()))
+
+    def record(self, event: str, **data):
+        '''
+        Record an event and pass it on to the hooks.
+
+        Args:
+            event (str): The event name (see EVENTS).
+            **data: The event data.
+
+        Raises:
+            ValueError: If the event is unknown.
+        '''
+        if event not in self.EVENTS:
+            raise ValueError(f'Unknown event "{event}".')
+
+        with self.lock:
+            if event == 'request':
+                values = self._get_request_values(data['kind'])
+                values['count'] += 1
+                values['duration'] += data['duration']
+                values['bytes_sent'] += data.get('bytes_sent', 0)
+                values['bytes_received'] += data.get('bytes_received', 0)
+                status = data.get('status')
+                if not status or status >= 400:
+                    values['errors'] += 1
+                self.bytes_sent += data.get('bytes_sent', 0)
+                self.bytes_received += data.get('bytes_received', 0)
+            elif event == 'xml':
+                self._get_request_values(data['kind'])['xml_duration'] += data['duration']
+            elif event == 'parse':
+                self.parse_count += 1
+                self.parse_duration += data['duration']
+                if data.get('reparse'):
+                    self.reparse_count += 1
+            elif event == 'scan':
+                self.scan_count += 1
+                self.scan_duration += data['duration']
+            else:
+                values = self.filters.setdefault(
+                    data['name'], {'count': 0, 'duration': 0.0, 'found': 0}
+                )
+                values['count'] += 1
+                values['duration'] += data['duration']
+                values['found'] += data.get('count', 0)
+
+        for hook in self.hooks:
+            hook(event, data)
+
+    def remove_hook(self, hook: Callable[[str, dict], None]):
+        '''
+        Unregister a hook.
+
+        Args:
+            hook (Callable): The hook.
+        '''
+        self.hooks.remove(hook)
+
+    def reset(self):
+        '''
+        Set all metrics back to zero. The hooks stay registered.
+        '''
+        with self.lock:
+            self.requests: dict[str, dict] = {}
+            '''
+            The metrics per request kind (e.g. "PUT" or "REPORT
+            calendar-query"): count, duration, xml_duration, bytes_sent,
+            bytes_received and errors.
+            '''
+
+            self.bytes_sent = 0
+            self.bytes_received = 0
+            self.parse_count = 0
+            self.parse_duration = 0.0
+            self.reparse_count = 0
+            '''
+            How many of the parses were done for a task, which was
+            parsed before already.
+            '''
+
+            self.scan_count = 0
+            self.scan_duration = 0.0
+            self.filters: dict[str, dict] = {}
+            '''
+            The metrics per filter name: count, duration and found.
+            '''
+
+    def _get_request_values(self, kind: str) -> dict:
+        '''
+        Get the metrics dict of the given request kind.
+
+        Args:
+            kind (str): The request kind.
+
+        Returns:
+            dict: The metrics dict.
+        '''
+        if kind not in self.requests:
+            self.requests[kind] = {
+                'count': 0,
+                'duration': 0.0,
+                'xml_duration': 0.0,
+                'bytes_sent': 0,
+                'bytes_received': 0,
+                'errors': 0
+            }
+        return self.requests[kind]
+
+
+_filter_calls = threading.local()
+'''
+The depth of the measured filter calls per thread (see measure_filter()).
+'''
+
+
+def measure_filter(method: Callable) -> Callable:
+    '''
+    Decorate a filter method of a TodoCollection or TodoQuery, so that its
+    duration and the number of found tasks are recorded in the TodoStats
+    of the collection (if it has one). Only the outermost call is recorded,
+    not the filters, which it calls itself (e.g. TodoQuery.all() calling
+    get_todos_by_tags()), so that the filters aren't counted twice.
+
+    Args:
+        method (Callable): The filter method.
+
+    Returns:
+        Callable: The decorated method.
+    '''
+    @functools.wraps(method)
+    def measured(self, *args, **kwargs):
+        stats = self.stats
+        depth = getattr(_filter_calls, 'depth', 0)
+        if stats is None or depth:
+            return method(self, *args, **kwargs)
+        _filter_calls.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            _filter_calls.depth = depth
+        stats.record(
+            'filter',
+            name=method.__qualname__,
+            duration=time.perf_counter() - start,
+            count=result if isinstance(result, int) else len(result)
+        )
+        return result
+
+    return measured
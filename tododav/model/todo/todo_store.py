@@ -0,0 +1,405 @@
+'''
+TodoStore class.
+
+A persistent local SQLite store for the VTODOs of one or more calendars.
+It keeps the raw iCalendar data together with the href, the ETag and
+some extracted columns, so that a TodoRepository can start warm from the
+local disk and so that the date / tag filters can be answered by indexed
+SQL queries.
+
+The rows are keyed by a calendar key. The TodoRepository uses the server,
+the user and the calendar name for it (like for its calendar cache), so
+that equally named calendars of different accounts do not overwrite each
+other in a shared database file.
+'''
+
+from tododav.model.config import Config
+from tododav.model.todo.todo_collection import TodoCollection
+from tododav.model.todo.todo_facade import TodoFacade
+
+from tododav.utils import utils
+
+from caldav.objects import Todo
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Iterable, Iterator
+
+import os
+import sqlite3
+import time
+
+
+class TodoStore:
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS calendars (
+            calendar TEXT PRIMARY KEY,
+            ctag TEXT,
+            sync_token TEXT
+        );
+        CREATE TABLE IF NOT EXISTS todos (
+            calendar TEXT NOT NULL,
+            href TEXT NOT NULL,
+            etag TEXT,
+            uid TEXT,
+            due INTEGER,
+            status TEXT,
+            priority INTEGER,
+            data TEXT NOT NULL,
+            PRIMARY KEY (calendar, href)
+        );
+        CREATE INDEX IF NOT EXISTS todos_uid ON todos (calendar, uid);
+        CREATE INDEX IF NOT EXISTS todos_due ON todos (calendar, due);
+        CREATE TABLE IF NOT EXISTS todo_tags (
+            calendar TEXT NOT NULL,
+            href TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (calendar, href, tag)
+        );
+        CREATE INDEX IF NOT EXISTS todo_tags_tag ON todo_tags (calendar, tag);
+        CREATE TABLE IF NOT EXISTS checks (
+            calendar TEXT PRIMARY KEY,
+            checked REAL NOT NULL
+        );
+    '''
+
+    TIMEOUT = 30.0
+    '''
+    Seconds to wait for a lock, which another process or thread holds
+    on the database, before giving up.
+    '''
+
+    def __init__(self, db_file: str = ''):
+        '''
+        The store for VTODOs. It is safe to use the same database file
+        from several processes at the same time: the database runs in
+        WAL mode, every write happens in its own (immediate) transaction
+        and every operation uses its own short-lived connection.
+
+        Args:
+            db_file (str): \
+                The path to the SQLite database file. If left blank, \
+                "todos.sqlite" inside the programs data_dir will be \
+                used. (default: `''`)
+        '''
+        if not db_file:
+            db_file = os.path.join(Config().data_dir, 'todos.sqlite')
+        self.db_file = db_file
+
+        db_dir = os.path.dirname(self.db_file)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+
+        with self.connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(self.SCHEMA)
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        '''
+        Open a connection to the database and close it afterwards.
+
+        Yields:
+            sqlite3.Connection: The connection.
+        '''
+        connection = sqlite3.connect(
+            self.db_file,
+            timeout=self.TIMEOUT,
+            isolation_level=None
+        )
+        try:
+            connection.execute('PRAGMA synchronous=NORMAL')
+            yield connection
+        finally:
+            connection.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        '''
+        Open a connection with an immediate write transaction, which
+        will be committed on success and rolled back on an exception.
+
+        Yields:
+            sqlite3.Connection: The connection.
+        '''
+        with self.connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+    def get_state(self, calendar: str) -> tuple[str | None, str | None]:
+        '''
+        Get the stored ctag and sync-token of the given calendar.
+
+        Args:
+            calendar (str): The calendar key.
+
+        Returns:
+            tuple: Returns the tuple (ctag, sync_token).
+        '''
+        with self.connect() as connection:
+            row = connection.execute(
+                'SELECT ctag, sync_token FROM calendars WHERE calendar = ?',
+                (calendar,)
+            ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def set_state(
+        self,
+        calendar: str,
+        ctag: str | None = None,
+        sync_token: str | None = None
+    ):
+        '''
+        Set the ctag and the sync-token of the given calendar.
+
+        Args:
+            calendar (str): \
+                The calendar key.
+            ctag (str | None): \
+                The ctag or None to keep the stored one. (default: `None`)
+            sync_token (str | None): \
+                The sync-token. (default: `None`)
+        '''
+        with self.transaction() as connection:
+            self._set_state(connection, calendar, ctag, sync_token)
+
+    def get_checked(self, calendar: str) -> float | None:
+        '''
+        Get the time, when the stored VTODOs of the given calendar were
+        confirmed to match the server the last time (see set_checked()).
+
+        Args:
+            calendar (str): The calendar key.
+
+        Returns:
+            float | None: The time in seconds since the epoch or None.
+        '''
+        with self.connect() as connection:
+            row = connection.execute(
+                'SELECT checked FROM checks WHERE calendar = ?',
+                (calendar,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_checked(self, calendar: str, checked: float | None = None):
+        '''
+        Remember, that the stored VTODOs of the given calendar match the
+        server, e.g. after a sync or after comparing the ctags.
+
+        Args:
+            calendar (str): \
+                The calendar key.
+            checked (float | None): \
+                The time in seconds since the epoch or None for now. \
+                (default: `None`)
+        '''
+        with self.transaction() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO checks (calendar, checked) VALUES (?, ?)',
+                (calendar, time.time() if checked is None else checked)
+            )
+
+    def load(self, calendar: str) -> list[tuple[str, str | None, str]]:
+        '''
+        Load all stored VTODOs of the given calendar.
+
+        Args:
+            calendar (str): The calendar key.
+
+        Returns:
+            list[tuple]: A list of tuples (href, etag, data).
+        '''
+        with self.connect() as connection:
+            return connection.execute(
+                'SELECT href, etag, data FROM todos WHERE calendar = ? '
+                'ORDER BY rowid',
+                (calendar,)
+            ).fetchall()
+
+    def write(
+        self,
+        calendar: str,
+        todos: Iterable[TodoFacade] = (),
+        etags: dict = {},
+        deleted: Iterable[str] = (),
+        replace: bool = False,
+        ctag: str | None = None,
+        sync_token: str | None = None
+    ):
+        '''
+        Write changed / new TodoFacades into the store and remove deleted
+        ones, all in one transaction. The state of the calendar will be
+        set as well.
+
+        Args:
+            calendar (str): \
+                The calendar key.
+            todos (Iterable[TodoFacade]): \
+                The changed or new TodoFacades. Only the ones with an url \
+                can be stored. (default: `()`)
+            etags (dict): \
+                The href -> etag dict for the todos. (default: `{}`)
+            deleted (Iterable[str]): \
+                The hrefs of deleted VTODOs. (default: `()`)
+            replace (bool): \
+                If True, all other stored VTODOs of the calendar will be \
+                removed first. (default: `False`)
+            ctag (str | None): \
+                The ctag to store or None to keep the stored one. \
+                (default: `None`)
+            sync_token (str | None): \
+                The sync-token to store. (default: `None`)
+        '''
+        with self.transaction() as connection:
+            if replace:
+                connection.execute(
+                    'DELETE FROM todos WHERE calendar = ?', (calendar,)
+                )
+                connection.execute(
+                    'DELETE FROM todo_tags WHERE calendar = ?', (calendar,)
+                )
+            for href in deleted:
+                self._delete(connection, calendar, href)
+            for todo in todos:
+                if todo.caldav_todo.url is None:
+                    continue
+                href = str(todo.caldav_todo.url.canonical())
+                self._delete(connection, calendar, href)
+                connection.execute(
+                    'INSERT INTO todos '
+                    '(calendar, href, etag, uid, due, status, priority, data) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (
+                        calendar,
+                        href,
+                        etags.get(href),
+                        todo.get_uid(),
+                        utils.to_timestamp(todo.get_due()) if todo.has_due() else None,
+                        todo.get_status(),
+                        todo.get_priority(),
+                        todo.caldav_todo.data
+                    )
+                )
+                connection.executemany(
+                    'INSERT OR IGNORE INTO todo_tags (calendar, href, tag) '
+                    'VALUES (?, ?, ?)',
+                    [(calendar, href, tag) for tag in todo.get_tags()]
+                )
+            self._set_state(connection, calendar, ctag, sync_token)
+
+    def get_todos(self, calendar: str) -> list[TodoFacade]:
+        '''
+        Get all stored VTODOs of the given calendar as TodoFacades.
+
+        Args:
+            calendar (str): The calendar key.
+
+        Returns:
+            list[TodoFacade]: Returns a list with TodoFacade instances.
+        '''
+        return [self._to_facade(href, data) for href, _, data in self.load(calendar)]
+
+    def get_todos_by_daterange(
+        self,
+        calendar: str,
+        start: str | date | datetime | None = None,
+        end: str | date | datetime | None = None
+    ) -> list[TodoFacade]:
+        '''
+        Get the stored VTODOs, which have a due date in the given range,
+        with the same logic as TodoRepository.get_todos_by_daterange():
+        ">=" for the start and "<" for the end, while an end date includes
+        the whole day.
+
+        Args:
+            calendar (str): \
+                The calendar key.
+            start (str | date | datetime | None): \
+                The start date / datetime. (default: `None`)
+            end (str | date | datetime | None): \
+                The end date / datetime. (default: `None`)
+
+        Returns:
+            list[TodoFacade]: Returns a list with TodoFacade instances.
+        '''
+        start_datetime, end_datetime = TodoCollection._to_range(start or '', end or '')
+        start_bound = TodoCollection._to_bound(start_datetime)
+        end_bound = TodoCollection._to_bound(end_datetime)
+        query = 'SELECT href, data FROM todos WHERE calendar = ? AND due IS NOT NULL'
+        params: list = [calendar]
+        if start_bound is not None:
+            query += ' AND due >= ?'
+            params.append(start_bound)
+        if end_bound is not None:
+            query += ' AND due < ?'
+            params.append(end_bound)
+        query += ' ORDER BY due'
+
+        with self.connect() as connection:
+            rows = connection.execute(query, params).fetchall()
+        return [self._to_facade(href, data) for href, data in rows]
+
+    def get_todos_by_tags(
+        self,
+        calendar: str,
+        tags: str | list = '',
+        exclude: bool = False
+    ) -> list[TodoFacade]:
+        '''
+        Get the stored VTODOs, which contain the given tag / tags, or do
+        not contain them (if exclude is True).
+
+        Args:
+            calendar (str): The calendar key.
+            tags (str | list): The tag or tag list to filter on.
+            exclude (bool): Exclude instead of include if True.
+
+        Returns:
+            list[TodoFacade]: Returns a list with TodoFacade instances.
+        '''
+        if isinstance(tags, str):
+            tags = [tags]
+
+        placeholders = ', '.join('?' * len(tags))
+        query = (
+            'SELECT href, data FROM todos WHERE calendar = ? AND href '
+            + ('NOT IN' if exclude else 'IN')
+            + ' (SELECT href FROM todo_tags WHERE calendar = ? '
+            + f'AND tag IN ({placeholders})) ORDER BY rowid'
+        )
+
+        with self.connect() as connection:
+            rows = connection.execute(query, [calendar, calendar] + tags).fetchall()
+        return [self._to_facade(href, data) for href, data in rows]
+
+    def _delete(self, connection: sqlite3.Connection, calendar: str, href: str):
+        connection.execute(
+            'DELETE FROM todos WHERE calendar = ? AND href = ?', (calendar, href)
+        )
+        connection.execute(
+            'DELETE FROM todo_tags WHERE calendar = ? AND href = ?', (calendar, href)
+        )
+
+    def _set_state(
+        self,
+        connection: sqlite3.Connection,
+        calendar: str,
+        ctag: str | None,
+        sync_token: str | None
+    ):
+        # without a new ctag the stored one is kept; it may be outdated
+        # then, which only costs a sync, but never hides a change
+        connection.execute(
+            'INSERT INTO calendars (calendar, ctag, sync_token) VALUES (?, ?, ?) '
+            'ON CONFLICT (calendar) DO UPDATE SET '
+            'ctag = COALESCE(excluded.ctag, ctag), sync_token = excluded.sync_token',
+            (calendar, ctag, sync_token)
+        )
+
+    def _to_facade(self, href: str, data: str) -> TodoFacade:
+        return TodoFacade(Todo(url=href, data=data), lazy=True)
@@ -0,0 +1,730 @@
+'''
+A small in-process CalDAV stand-in server.
+
+It answers the requests, which caldav and the TodoRepository send (principal
+discovery, calendar-query, calendar-multiget, sync-collection, GET, PUT and
+DELETE with ETags), from an in-memory dict, so that the network paths can be
+tested and measured offline:
+
+    with DavServer({'tasks': vtodos}, latency=0.01) as server:
+        todo_rep = TodoRepository({'NC_URI': server.url, 'NC_CALENDAR': 'tasks'})
+        todo_rep.connect_calendar()
+        todo_rep.populate_from_todo_list()
+        print(server.counts)
+
+It is no complete CalDAV server: the calendar-query filters only know
+comp-filter, prop-filter, is-not-defined, text-match and time-range, and a
+time-range on a VTODO only looks at its DUE (RFC 4791 also looks at DTSTART,
+COMPLETED and CREATED). Recurrences will not be expanded.
+'''
+
+from tododav.utils import ical_utils
+
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+from xml.sax.saxutils import escape
+from zoneinfo import ZoneInfo
+
+import lxml.etree as etree
+import random
+import threading
+import time
+
+
+DAV = 'DAV:'
+CALDAV = 'urn:ietf:params:xml:ns:caldav'
+CALSERVER = 'http://calendarserver.org/ns/'
+
+
+class DavCalendar:
+
+    def __init__(self, name: str):
+        '''
+        A calendar of the DavServer.
+
+        Args:
+            name (str): The display name and the id of the calendar.
+        '''
+        self.name = name
+
+        self.resources: dict[str, tuple[str, str]] = {}
+        '''
+        The resource name -> (etag, iCalendar data) dict.
+        '''
+
+        self.history: list[str] = []
+        '''
+        The names of the changed (or deleted) resources in order. The
+        length of the history is the ctag and the sync-token.
+        '''
+
+    def put(self, name: str, data: str) -> str:
+        '''
+        Create or replace a resource.
+
+        Args:
+            name (str): The resource name, e.g. "uid.ics".
+            data (str): The iCalendar data.
+
+        Returns:
+            str: The new etag.
+        '''
+        self.history.append(name)
+        etag = f'"{len(self.history)}"'
+        self.resources[name] = (etag, data)
+        return etag
+
+    def remove(self, name: str):
+        '''
+        Delete a resource.
+
+        Args:
+            name (str): The resource name.
+        '''
+        self.history.append(name)
+        self.resources.pop(name, None)
+
+    @property
+    def sync_token(self) -> str:
+        return f'sync-{len(self.history)}'
+
+
+class DavServer:
+
+    def __init__(
+        self,
+        calendars: dict[str, list[str]] | None = None,
+        user: str = 'user',
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0
+    ):
+        '''
+        The stand-in server. It listens on a free port of localhost as
+        soon as it is started (or used as a context manager).
+
+        Args:
+            calendars (dict | None): \
+                The calendar name -> list of VTODO iCalendar data dict. \
+                (default: `None`)
+            user (str): \
+                The user name in the principal and calendar URLs. \
+                (default: `'user'`)
+            latency (float): \
+                Seconds every request waits before it is answered. \
+                (default: `0.0`)
+            failure_rate (float): \
+                The share of requests, which will randomly fail with a \
+                503. (default: `0.0`)
+            seed (int): \
+                The seed for the random failures. (default: `0`)
+        '''
+        self.user = user
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+
+        self.calendars: dict[str, DavCalendar] = {}
+        '''
+        The calendar id -> DavCalendar dict.
+        '''
+
+        self.counts: Counter = Counter()
+        '''
+        The number of answered requests per kind, e.g. "PROPFIND",
+        "REPORT calendar-query", "PUT" or "DELETE".
+        '''
+
+        self.bytes_received = 0
+        self.bytes_sent = 0
+
+        self.failures: list[tuple[int, str | None]] = []
+        '''
+        Queued failures (see fail_next()) as (status, kind) tuples.
+        '''
+
+        self.lock = threading.RLock()
+        self.http_server: ThreadingHTTPServer | None = None
+        self.thread: threading.Thread | None = None
+
+        for name, vtodos in (calendars or {}).items():
+            self.add_calendar(name, vtodos)
+
+    def __enter__(self) -> 'DavServer':
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def calendar_home_path(self) -> str:
+        return f'/calendars/{self.user}/'
+
+    @property
+    def principal_path(self) -> str:
+        return f'/principals/{self.user}/'
+
+    @property
+    def url(self) -> str:
+        '''
+        The base URL of the server, which can be used as NC_URI.
+        '''
+        assert self.http_server is not None, 'The server is not started.'
+        host, port = self.http_server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def add_calendar(self, name: str, vtodos: list[str] = []) -> DavCalendar:
+        '''
+        Add a calendar with the given VTODOs. The resource names will be
+        the UIDs of the VTODOs.
+
+        Args:
+            name (str): The calendar name.
+            vtodos (list[str]): The iCalendar data of the VTODOs. (default: `[]`)
+
+        Returns:
+            DavCalendar: The new calendar.
+        '''
+        calendar = DavCalendar(name)
+        for i, data in enumerate(vtodos):
+            scanned = ical_utils.scan_vtodo(data) or {}
+            calendar.put('{}.ics'.format(scanned.get('UID') or f'task{i}'), data)
+        with self.lock:
+            self.calendars[name] = calendar
+        return calendar
+
+    def fail_next(self, count: int = 1, status: int = 503, kind: str | None = None):
+        '''
+        Let the next requests fail.
+
+        Args:
+            count (int): \
+                The number of failing requests. (default: `1`)
+            status (int): \
+                The HTTP status of the failures. (default: `503`)
+            kind (str | None): \
+                Only let requests of this kind fail (see counts), e.g. \
+                "PUT". (default: `None`)
+        '''
+        with self.lock:
+            self.failures += [(status, kind)] * count
+
+    def reset_counts(self):
+        '''
+        Reset the request counts and the transferred bytes.
+        '''
+        with self.lock:
+            self.counts = Counter()
+            self.bytes_received = 0
+            self.bytes_sent = 0
+
+    def start(self) -> 'DavServer':
+        '''
+        Start the server in a background thread.
+
+        Returns:
+            DavServer: The server itself.
+        '''
+        handler = type('BoundDavRequestHandler', (DavRequestHandler,), {'server_state': self})
+        self.http_server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.http_server.daemon_threads = True
+        self.thread = threading.Thread(target=self.http_server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        '''
+        Stop the server.
+        '''
+        if self.http_server is not None:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.http_server = None
+
+    def take_failure(self, kind: str) -> int | None:
+        '''
+        Get the status of an injected failure for a request of the given
+        kind or None, if it should succeed.
+
+        Args:
+            kind (str): The request kind.
+
+        Returns:
+            int | None: The HTTP status or None.
+        '''
+        with self.lock:
+            for i, (status, failure_kind) in enumerate(self.failures):
+                if failure_kind in (None, kind):
+                    del self.failures[i]
+                    return status
+            if self.failure_rate and self.random.random() < self.failure_rate:
+                return 503
+        return None
+
+
+class DavRequestHandler(BaseHTTPRequestHandler):
+    '''
+    The request handler of the DavServer. Every handler class is bound to
+    its DavServer as server_state (see DavServer.start()).
+    '''
+
+    protocol_version = 'HTTP/1.1'
+    server_state: DavServer
+
+    def do_DELETE(self):
+        calendar, name = self.get_resource()
+        if calendar is None or name is None:
+            return self.respond(404)
+        if not self.check_failure('DELETE'):
+            return
+        with self.server_state.lock:
+            if name not in calendar.resources:
+                return self.respond(404)
+            if not self.matches_etag(calendar.resources[name][0]):
+                return self.respond(412)
+            calendar.remove(name)
+        self.respond(204)
+
+    def do_GET(self):
+        calendar, name = self.get_resource()
+        if not self.check_failure('GET'):
+            return
+        with self.server_state.lock:
+            resource = calendar.resources.get(name) if calendar and name else None
+        if resource is None:
+            return self.respond(404)
+        self.respond(200, resource[1], 'text/calendar; charset=utf-8', {'ETag': resource[0]})
+
+    def do_PROPFIND(self):
+        body = self.read_body()
+        if not self.check_failure('PROPFIND'):
+            return
+        root = etree.fromstring(body) if body else None
+        requested = (
+            [element.tag for element in root.find(f'{{{DAV}}}prop')]
+            if root is not None and root.find(f'{{{DAV}}}prop') is not None
+            else None
+        )
+        depth = self.headers.get('Depth', '0')
+
+        path = self.get_path()
+        paths = [path]
+        state = self.server_state
+        if depth != '0':
+            if path == state.calendar_home_path:
+                paths += [f'{path}{calendar_id}/' for calendar_id in state.calendars]
+            else:
+                calendar, _ = self.get_resource()
+                if calendar is not None:
+                    paths += [f'{path}{name}' for name in calendar.resources]
+
+        responses = []
+        with state.lock:
+            for href in paths:
+                props = self.get_props(href)
+                if props is None:
+                    if href == path:
+                        return self.respond(404)
+                    continue
+                responses.append(self.build_response(href, props, requested))
+        self.respond_multistatus(responses)
+
+    def do_PUT(self):
+        calendar, name = self.get_resource()
+        data = self.read_body().decode('utf-8')
+        if calendar is None or name is None:
+            return self.respond(409)
+        if not self.check_failure('PUT'):
+            return
+        with self.server_state.lock:
+            existing = calendar.resources.get(name)
+            if self.headers.get('If-None-Match') == '*' and existing is not None:
+                return self.respond(412)
+            if existing is not None and not self.matches_etag(existing[0]):
+                return self.respond(412)
+            if existing is None and self.headers.get('If-Match'):
+                return self.respond(412)
+            etag = calendar.put(name, data)
+        self.respond(201 if existing is None else 204, headers={'ETag': etag})
+
+    def do_REPORT(self):
+        body = self.read_body()
+        try:
+            root = etree.fromstring(body)
+        except etree.XMLSyntaxError:
+            return self.respond(400)
+        report = etree.QName(root).localname
+        if not self.check_failure(f'REPORT {report}'):
+            return
+        calendar, _ = self.get_resource()
+        if calendar is None:
+            return self.respond(404)
+
+        requested = [
+            element.tag for element in root.find(f'{{{DAV}}}prop')
+        ] if root.find(f'{{{DAV}}}prop') is not None else [f'{{{DAV}}}getetag']
+        path = self.get_path()
+
+        with self.server_state.lock:
+            if report == 'calendar-query':
+                comp_filter = root.find(f'{{{CALDAV}}}filter/{{{CALDAV}}}comp-filter')
+                responses = [
+                    self.build_response(f'{path}{name}', self.get_resource_props(
+                        calendar, name
+                    ), requested)
+                    for name, (_, data) in sorted(calendar.resources.items())
+                    if comp_filter is None or matches_comp_filter(comp_filter, data)
+                ]
+                return self.respond_multistatus(responses)
+
+            if report == 'calendar-multiget':
+                responses = []
+                for href_element in root.iter(f'{{{DAV}}}href'):
+                    href = unquote(urlsplit(href_element.text or '').path)
+                    name = href.rsplit('/', 1)[-1]
+                    if name in calendar.resources:
+                        props = self.get_resource_props(calendar, name)
+                        responses.append(self.build_response(href, props, requested))
+                    else:
+                        responses.append(self.build_status_response(href, 404))
+                return self.respond_multistatus(responses)
+
+            if report == 'sync-collection':
+                token = root.findtext(f'{{{DAV}}}sync-token') or ''
+                if not token:
+                    names = sorted(calendar.resources)
+                else:
+                    if not token.startswith('sync-') \
+                            or not token[5:].isdigit() \
+                            or int(token[5:]) > len(calendar.history):
+                        return self.respond(
+                            403,
+                            '<?xml version="1.0" encoding="utf-8"?>'
+                            '<D:error xmlns:D="DAV:"><D:valid-sync-token/></D:error>',
+                            'application/xml; charset=utf-8'
+                        )
+                    names = sorted(set(calendar.history[int(token[5:]):]))
+                responses = []
+                for name in names:
+                    if name in calendar.resources:
+                        props = self.get_resource_props(calendar, name)
+                        responses.append(self.build_response(f'{path}{name}', props, requested))
+                    else:
+                        responses.append(self.build_status_response(f'{path}{name}', 404))
+                return self.respond_multistatus(
+                    responses,
+                    f'<D:sync-token>{escape(calendar.sync_token)}</D:sync-token>'
+                )
+
+        self.respond(501)
+
+    def build_response(self, href: str, props: dict, requested: list | None) -> str:
+        '''
+        Build a DAV:response with the requested properties.
+        '''
+        found = []
+        missing = []
+        for tag in requested if requested is not None else props:
+            if tag in props:
+                found.append(props[tag])
+            else:
+                missing.append(etree.tostring(etree.Element(tag)).decode())
+        out = f'<D:response><D:href>{escape(href)}</D:href>'
+        if found:
+            out += '<D:propstat><D:prop>{}</D:prop>' \
+                '<D:status>HTTP/1.1 200 OK</D:status></D:propstat>'.format(''.join(found))
+        if missing:
+            out += '<D:propstat><D:prop>{}</D:prop>' \
+                '<D:status>HTTP/1.1 404 Not Found</D:status></D:propstat>'.format(''.join(missing))
+        return out + '</D:response>'
+
+    def build_status_response(self, href: str, status: int) -> str:
+        return (
+            f'<D:response><D:href>{escape(href)}</D:href>'
+            f'<D:status>HTTP/1.1 {status} {self.responses[status][0]}</D:status></D:response>'
+        )
+
+    def check_failure(self, kind: str) -> bool:
+        '''
+        Count the request, wait the latency and answer an injected failure.
+
+        Returns:
+            bool: True, if the request should be answered normally.
+        '''
+        state = self.server_state
+        with state.lock:
+            state.counts[kind] += 1
+        if state.latency:
+            time.sleep(state.latency)
+        status = state.take_failure(kind)
+        if status is not None:
+            self.respond(status)
+            return False
+        return True
+
+    def get_path(self) -> str:
+        return unquote(urlsplit(self.path).path)
+
+    def get_props(self, href: str) -> dict | None:
+        '''
+        Get the properties of the given path as a tag -> XML string dict
+        or None, if there is no such resource.
+        '''
+        state = self.server_state
+        if href in ('/', state.principal_path):
+            return {
+                f'{{{DAV}}}current-user-principal':
+                    f'<D:current-user-principal><D:href>{state.principal_path}'
+                    '</D:href></D:current-user-principal>',
+                f'{{{CALDAV}}}calendar-home-set':
+                    f'<C:calendar-home-set><D:href>{state.calendar_home_path}'
+                    '</D:href></C:calendar-home-set>',
+                f'{{{DAV}}}resourcetype': '<D:resourcetype><D:collection/></D:resourcetype>'
+            }
+        if href == state.calendar_home_path:
+            return {
+                f'{{{DAV}}}resourcetype': '<D:resourcetype><D:collection/></D:resourcetype>'
+            }
+        calendar, name = self.get_resource(href)
+        if calendar is None:
+            return None
+        if name:
+            if name not in calendar.resources:
+                return None
+            return self.get_resource_props(calendar, name)
+        return {
+            f'{{{DAV}}}displayname': f'<D:displayname>{escape(calendar.name)}</D:displayname>',
+            f'{{{DAV}}}resourcetype':
+                '<D:resourcetype><D:collection/><C:calendar/></D:resourcetype>',
+            f'{{{CALSERVER}}}getctag':
+                f'<CS:getctag>{len(calendar.history)}</CS:getctag>',
+            f'{{{DAV}}}sync-token': f'<D:sync-token>{calendar.sync_token}</D:sync-token>',
+            f'{{{CALDAV}}}supported-calendar-component-set':
+                '<C:supported-calendar-component-set><C:comp name="VTODO"/>'
+                '</C:supported-calendar-component-set>'
+        }
+
+    def get_resource(self, path: str = '') -> tuple[DavCalendar | None, str | None]:
+        '''
+        Get the calendar and the resource name of the given path (or of
+        the request path).
+        '''
+        path = path or self.get_path()
+        state = self.server_state
+        if not path.startswith(state.calendar_home_path):
+            return (None, None)
+        parts = path[len(state.calendar_home_path):].split('/')
+        calendar = state.calendars.get(parts[0])
+        name = parts[1] if len(parts) > 1 and parts[1] else None
+        return (calendar, name)
+
+    def get_resource_props(self, calendar: DavCalendar, name: str) -> dict:
+        etag, data = calendar.resources[name]
+        return {
+            f'{{{DAV}}}getetag': f'<D:getetag>{escape(etag)}</D:getetag>',
+            f'{{{DAV}}}getcontenttype':
+                '<D:getcontenttype>text/calendar; charset=utf-8</D:getcontenttype>',
+            f'{{{CALDAV}}}calendar-data': f'<C:calendar-data>{escape(data)}</C:calendar-data>',
+            f'{{{DAV}}}resourcetype': '<D:resourcetype/>'
+        }
+
+    def log_message(self, format, *args):
+        # keep the test and profiling output clean
+        pass
+
+    def matches_etag(self, etag: str) -> bool:
+        if_match = self.headers.get('If-Match')
+        return not if_match or if_match == '*' or etag in [
+            value.strip() for value in if_match.split(',')
+        ]
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        with self.server_state.lock:
+            self.server_state.bytes_received += length
+        return body
+
+    def respond(
+        self,
+        status: int,
+        body: str = '',
+        content_type: str = 'text/plain; charset=utf-8',
+        headers: dict = {}
+    ):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        if data and self.command != 'HEAD':
+            self.wfile.write(data)
+        with self.server_state.lock:
+            self.server_state.bytes_sent += len(data)
+
+    def respond_multistatus(self, responses: list[str], extra: str = ''):
+        body = (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            '<D:multistatus xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav" '
+            'xmlns:CS="http://calendarserver.org/ns/">'
+            + ''.join(responses) + extra + '</D:multistatus>'
+        )
+        self.respond(207, body, 'application/xml; charset=utf-8')
+
+
+def get_vtodo_properties(data: str) -> list[tuple[str, str, str]]:
+    '''
+    Get the (name, parameters, value) tuples of the properties of the
+    first VTODO in the given iCalendar data.
+
+    Args:
+        data (str): The iCalendar data.
+
+    Returns:
+        list[tuple[str, str, str]]: The properties.
+    '''
+    out = []
+    depth = 0
+    for line in ical_utils.unfold(data):
+        name, _, value = line.partition(':')
+        name, _, params = name.partition(';')
+        name = name.upper()
+        if name == 'BEGIN':
+            if depth or value.upper() == 'VTODO':
+                depth += 1
+        elif name == 'END' and depth:
+            depth -= 1
+            if not depth:
+                break
+        elif depth == 1:
+            out.append((name, params, value))
+    return out
+
+
+def matches_comp_filter(comp_filter, data: str) -> bool:
+    '''
+    Check the VTODO of the data against a CalDAV comp-filter element.
+
+    Args:
+        comp_filter (etree.Element): The comp-filter of the VCALENDAR.
+        data (str): The iCalendar data.
+
+    Returns:
+        bool: True, if it matches.
+    '''
+    vtodo_filter = comp_filter.find(f'{{{CALDAV}}}comp-filter')
+    if vtodo_filter is None:
+        return True
+    if vtodo_filter.get('name', '').upper() != 'VTODO':
+        return False
+    properties = get_vtodo_properties(data)
+
+    for element in vtodo_filter:
+        tag = etree.QName(element).localname
+        if tag == 'time-range':
+            due = [prop for prop in properties if prop[0] == 'DUE']
+            # without a DUE the VTODO matches every range (simplified)
+            if due and not in_time_range(element, due[0][1], due[0][2]):
+                return False
+        elif tag == 'prop-filter' and not matches_prop_filter(element, properties):
+            return False
+    return True
+
+
+def matches_prop_filter(prop_filter, properties: list[tuple[str, str, str]]) -> bool:
+    '''
+    Check the properties against a CalDAV prop-filter element.
+
+    Args:
+        prop_filter (etree.Element): The prop-filter.
+        properties (list): The (name, parameters, value) tuples.
+
+    Returns:
+        bool: True, if it matches.
+    '''
+    name = prop_filter.get('name', '').upper()
+    values = [(params, value) for prop, params, value in properties if prop == name]
+    if prop_filter.find(f'{{{CALDAV}}}is-not-defined') is not None:
+        return not values
+    if not values:
+        return False
+
+    for element in prop_filter:
+        tag = etree.QName(element).localname
+        if tag == 'text-match':
+            text = element.text or ''
+            negate = element.get('negate-condition') == 'yes'
+            if element.get('collation', 'i;ascii-casemap') == 'i;octet':
+                found = any(text in ical_utils.unescape(value) for _, value in values)
+            else:
+                found = any(
+                    text.lower() in ical_utils.unescape(value).lower()
+                    for _, value in values
+                )
+            if found == negate:
+                return False
+        elif tag == 'time-range':
+            if not any(in_time_range(element, params, value) for params, value in values):
+                return False
+    return True
+
+
+def in_time_range(time_range, params: str, value: str) -> bool:
+    '''
+    Check, if the DATE or DATE-TIME value is inside the time-range
+    (start <= value < end). Dates and floating times count as UTC.
+
+    Args:
+        time_range (etree.Element): The time-range element.
+        params (str): The parameters of the property.
+        value (str): The raw value.
+
+    Returns:
+        bool: True, if it is inside.
+    '''
+    moment = to_utc(params, value)
+    if moment is None:
+        return True
+    # a missing or unreadable boundary does not limit the range
+    start = to_utc('', time_range.get('start') or '')
+    end = to_utc('', time_range.get('end') or '')
+    if start is not None and moment < start:
+        return False
+    if end is not None and moment >= end:
+        return False
+    return True
+
+
+def to_utc(params: str, value: str) -> datetime | None:
+    '''
+    Convert a raw DATE or DATE-TIME value to an aware UTC datetime.
+
+    Args:
+        params (str): The parameters of the property.
+        value (str): The raw value.
+
+    Returns:
+        datetime | None: The datetime or None, if it cannot be read.
+    '''
+    tzid = None
+    for param in params.split(';'):
+        if param.upper().startswith('TZID='):
+            tzid = param[5:].strip('"')
+    try:
+        moment = ical_utils.to_date('', value)
+    except ValueError:
+        return None
+    if not isinstance(moment, datetime):
+        moment = datetime.combine(moment, datetime.min.time())
+    if moment.tzinfo is None:
+        try:
+            moment = moment.replace(tzinfo=ZoneInfo(tzid) if tzid else timezone.utc)
+        except Exception:
+            moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
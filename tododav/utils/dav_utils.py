@@ -0,0 +1,403 @@
+'''
+Some helper for CalDAV / WebDAV requests, which are not (or not
+conveniently) covered by the caldav module.
+'''
+
+from caldav.davclient import DAVClient
+from caldav.elements import cdav, dav
+from caldav.elements.base import BaseElement, ValuedBaseElement
+from caldav.lib import error
+from caldav.objects import Calendar
+from datetime import datetime
+from typing import Iterator, Mapping, TYPE_CHECKING
+from urllib.parse import unquote, urlparse
+
+import lxml.etree as etree
+import re
+import requests
+import requests.auth
+import threading
+import time
+
+if TYPE_CHECKING:
+    from tododav.model.todo.todo_stats import TodoStats
+
+
+REPORT_ROOT = re.compile(rb'<(?![?!])(?:[\w.-]+:)?([\w.-]+)')
+'''
+Finds the local name of the root element of a REPORT body, e.g.
+"calendar-query".
+'''
+
+
+class GetCTag(ValuedBaseElement):
+    '''
+    The CalendarServer "getctag" property, which changes whenever
+    anything inside the calendar collection changes.
+    '''
+    tag = '{http://calendarserver.org/ns/}getctag'
+
+
+class StatsDAVClient(DAVClient):
+
+    def __init__(self, *args, stats: 'TodoStats', **kwargs):
+        '''
+        A caldav DAVClient, which records every request in the given
+        TodoStats: the HTTP round trip (with the transfer of the body) as a
+        "request" event and the parsing of the XML response by caldav as a
+        "xml" event. Streamed requests (see iter_report()) are recorded by
+        the code, which reads them.
+
+        Args:
+            *args: The arguments of the DAVClient.
+            stats (TodoStats): The metrics.
+            **kwargs: The keyword arguments of the DAVClient.
+        '''
+        super().__init__(*args, **kwargs)
+        self.stats = stats
+        self.local = threading.local()
+        '''
+        The HTTP duration of the current request per thread, so that the
+        rest of the duration of request() can be told apart as XML parsing.
+        '''
+
+        self.send = self.session.request
+        self.session.request = self._send  # type: ignore
+
+    def request(
+        self,
+        url: str,
+        method: str = 'GET',
+        body: str = '',
+        headers: Mapping[str, str] | None = None
+    ):
+        self.local.http_duration = 0.0
+        start = time.perf_counter()
+        response = super().request(url, method, body, headers)  # type: ignore
+        if getattr(response, 'tree', None) is not None:
+            self.stats.record(
+                'xml',
+                kind=get_request_kind(method, body),
+                duration=max(time.perf_counter() - start - self.local.http_duration, 0.0)
+            )
+        return response
+
+    def _send(self, method: str, url: str, *args, **kwargs):
+        '''
+        Send a request with the session and record it.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The url.
+            *args: The further arguments of requests.Session.request().
+            **kwargs: The further keyword arguments of it.
+
+        Returns:
+            requests.Response: The response.
+        '''
+        if kwargs.get('stream'):
+            return self.send(method, url, *args, **kwargs)
+
+        data = kwargs.get('data') or b''
+        status = None
+        received = 0
+        start = time.perf_counter()
+        try:
+            response = self.send(method, url, *args, **kwargs)
+            status = response.status_code
+            received = len(response.content)
+            return response
+        finally:
+            duration = time.perf_counter() - start
+            self.local.http_duration = getattr(self.local, 'http_duration', 0.0) + duration
+            self.stats.record(
+                'request',
+                kind=get_request_kind(method, data),
+                duration=duration,
+                bytes_sent=len(data.encode() if isinstance(data, str) else data),
+                bytes_received=received,
+                status=status
+            )
+
+
+def get_ctag(calendar: Calendar) -> str | None:
+    '''
+    Get the ctag of the given calendar with a single PROPFIND.
+
+    Args:
+        calendar (Calendar): The caldav Calendar.
+
+    Raises:
+        error.NotFoundError: If the calendar does not exist (anymore).
+
+    Returns:
+        str | None: The ctag or None, if the server does not provide one.
+    '''
+    try:
+        ctag = calendar.get_property(GetCTag())
+    except error.NotFoundError:
+        raise
+    except error.DAVError:
+        return None
+    return str(ctag) if ctag else None
+
+
+def get_request_kind(method: str, body: str | bytes | None = None) -> str:
+    '''
+    Get the kind of a request for the metrics: the HTTP method and for a
+    REPORT the name of the report, e.g. "REPORT sync-collection".
+
+    Args:
+        method (str): The HTTP method.
+        body (str | bytes | None): The request body. (default: `None`)
+
+    Returns:
+        str: The request kind.
+    '''
+    method = method.upper()
+    if method != 'REPORT' or not body:
+        return method
+    if isinstance(body, str):
+        body = body.encode()
+    match = REPORT_ROOT.search(body)
+    return f'REPORT {match.group(1).decode()}' if match else method
+
+
+def build_todo_query(filters: list | None = None) -> bytes:
+    '''
+    Build a calendar-query REPORT body, which requests the etag and the
+    calendar-data of all VTODOs (matching the optional filters).
+
+    Args:
+        filters (list | None): \
+            Optional list of caldav filter elements, which will be \
+            added to the VTODO comp-filter. (default: `None`)
+
+    Returns:
+        bytes: The XML body.
+    '''
+    comp_filter = cdav.CompFilter('VTODO')
+    if filters:
+        comp_filter += filters
+    root = cdav.CalendarQuery() + [
+        dav.Prop() + [dav.GetEtag(), cdav.CalendarData()],
+        cdav.Filter() + (cdav.CompFilter('VCALENDAR') + comp_filter)
+    ]
+    return to_xml(root)
+
+
+def build_due_filter(
+    start: datetime | None = None,
+    end: datetime | None = None
+) -> BaseElement:
+    '''
+    Build a prop-filter, which matches VTODOs with a DUE inside the
+    given time range (start <= DUE < end).
+
+    Args:
+        start (datetime | None): The start or None. (default: `None`)
+        end (datetime | None): The end or None. (default: `None`)
+
+    Returns:
+        BaseElement: The prop-filter element.
+    '''
+    return cdav.PropFilter('DUE') + cdav.TimeRange(start, end)
+
+
+def build_text_filter(name: str, text: str, negate: bool = False) -> BaseElement:
+    '''
+    Build a prop-filter, which matches VTODOs whose property contains
+    the given text (case-insensitive substring match, as defined by
+    RFC 4791).
+
+    Args:
+        name (str): \
+            The property name, e.g. "CATEGORIES".
+        text (str): \
+            The text to search for.
+        negate (bool): \
+            Match the VTODOs not containing the text. (default: `False`)
+
+    Returns:
+        BaseElement: The prop-filter element.
+    '''
+    return cdav.PropFilter(name) + cdav.TextMatch(
+        text, collation='i;ascii-casemap', negate=negate
+    )
+
+
+def iter_report(
+    client: DAVClient,
+    url: str,
+    body: bytes,
+    chunk_size: int = 64 * 1024
+) -> Iterator[tuple[str, dict]]:
+    '''
+    Send a REPORT request and parse the multistatus response while it
+    arrives. The DAV:responses are yielded as soon as the chunk, which
+    completes them, is parsed and freed afterwards, so that the memory
+    usage does not grow with the size of the response. If the client has
+    TodoStats (see StatsDAVClient), the request is recorded, when the
+    response is finished.
+
+    Args:
+        client (DAVClient): \
+            The client with the session and the credentials.
+        url (str): \
+            The url of the collection.
+        body (bytes): \
+            The REPORT body.
+        chunk_size (int): \
+            The size of the read chunks in bytes. (default: `65536`)
+
+    Raises:
+        error.NotFoundError: If the collection does not exist (anymore).
+        error.ReportError: On any other error status.
+
+    Yields:
+        tuple[str, dict]: The href and the found properties (see parse_response()).
+    '''
+    auth = client.auth
+    if auth is None and client.username:
+        # the DAVClient keeps the password utf-8 encoded
+        password = client.password or b''
+        if isinstance(password, str):
+            password = password.encode('utf-8')
+        auth = requests.auth.HTTPBasicAuth(client.username.encode('utf-8'), password)
+
+    # a StatsDAVClient does not record streamed requests itself
+    stats = getattr(client, 'stats', None)
+    http_duration = 0.0
+    xml_duration = 0.0
+    received = 0
+    status = None
+
+    headers = client.headers.copy()
+    headers['Depth'] = '1'
+    try:
+        start = time.perf_counter()
+        response = client.session.request(
+            'REPORT',
+            str(url),
+            data=body,
+            headers=headers,
+            auth=auth,
+            timeout=client.timeout,
+            verify=client.ssl_verify_cert,
+            cert=client.ssl_cert,
+            stream=True
+        )
+        http_duration += time.perf_counter() - start
+        status = response.status_code
+        with response:
+            if response.status_code == 404:
+                # like caldav, so that a moved calendar can be discovered again
+                raise error.NotFoundError(url, f'{response.status_code} {response.reason}')
+            if response.status_code >= 400:
+                raise error.ReportError(f'{response.status_code} {response.reason}')
+
+            parser = etree.XMLPullParser(
+                events=('end',), tag=dav.Response.tag, huge_tree=True
+            )
+            chunks = response.iter_content(chunk_size)
+            while True:
+                start = time.perf_counter()
+                chunk = next(chunks, None)
+                http_duration += time.perf_counter() - start
+                if chunk is None:
+                    break
+                received += len(chunk)
+
+                start = time.perf_counter()
+                parser.feed(chunk)
+                found = []
+                for _, element in parser.read_events():
+                    found.append(parse_response(element))
+                    # free the finished response and its predecessors
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+                xml_duration += time.perf_counter() - start
+                yield from found
+            parser.close()
+    finally:
+        if stats is not None:
+            kind = get_request_kind('REPORT', body)
+            stats.record(
+                'request',
+                kind=kind,
+                duration=http_duration,
+                bytes_sent=len(body),
+                bytes_received=received,
+                status=status
+            )
+            stats.record('xml', kind=kind, duration=xml_duration)
+
+
+def parse_multistatus(content: bytes) -> list[tuple[str, dict]]:
+    '''
+    Parse a multistatus response body into a list of tuples with the
+    href and a dict with the found properties (tag -> value). Properties
+    with a non 2xx status will be skipped; a response for a deleted or
+    missing resource thus has an empty dict.
+
+    Args:
+        content (bytes): The multistatus XML body.
+
+    Returns:
+        list[tuple[str, dict]]: A list with (href, props) tuples.
+    '''
+    out = []
+    root = etree.fromstring(content, parser=etree.XMLParser(huge_tree=True))
+    for response in root.iter(dav.Response.tag):
+        out.append(parse_response(response))
+    return out
+
+
+def parse_response(response) -> tuple[str, dict]:
+    '''
+    Parse one DAV:response element of a multistatus.
+
+    Args:
+        response (etree._Element): The DAV:response element.
+
+    Returns:
+        tuple[str, dict]: The href and the found properties.
+    '''
+    href = unquote(response.findtext(dav.Href.tag) or '')
+    if ':' in href:
+        href = unquote(urlparse(href).path)
+
+    props = {}
+    for propstat in response.iter(dav.PropStat.tag):
+        status = propstat.findtext(dav.Status.tag) or ''
+        if ' 2' not in status:
+            continue
+        for prop in propstat.iter(dav.Prop.tag):
+            for element in prop:
+                if len(element):
+                    # complex properties are either hrefs (e.g. the
+                    # calendar-home-set) or a list of tags (resourcetype)
+                    hrefs = element.findall('.//' + dav.Href.tag)
+                    props[element.tag] = (
+                        unquote(hrefs[0].text or '') if hrefs
+                        else [child.tag for child in element]
+                    )
+                else:
+                    props[element.tag] = element.text
+    return (href, props)
+
+
+def to_xml(root: BaseElement) -> bytes:
+    '''
+    Serialize the given caldav element tree to a XML body.
+
+    Args:
+        root (BaseElement): The caldav element.
+
+    Returns:
+        bytes: The XML body.
+    '''
+    return etree.tostring(
+        root.xmlelement(), encoding='utf-8', xml_declaration=True
+    )
@@ -0,0 +1,154 @@
+'''
+Some helper for reading iCalendar data without parsing it completely.
+
+A full parse of a VTODO is quite expensive,
+while most filters only need a few simple properties like the UID or the
+due date. scan_vtodo() reads exactly these with a cheap line scan and
+returns them as the same Python values, the full parse would give.
+'''
+
+from datetime import date, datetime
+from dateutil import tz
+
+import re
+
+
+SCANNED_PROPERTIES = (
+    'CATEGORIES', 'COMPLETED', 'DUE', 'PRIORITY', 'RRULE', 'STATUS',
+    'SUMMARY', 'UID'
+)
+'''
+The properties, which scan_vtodo() will read.
+'''
+
+DATE_RE = re.compile(r'^(\d{4})(\d{2})(\d{2})$')
+DATETIME_RE = re.compile(r'^(\d{4})(\d{2})(\d{2})T(\d{2})(\d{2})(\d{2})(Z?)$')
+SPLIT_RE = re.compile(r'(?<!\\),')
+UNESCAPE_RE = re.compile(r'\\(.)')
+
+
+def scan_vtodo(data: str) -> dict | None:
+    '''
+    Scan the first VTODO of the given iCalendar data for the properties
+    in SCANNED_PROPERTIES. Only the first occurrence of a property counts,
+    like in the TodoFacade getters. Sub-components like a VALARM will be skipped.
+
+    Args:
+        data (str): The iCalendar data.
+
+    Returns:
+        dict | None: \
+            A dict with the property name and its value. None, if the data \
+            contains something, which the scan cannot convert exactly \
+            (e.g. a due date with a TZID); it has to be parsed completely then.
+    '''
+    out = {}
+    depth = 0
+    for line in unfold(data):
+        name, _, value = line.partition(':')
+        name, _, params = name.partition(';')
+        name = name.upper()
+        if name == 'BEGIN':
+            if depth or value.upper() == 'VTODO':
+                depth += 1
+            continue
+        if name == 'END' and depth:
+            depth -= 1
+            if not depth:
+                return out
+            continue
+        if depth != 1 or name not in SCANNED_PROPERTIES or name in out:
+            continue
+
+        try:
+            out[name] = convert_value(name, params.upper(), value)
+        except ValueError:
+            return None
+    return out if not depth else None
+
+
+def convert_value(name: str, params: str, value: str):
+    '''
+    Convert the raw value of a scanned property.
+
+    Args:
+        name (str): The property name.
+        params (str): The (upper case) parameters of the property.
+        value (str): The raw value.
+
+    Raises:
+        ValueError: If the value cannot be converted exactly.
+
+    Returns:
+        The converted value.
+    '''
+    if name in ('DUE', 'COMPLETED'):
+        return to_date(params, value)
+    if name == 'CATEGORIES':
+        # parsers disagree on escaped commas inside a tag
+        if not value or '\\,' in value:
+            raise ValueError('ambiguous categories')
+        return [unescape(tag) for tag in SPLIT_RE.split(value)]
+    if name == 'PRIORITY':
+        return int(value)
+    if name == 'RRULE':
+        return value
+    if '\\' in value and name != 'SUMMARY':
+        raise ValueError('escaped value')
+    return unescape(value)
+
+
+def to_date(params: str, value: str) -> date | datetime:
+    '''
+    Convert a DATE or DATE-TIME value. Only UTC and floating times
+    are supported.
+
+    Args:
+        params (str): The (upper case) parameters of the property.
+        value (str): The raw value.
+
+    Raises:
+        ValueError: If the value cannot be converted exactly.
+
+    Returns:
+        date | datetime: The converted value.
+    '''
+    if 'TZID=' in params:
+        raise ValueError('timezone')
+    match = DATE_RE.match(value)
+    if match:
+        return date(*map(int, match.groups()))
+    match = DATETIME_RE.match(value)
+    if not match or 'VALUE=DATE;' in params + ';':
+        raise ValueError('unknown date format')
+    *parts, utc = match.groups()
+    return datetime(*map(int, parts), tzinfo=tz.tzutc() if utc else None)
+
+
+def unescape(value: str) -> str:
+    '''
+    Unescape a TEXT value.
+
+    Args:
+        value (str): The escaped value.
+
+    Returns:
+        str: The unescaped value.
+    '''
+    return UNESCAPE_RE.sub(
+        lambda match: '\n' if match.group(1) in 'nN' else match.group(1),
+        value
+    )
+
+
+def unfold(data: str) -> list[str]:
+    '''
+    Get the unfolded content lines of the iCalendar data.
+
+    Args:
+        data (str): The iCalendar data.
+
+    Returns:
+        list[str]: The content lines.
+    '''
+    return re.sub(r'\r?\n[ \t]', '', data).splitlines()
@@ -0,0 +1,368 @@
+'''
+The "list" command: python -m tododav list [options]
+
+It lists the tasks of the configured calendars, filtered by due date,
+tags and status, as a table, compact lines (like str(TodoFacade)), NDJSON
+or JSON. The tasks are read from the local TodoStore, which will only be
+validated against the server (or synced), if it was not checked within
+the last --max-age seconds; so a fresh cache is listed without any
+request. Every task is written as soon as it is found (with --no-cache
+while the server response is still arriving, unless it has to be
+ordered), so that the output can be piped into e.g. jq or a status bar.
+'''
+
+from tododav.model.todo.todo_query import TodoQuery
+from tododav.model.todo.todo_repository import TodoRepository
+from tododav.model.todo.todo_store import TodoStore
+
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Iterable, TextIO
+
+import argparse
+import json
+import os
+import sys
+
+
+FORMATS = ('table', 'compact', 'ndjson', 'json')
+'''
+The output formats.
+'''
+
+RELATIVE_DATES = {'yesterday': -1, 'today': 0, 'tomorrow': 1}
+'''
+The date keywords, which parse_date() understands, with their offset
+in days from today.
+'''
+
+
+def build_parser() -> argparse.ArgumentParser:
+    '''
+    Build the argument parser of the command.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    '''
+    parser = argparse.ArgumentParser(
+        prog='python -m tododav list',
+        description='List the tasks. DATE can be "YYYY-MM-DD", "YYYY-MM-DD HH:MM", '
+        '"today", "tomorrow", "yesterday" or a number of days from today like "+7".'
+    )
+    parser.add_argument(
+        '--due', type=parse_day, metavar='DAY',
+        help='only tasks due on this day (a DATE without a time)'
+    )
+    parser.add_argument(
+        '--from', dest='start', type=parse_date, metavar='DATE',
+        help='only tasks due at or after DATE'
+    )
+    parser.add_argument(
+        '--to', dest='end', type=parse_date, metavar='DATE',
+        help='only tasks due before DATE (a day without a time is included)'
+    )
+    parser.add_argument(
+        '-t', '--tag', action='append', default=[],
+        help='only tasks with this tag; can be given several times (any of them)'
+    )
+    parser.add_argument(
+        '--all-tags', action='store_true',
+        help='only tasks with all of the --tag tags'
+    )
+    parser.add_argument(
+        '-x', '--exclude-tag', action='append', default=[],
+        help='leave out tasks with this tag; can be given several times'
+    )
+    parser.add_argument(
+        '-s', '--status', action='append', default=[],
+        help='only tasks with this status, e.g. NEEDS-ACTION; can be given several times'
+    )
+    parser.add_argument(
+        '--exclude-status', action='append', default=[],
+        help='leave out tasks with this status; can be given several times'
+    )
+    parser.add_argument(
+        '--open', action='store_true',
+        help='leave out completed and cancelled tasks'
+    )
+    parser.add_argument(
+        '-o', '--order', choices=TodoQuery.ORDER_KEYS,
+        help='sort the tasks (default: the order of the calendar)'
+    )
+    parser.add_argument(
+        '-r', '--reverse', action='store_true',
+        help='sort descending'
+    )
+    parser.add_argument(
+        '-n', '--limit', type=int,
+        help='list at most this many tasks'
+    )
+    parser.add_argument(
+        '-f', '--format', choices=FORMATS, default='table',
+        help='the output format (default: table)'
+    )
+    parser.add_argument(
+        '-c', '--calendar', action='append', default=[],
+        help='the calendar name; can be given several times (default: the configured ones)'
+    )
+    parser.add_argument(
+        '--max-age', type=float, default=300.0, metavar='SECONDS',
+        help='use the local cache without asking the server, if it was checked '
+        'within this many seconds (default: 300)'
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help='stream the tasks from the server without the local cache'
+    )
+    parser.add_argument(
+        '--store', default='',
+        help='the database file of the local cache (default: ~/.tododav/todos.sqlite)'
+    )
+    return parser
+
+
+def build_query(todo_rep: TodoRepository, options: argparse.Namespace) -> TodoQuery:
+    '''
+    Map the filter options onto a TodoQuery on the repository.
+
+    Args:
+        todo_rep (TodoRepository): The repository.
+        options (argparse.Namespace): The parsed options.
+
+    Returns:
+        TodoQuery: The query.
+    '''
+    query = todo_rep.query()
+    start, end = get_due_range(options)
+    if start or end:
+        query = query.due_between(start or '', end or '')
+    if options.tag:
+        query = query.tags(options.tag, match_all=options.all_tags)
+    if options.exclude_tag:
+        query = query.tags(options.exclude_tag, exclude=True)
+    if options.status:
+        query = query.status(options.status)
+    exclude_status = options.exclude_status + (
+        ['COMPLETED', 'CANCELLED'] if options.open else []
+    )
+    if exclude_status:
+        query = query.status(exclude_status, exclude=True)
+    if options.order:
+        query = query.order_by(options.order, reverse=options.reverse)
+    if options.limit is not None:
+        query = query.limit(options.limit)
+    return query
+
+
+def format_due(due: date | datetime | None) -> str:
+    '''
+    Format a due date like str(TodoFacade) does.
+
+    Args:
+        due (date | datetime | None): The due date.
+
+    Returns:
+        str: The formatted date or an empty string.
+    '''
+    if due is None:
+        return ''
+    if isinstance(due, datetime):
+        return due.strftime('%Y-%m-%d %H:%M')
+    return due.strftime('%Y-%m-%d')
+
+
+def get_due_range(
+    options: argparse.Namespace
+) -> tuple[str | date | None, str | date | None]:
+    '''
+    Get the due range of the --due, --from and --to options.
+
+    Args:
+        options (argparse.Namespace): The parsed options.
+
+    Returns:
+        tuple: The tuple (start, end) with None for no limit.
+    '''
+    if options.due:
+        return (options.due, options.due)
+    return (options.start, options.end)
+
+
+def list_todos(
+    todo_rep: TodoRepository,
+    options: argparse.Namespace,
+    stream: TextIO
+) -> int:
+    '''
+    Load the tasks into the (not yet connected) repository from its
+    store and write the matching ones into the stream. Without a store
+    the tasks are streamed from the server and written one by one; only
+    an order makes it collect the matching ones first.
+
+    Args:
+        todo_rep (TodoRepository): The repository.
+        options (argparse.Namespace): The parsed options.
+        stream (TextIO): The output stream.
+
+    Returns:
+        int: The exit code.
+    '''
+    if todo_rep.store is not None:
+        fresh = todo_rep.is_store_fresh(options.max_age)
+        if not fresh:
+            todo_rep.connect_calendar()
+        if not todo_rep.populate_from_store(validate=not fresh):
+            print('Could not load the tasks.', file=sys.stderr)
+            return 1
+        todos: Iterable = build_query(todo_rep, options)
+    else:
+        todo_rep.connect_calendar()
+        todos = todo_rep.iter_todos(build_query(todo_rep, options).matches)
+        if options.order:
+            # the order needs all matching tasks
+            todo_rep.todos = list(todos)
+            todos = build_query(todo_rep, options)
+        elif options.limit is not None:
+            todos = islice(todos, options.limit)
+
+    try:
+        write_todos(todos, options.format, stream)
+    except BrokenPipeError:
+        # the reader (e.g. head) is gone; do not complain again, when
+        # Python flushes stdout at the exit
+        if stream is sys.stdout:
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+    return 0
+
+
+def main(args: list[str] | None = None, stream: TextIO | None = None) -> int:
+    '''
+    Run the command.
+
+    Args:
+        args (list[str] | None): \
+            The command line arguments after "list". (default: `None`)
+        stream (TextIO | None): \
+            The output stream or None for stdout. (default: `None`)
+
+    Returns:
+        int: The exit code.
+    '''
+    options = build_parser().parse_args(args)
+    output = sys.stdout if stream is None else stream
+
+    config_dict = {}
+    if options.calendar:
+        config_dict['NC_CALENDAR'] = options.calendar
+    store = None if options.no_cache else TodoStore(options.store)
+
+    with TodoRepository(config_dict, store=store, lazy=True) as todo_rep:
+        return list_todos(todo_rep, options, output)
+
+
+def parse_date(text: str) -> str | date:
+    '''
+    Parse a date option: "today", "tomorrow", "yesterday" and a number of
+    days like "+7" or "-1" become the date, "YYYY-MM-DD" becomes a date
+    as well (so that an end date includes the whole day) and anything
+    else (e.g. with a time) is kept as the string for the filters.
+
+    Args:
+        text (str): The option value.
+
+    Returns:
+        str | date: The date or the string.
+    '''
+    text = text.strip()
+    if text.lower() in RELATIVE_DATES:
+        return date.today() + timedelta(days=RELATIVE_DATES[text.lower()])
+    if text[:1] in '+-' and text[1:].isdigit():
+        return date.today() + timedelta(days=int(text))
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def parse_day(text: str) -> date:
+    '''
+    Parse a date option (see parse_date()), which has to be a day.
+
+    Args:
+        text (str): The option value.
+
+    Raises:
+        argparse.ArgumentTypeError: If it is no day.
+
+    Returns:
+        date: The day.
+    '''
+    day = parse_date(text)
+    if not isinstance(day, date):
+        raise argparse.ArgumentTypeError(f'"{text}" is no day')
+    return day
+
+
+def to_dict(todo) -> dict:
+    '''
+    Convert a task into a JSON serializable dict.
+
+    Args:
+        todo (TodoFacade): The task.
+
+    Returns:
+        dict: The dict.
+    '''
+    completed = todo.get_completed()
+    return {
+        'uid': todo.get_uid(),
+        'summary': todo.get_summary(),
+        'due': todo.get_due().isoformat() if todo.has_due() else None,
+        'priority': todo.get_priority() or None,
+        'status': todo.get_status(),
+        'tags': todo.get_tags(),
+        'completed': completed.isoformat() if completed is not None else None,
+        'calendar': todo.calendar_name or None
+    }
+
+
+def write_todos(todos: Iterable, output_format: str, stream: TextIO):
+    '''
+    Write the tasks in the given format. Every task is written and
+    flushed, as soon as the iterable gives it.
+
+    Args:
+        todos (Iterable): The tasks.
+        output_format (str): One of FORMATS.
+        stream (TextIO): The output stream.
+    '''
+    if output_format == 'table':
+        stream.write('{:<16} {:>3} {:<12} {}\n'.format('DUE', 'PRI', 'STATUS', 'SUMMARY'))
+    elif output_format == 'json':
+        stream.write('[')
+
+    separator = '\n'
+    for todo in todos:
+        if output_format == 'table':
+            line = '{:<16} {:>3} {:<12} {}'.format(
+                format_due(todo.get_due() if todo.has_due() else None),
+                todo.get_priority() or '',
+                todo.get_status() or '',
+                todo.get_summary() or ''
+            )
+            if todo.has_tags():
+                line += '  [{}]'.format(','.join(todo.get_tags()))
+            stream.write(line + '\n')
+        elif output_format == 'compact':
+            stream.write(str(todo) + '\n')
+        elif output_format == 'ndjson':
+            stream.write(json.dumps(to_dict(todo), ensure_ascii=False) + '\n')
+        else:
+            stream.write(separator + '  ' + json.dumps(to_dict(todo), ensure_ascii=False))
+            separator = ',\n'
+        stream.flush()
+
+    if output_format == 'json':
+        stream.write('\n]\n' if separator != '\n' else ']\n')
+        stream.flush()
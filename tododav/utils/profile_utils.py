@@ -0,0 +1,392 @@
+'''
+The "profile" command: python -m tododav profile [ICS_DIR] [options]
+
+It runs a connect -> populate -> filters -> save cycle against the
+configured calendar (or against a local directory with .ics files, which
+will be served by an in-process DavServer) and prints a timing breakdown,
+the round trips, the peak memory and the top cProfile hotspots, so that
+reproducible numbers can be attached to a performance bug report.
+'''
+
+from tododav.model.todo.todo_facade import TodoFacade
+from tododav.model.todo.todo_repository import TodoRepository
+from tododav.utils.dav_server import DavServer
+
+from datetime import date, timedelta
+from typing import Callable
+
+import argparse
+import cProfile
+import json
+import os
+import platform
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+
+def build_parser() -> argparse.ArgumentParser:
+    '''
+    Build the argument parser of the command.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    '''
+    parser = argparse.ArgumentParser(
+        prog='python -m tododav profile',
+        description='Profile a connect, populate, filter and save cycle.'
+    )
+    parser.add_argument(
+        'ics_dir', nargs='?', default='',
+        help='a directory with .ics files to serve locally instead of the configured server'
+    )
+    parser.add_argument(
+        '-c', '--calendar', default='',
+        help='the calendar name (default: the configured one or "tasks" for an ICS_DIR)'
+    )
+    parser.add_argument(
+        '-n', '--top', type=int, default=15,
+        help='the number of cProfile hotspots (default: 15)'
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help='discover the calendars instead of using the cached calendar URLs'
+    )
+    parser.add_argument(
+        '--save', action='store_true',
+        help='let the save phase write one unchanged task back (only if its ETag still matches)'
+    )
+    parser.add_argument(
+        '--no-profile', action='store_true',
+        help='run without cProfile and tracemalloc, which slow down the timings'
+    )
+    parser.add_argument(
+        '--json', action='store_true',
+        help='print the report as JSON'
+    )
+    return parser
+
+
+def format_report(report: dict) -> str:
+    '''
+    Format the report of profile_cycle() as a human-readable text.
+
+    Args:
+        report (dict): The report.
+
+    Returns:
+        str: The text.
+    '''
+    lines = [
+        'tododav profile: {} tasks from {} (calendars: {})'.format(
+            report['tasks'], report['server'], ', '.join(report['calendars'])
+        ),
+        'Python {}, profiler {}'.format(
+            report['python'], 'on' if report['profiled'] else 'off'
+        ),
+        '',
+        '{:<10} {:>10} {:>9} {:>10} {:>10}'.format(
+            'phase', 'time [ms]', 'requests', 'sent [kB]', 'recv [kB]'
+        )
+    ]
+    for name, phase in report['phases'].items():
+        lines.append('{:<10} {:>10.1f} {:>9} {:>10.1f} {:>10.1f}'.format(
+            name,
+            phase['duration'] * 1000,
+            phase['requests'],
+            phase['bytes_sent'] / 1024,
+            phase['bytes_received'] / 1024
+        ))
+
+    stats = report['stats']
+    lines += ['', 'requests by kind:']
+    for kind, values in sorted(stats['requests'].items()):
+        lines.append('  {:<28} {:>5}x {:>9.1f} ms  xml {:>7.1f} ms  errors {}'.format(
+            kind,
+            values['count'],
+            values['duration'] * 1000,
+            values['xml_duration'] * 1000,
+            values['errors']
+        ))
+
+    lines += [
+        '',
+        'tasks: {} scanned in {:.1f} ms ({:.1f} µs each), '
+        '{} parsed in {:.1f} ms ({:.1f} µs each, {} reparses)'.format(
+            stats['scan']['count'],
+            stats['scan']['duration'] * 1000,
+            stats['scan']['mean'] * 1e6,
+            stats['parse']['count'],
+            stats['parse']['duration'] * 1000,
+            stats['parse']['mean'] * 1e6,
+            stats['parse']['reparses']
+        ),
+        '',
+        'filters:'
+    ]
+    for name, values in stats['filters'].items():
+        lines.append('  {:<40} {:>9.3f} ms  {} found'.format(
+            name, values['duration'] * 1000, values['found']
+        ))
+
+    if report['profiled']:
+        lines += [
+            '',
+            'peak memory: {:.1f} MB'.format(report['peak_memory'] / 1024 / 1024),
+            '',
+            'top {} hotspots (own time):'.format(len(report['hotspots'])),
+            '  {:>10} {:>10} {:>9}  {}'.format('own [ms]', 'cum [ms]', 'calls', 'function')
+        ]
+        for hotspot in report['hotspots']:
+            lines.append('  {:>10.1f} {:>10.1f} {:>9}  {}'.format(
+                hotspot['own'] * 1000,
+                hotspot['cumulative'] * 1000,
+                hotspot['calls'],
+                hotspot['function']
+            ))
+
+    return '\n'.join(lines)
+
+
+def get_hotspots(profilers: list[cProfile.Profile], top: int = 15) -> list[dict]:
+    '''
+    Get the functions with the most own time of the given profilers.
+
+    Args:
+        profilers (list[cProfile.Profile]): The profilers (at least one).
+        top (int): The number of functions. (default: `15`)
+
+    Returns:
+        list[dict]: The functions with own, cumulative, calls and function.
+    '''
+    entries = pstats.Stats(*profilers).stats  # type: ignore
+    hotspots = sorted(
+        (
+            item for item in entries.items()
+            # the main thread waiting for the worker threads is no hotspot
+            if item[0][2] != "<method 'acquire' of '_thread.lock' objects>"
+        ),
+        key=lambda item: item[1][2],
+        reverse=True
+    )
+    out = []
+    for (file_name, line, function), (_, calls, own, cumulative, _) in hotspots[:top]:
+        if file_name == '~':
+            # a builtin
+            location = function
+        else:
+            location = f'{function} ({os.path.basename(file_name)}:{line})'
+        out.append({
+            'own': own,
+            'cumulative': cumulative,
+            'calls': calls,
+            'function': location
+        })
+    return out
+
+
+def load_ics_dir(path: str) -> list[str]:
+    '''
+    Load the VTODOs of the .ics files in the given directory.
+
+    Args:
+        path (str): The directory.
+
+    Returns:
+        list[str]: The iCalendar data of the files with a VTODO.
+    '''
+    out = []
+    for file_name in sorted(os.listdir(path)):
+        if not file_name.endswith('.ics'):
+            continue
+        with open(os.path.join(path, file_name), 'r', encoding='utf-8') as ics_file:
+            data = ics_file.read()
+        if 'BEGIN:VTODO' in data:
+            out.append(data)
+    return out
+
+
+def main(args: list[str] | None = None) -> int:
+    '''
+    Run the command.
+
+    Args:
+        args (list[str] | None): \
+            The command line arguments after "profile". (default: `None`)
+
+    Returns:
+        int: The exit code.
+    '''
+    options = build_parser().parse_args(args)
+
+    server = None
+    config_dict = {}
+    if options.ics_dir:
+        calendar_name = options.calendar or 'tasks'
+        server = DavServer({calendar_name: load_ics_dir(options.ics_dir)}).start()
+        config_dict = {
+            'NC_URI': server.url,
+            'NC_USER': server.user,
+            'NC_PASSWORD': 'password',
+            'NC_CALENDAR': calendar_name,
+            'CALENDAR_CACHE': ''
+        }
+    elif options.calendar:
+        config_dict['NC_CALENDAR'] = options.calendar
+
+    try:
+        with TodoRepository(config_dict, lazy=True) as todo_rep:
+            report = profile_cycle(
+                todo_rep,
+                use_cache=not options.no_cache,
+                save=options.save,
+                profile=not options.no_profile,
+                top=options.top
+            )
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(json.dumps(report, indent=2) if options.json else format_report(report))
+    return 0
+
+
+def profile_cycle(
+    todo_rep: TodoRepository,
+    use_cache: bool = True,
+    save: bool = False,
+    profile: bool = True,
+    top: int = 15
+) -> dict:
+    '''
+    Run the connect -> populate -> filters -> save cycle with the given
+    (not yet connected) TodoRepository and measure it.
+
+    Nothing is modified, so the save phase only measures save_all()
+    finding no dirty tasks. With save it writes the first task back as
+    well (see put_unchanged()).
+
+    Args:
+        todo_rep (TodoRepository): \
+            The TodoRepository.
+        use_cache (bool): \
+            Use the cached calendar URLs for connecting. (default: `True`)
+        save (bool): \
+            Write the first task back in the save phase. (default: `False`)
+        profile (bool): \
+            Run cProfile and tracemalloc. They slow down the timings, \
+            but give the hotspots and the peak memory. (default: `True`)
+        top (int): \
+            The number of hotspots. (default: `15`)
+
+    Returns:
+        dict: The report (see format_report()).
+    '''
+    stats = todo_rep.stats
+    phases = {}
+
+    def run_phase(name: str, func: Callable):
+        before = (stats.get_request_count(), stats.bytes_sent, stats.bytes_received)
+        start = time.perf_counter()
+        func()
+        phases[name] = {
+            'duration': time.perf_counter() - start,
+            'requests': stats.get_request_count() - before[0],
+            'bytes_sent': stats.bytes_sent - before[1],
+            'bytes_received': stats.bytes_received - before[2]
+        }
+
+    def run_filters():
+        today = date.today()
+        tags = todo_rep.tag_index.todos_by_tag
+        tag = max(tags, key=lambda name: len(tags[name])) if tags else ''
+        todo_rep.get_todos_by_tags(tag)
+        todo_rep.get_todos_by_tags(tag, exclude=True)
+        todo_rep.get_todos_by_daterange(today - timedelta(days=30), today + timedelta(days=30))
+        todo_rep.get_todos_by_date(today.isoformat())
+        todo_rep.get_todos_by_status('COMPLETED', exclude=True)
+        todo_rep.get_todos_filtered(lambda todo: todo.has_priority())
+        todo_rep.query().status('COMPLETED', exclude=True).order_by('due').limit(10).all()
+
+    def run_save():
+        todo_rep.save_all()
+        if save and todo_rep.get_todos():
+            put_unchanged(todo_rep, todo_rep.get_todos()[0])
+
+    profilers: list[cProfile.Profile] = []
+
+    def profile_thread(*args):
+        # cProfile only sees its own thread, so every worker thread of the
+        # repository gets its own profiler (but not the threads of a local
+        # DavServer)
+        sys.setprofile(None)
+        if threading.current_thread().name.startswith('ThreadPoolExecutor'):
+            profiler = cProfile.Profile()
+            profilers.append(profiler)
+            profiler.enable()
+
+    if profile:
+        profilers.append(cProfile.Profile())
+        tracemalloc.start()
+        threading.setprofile(profile_thread)
+        profilers[0].enable()
+    try:
+        run_phase('connect', lambda: todo_rep.connect_calendar(use_cache=use_cache))
+        run_phase('populate', todo_rep.populate_from_todo_list)
+        run_phase('filters', run_filters)
+        run_phase('save', run_save)
+    finally:
+        if profile:
+            profilers[0].disable()
+            threading.setprofile(None)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    phases['total'] = {
+        key: sum(phase[key] for phase in phases.values())
+        for key in ('duration', 'requests', 'bytes_sent', 'bytes_received')
+    }
+    report = {
+        'server': todo_rep.config['NC_URI'],
+        'calendars': todo_rep.get_calendar_names(),
+        'tasks': len(todo_rep.get_todos()),
+        'python': platform.python_version(),
+        'profiled': profile,
+        'phases': phases,
+        'stats': stats.as_dict()
+    }
+    if profile:
+        report['peak_memory'] = peak_memory
+        report['hotspots'] = get_hotspots(profilers, top)
+    return report
+
+
+def put_unchanged(todo_rep: TodoRepository, todo: TodoFacade) -> bool:
+    '''
+    Write the given task back to the server without changing it: its
+    current data is fetched with its ETag and put back with that ETag as
+    If-Match, so that a change of someone else is never overwritten (the
+    server rejects the PUT then).
+
+    Args:
+        todo_rep (TodoRepository): The connected TodoRepository.
+        todo (TodoFacade): The task.
+
+    Returns:
+        bool: True, if the task was written.
+    '''
+    url = todo.caldav_todo.url
+    if url is None:
+        return False
+    client = todo.caldav_todo.client or todo_rep.client
+    response = client.request(str(url), 'GET')
+    etag = response.headers.get('ETag')
+    if response.status != 200 or not etag:
+        return False
+    response = client.request(str(url), 'PUT', response.raw, {
+        'Content-Type': 'text/calendar; charset=utf-8',
+        'If-Match': etag
+    })
+    return response.status in (200, 201, 204)
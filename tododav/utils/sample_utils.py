@@ -0,0 +1,158 @@
+'''
+A deterministic generator for realistic sample VTODOs.
+
+The benchmarks and the profiling need many tasks, which look like the
+ones of a real Nextcloud calendar: dates and datetimes (floating, UTC
+and with a TZID), recurring tasks, tags, priorities, long descriptions
+and a mix of open and completed tasks. The same seed always gives the
+same tasks, so that measurements can be compared.
+'''
+
+from datetime import date, datetime, timedelta
+
+import random
+import uuid
+
+
+BASE_DATE = date(2025, 5, 1)
+'''
+The due dates will be spread around this date.
+'''
+
+TAGS = (
+    'work', 'home', 'errands', 'calls', 'email', 'finance', 'health',
+    'garden', 'music', 'reading', 'travel', 'family', 'car', 'office',
+    'shopping', 'sport', 'learning', 'writing', 'cleaning', 'someday'
+)
+'''
+The pool of tags.
+'''
+
+WORDS = (
+    'call', 'write', 'buy', 'fix', 'plan', 'check', 'order', 'send',
+    'review', 'clean', 'book', 'pay', 'read', 'update', 'prepare', 'the',
+    'invoice', 'report', 'garden', 'car', 'tickets', 'mail', 'meeting',
+    'groceries', 'tax', 'letter', 'backup', 'dentist', 'song', 'draft'
+)
+'''
+The words for the summaries and descriptions.
+'''
+
+RRULES = (
+    'FREQ=DAILY;INTERVAL=1',
+    'FREQ=WEEKLY;INTERVAL=1',
+    'FREQ=WEEKLY;INTERVAL=2;BYDAY=MO',
+    'FREQ=MONTHLY;INTERVAL=1',
+    'FREQ=YEARLY;INTERVAL=1'
+)
+'''
+The recurrence rules of the recurring tasks.
+'''
+
+
+def fold(line: str) -> str:
+    '''
+    Fold a content line after 75 characters, like RFC 5545 wants it.
+
+    Args:
+        line (str): The unfolded content line.
+
+    Returns:
+        str: The folded content line.
+    '''
+    parts = [line[:75]]
+    line = line[75:]
+    while line:
+        parts.append(' ' + line[:74])
+        line = line[74:]
+    return '\r\n'.join(parts)
+
+
+def generate_vtodo(rng: random.Random, number: int = 0) -> str:
+    '''
+    Generate one random VTODO calendar.
+
+    Args:
+        rng (random.Random): The seeded random generator.
+        number (int): The number of the task, used in the summary. (default: `0`)
+
+    Returns:
+        str: The iCalendar data.
+    '''
+    created = datetime.combine(BASE_DATE, datetime.min.time()) \
+        - timedelta(minutes=rng.randrange(365 * 24 * 60))
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Nextcloud Tasks v0.16.1',
+        'BEGIN:VTODO',
+        'UID:{}'.format(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        'CREATED:{:%Y%m%dT%H%M%SZ}'.format(created),
+        'DTSTAMP:{:%Y%m%dT%H%M%SZ}'.format(created + timedelta(days=1)),
+        'LAST-MODIFIED:{:%Y%m%dT%H%M%SZ}'.format(created + timedelta(days=1)),
+        'SUMMARY:{} {}'.format(
+            ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))),
+            number
+        )
+    ]
+
+    # the due date: none, a date or a floating / UTC / TZID datetime
+    kind = rng.random()
+    due = BASE_DATE + timedelta(days=rng.randint(-365, 365))
+    if kind < 0.45:
+        lines.append('DUE;VALUE=DATE:{:%Y%m%d}'.format(due))
+    elif kind < 0.85:
+        due_time = datetime.combine(due, datetime.min.time()) \
+            + timedelta(minutes=15 * rng.randrange(96))
+        if kind < 0.6:
+            lines.append('DUE:{:%Y%m%dT%H%M%S}'.format(due_time))
+        elif kind < 0.8:
+            lines.append('DUE;VALUE=DATE-TIME:{:%Y%m%dT%H%M%SZ}'.format(due_time))
+        else:
+            lines.append('DUE;TZID=Europe/Berlin:{:%Y%m%dT%H%M%S}'.format(due_time))
+
+    if rng.random() < 0.6:
+        lines.append('PRIORITY:{}'.format(rng.choice((1, 1, 5, 5, 5, 9))))
+
+    tag_count = rng.choice((0, 1, 1, 1, 2, 2, 3))
+    if tag_count:
+        lines.append('CATEGORIES:' + ','.join(rng.sample(TAGS, tag_count)))
+
+    status = rng.random()
+    if status < 0.25:
+        lines.append('STATUS:COMPLETED')
+        lines.append('COMPLETED:{:%Y%m%dT%H%M%SZ}'.format(
+            created + timedelta(days=rng.randint(1, 60))
+        ))
+        lines.append('PERCENT-COMPLETE:100')
+    elif status < 0.35:
+        lines.append('STATUS:IN-PROCESS')
+        lines.append('PERCENT-COMPLETE:{}'.format(rng.randrange(10, 100, 10)))
+    elif status < 0.8:
+        lines.append('STATUS:NEEDS-ACTION')
+
+    if rng.random() < 0.1:
+        lines.append('RRULE:' + rng.choice(RRULES))
+
+    if rng.random() < 0.3:
+        description = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 60)))
+        lines.append(fold('DESCRIPTION:' + description.replace(' the ', '\\, the ')))
+
+    lines += ['END:VTODO', 'END:VCALENDAR', '']
+    return '\r\n'.join(lines)
+
+
+def generate_vtodos(count: int, seed: int = 0) -> list[str]:
+    '''
+    Generate the given number of random VTODO calendars. The same count
+    and seed give the same tasks.
+
+    Args:
+        count (int): The number of tasks.
+        seed (int): The seed of the random generator. (default: `0`)
+
+    Returns:
+        list[str]: The iCalendar data of the tasks.
+    '''
+    rng = random.Random(seed)
+    return [generate_vtodo(rng, number) for number in range(count)]
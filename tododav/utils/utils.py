@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from dateutil import tz
 
 
@@ -12,3 +12,34 @@ def string_to_datetime(date_string) -> datetime | None:
         except ValueError:
             pass
     return None
+
+
+def to_local_datetime(value: date | datetime) -> datetime:
+    '''
+    Normalise the given date or datetime to a datetime in the local
+    timezone, the way the TodoRepository filters compare due values.
+    A date will become the datetime at 00:00 of that day.
+
+    Args:
+        value (date | datetime): The date or datetime to normalise.
+
+    Returns:
+        datetime: The normalised datetime.
+    '''
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=tz.tzlocal())
+    return datetime.combine(value, datetime.min.time(), tz.tzlocal())
+
+
+def to_timestamp(value: date | datetime) -> int:
+    '''
+    Get the normalised (see to_local_datetime()) date or datetime
+    as an integer POSIX timestamp.
+
+    Args:
+        value (date | datetime): The date or datetime to convert.
+
+    Returns:
+        int: The timestamp in seconds.
+    '''
+    return int(to_local_datetime(value).timestamp())